@@ -0,0 +1,103 @@
+"""Exportul de backup: cate un CSV pentru fiecare tabela din models.py, intr-o arhiva ZIP trimisa in flux.
+
+Randurile se citesc pe bucati (yield_per) si se scriu direct in arhiva; dupa
+fiecare bucata, octetii comprimati pleaca la client. Memoria ramane aceeasi
+indiferent cate randuri are baza. Toate tabelele se citesc in aceeasi tranzactie
+de citire, deci arhiva e un instantaneu consistent chiar daca intre timp se scrie.
+
+Valorile sunt cele din SQLite, nemodificate (datele ca text ISO, enum-urile ca
+nume, boolean-urile ca 0/1), ca backup-ul sa poata fi reimportat exact.
+
+Tabelele cu secrete (EXCLUSE: token-urile OAuth Google) nu intra in arhiva; sunt
+listate in `manifest.json` cu motivul.
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+import models
+
+# Cate randuri se citesc (si se comprima) odata
+LOT = int(os.getenv("CRM_BACKUP_LOT", "1000"))
+
+# tabela -> motivul pentru care lipseste din backup
+EXCLUSE = {
+    models.GoogleToken.__tablename__: "credentiale OAuth (access/refresh token, client_secret); "
+                                      "dupa restaurare contul Google se reconecteaza din Setari",
+}
+
+
+class _Flux:
+    """Destinatie de scriere fara seek pentru ZipFile: strange octetii pana la urmatorul `goleste()`."""
+
+    def __init__(self):
+        self._bucati = []
+
+    def write(self, date):
+        self._bucati.append(bytes(date))
+        return len(date)
+
+    def flush(self):
+        pass
+
+    def goleste(self):
+        date = b"".join(self._bucati)
+        self._bucati.clear()
+        return date
+
+
+def tabele():
+    """Tabelele din models.py fara cele EXCLUSE, in ordinea dependentelor (parintii inaintea copiilor)."""
+    return [t for t in models.Base.metadata.sorted_tables if t.name not in EXCLUSE]
+
+
+def nume_fisier(moment=None):
+    return f"Backup_EduCRM_{(moment or datetime.now()).strftime('%Y%m%d')}.zip"
+
+
+def genereaza_zip(engine, lot=LOT):
+    """Generator cu octetii arhivei: `<tabela>.csv` pentru fiecare tabela + `manifest.json`."""
+    flux = _Flux()
+    manifest = {"creat_la": datetime.now().isoformat(timespec="seconds"), "tabele": {}, "excluse": EXCLUSE}
+    with engine.connect() as conn, zipfile.ZipFile(flux, mode="w", compression=zipfile.ZIP_DEFLATED) as arhiva:
+        # O singura tranzactie de citire pentru toate tabelele (instantaneu WAL)
+        conn.exec_driver_sql("BEGIN")
+        for tabela in tabele():
+            coloane = [c.name for c in tabela.columns]
+            lista = ", ".join(f'"{c}"' for c in coloane)
+            rezultat = conn.execution_options(yield_per=lot).exec_driver_sql(
+                f'SELECT {lista} FROM "{tabela.name}" ORDER BY rowid'
+            )
+            nr_randuri = 0
+            with arhiva.open(f"{tabela.name}.csv", mode="w", force_zip64=True) as fisier:
+                text = io.TextIOWrapper(fisier, encoding="utf-8-sig", newline="")
+                scriitor = csv.writer(text)
+                scriitor.writerow(coloane)
+                for bucata in rezultat.partitions():
+                    scriitor.writerows(bucata)
+                    nr_randuri += len(bucata)
+                    text.flush()
+                    if date := flux.goleste():
+                        yield date
+                text.flush()
+                text.detach()
+            manifest["tabele"][tabela.name] = {"coloane": coloane, "randuri": nr_randuri}
+        conn.rollback()
+        arhiva.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    yield flux.goleste()
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import engine_citire
+
+    parser = argparse.ArgumentParser(description="Exporta baza de date ca arhiva ZIP cu cate un CSV per tabela")
+    parser.add_argument("destinatie", nargs="?", default=nume_fisier())
+    args = parser.parse_args()
+
+    with open(args.destinatie, "wb") as f:
+        for bucata in genereaza_zip(engine_citire):
+            f.write(bucata)
+    print(f"OK: backup scris in {args.destinatie}")
@@ -0,0 +1,1184 @@
+"""Benchmark-uri pentru rutele critice ale API-ului.
+
+Fiecare benchmark ruleaza pe o baza de date temporara (crm.db-ul real nu este atins)
+si afiseaza numarul de query-uri SQL si timpul, inainte si dupa optimizare.
+
+Rulare:
+    python benchmark.py facturi
+    python benchmark.py            # toate
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+# Baza de date temporara: trebuie setata inainte de importul modulelor aplicatiei
+_DIR_TEMP = tempfile.mkdtemp(prefix="crm_bench_")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["CRM_DATABASE_URL"] = f"sqlite:///{os.path.join(_DIR_TEMP, 'crm.db')}"
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+import luni  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+from database import AsyncSessionCitire, SessionLocal, creeaza_engine, engine, engine_async  # noqa: E402
+
+
+@contextmanager
+def numara_queryuri():
+    """Numara instructiunile SQL trimise catre engine in interiorul blocului."""
+    contor = {"n": 0}
+
+    def _la_executie(conn, cursor, statement, parameters, context, executemany):
+        contor["n"] += 1
+
+    # Rutele de citire ruleaza pe engine-ul async, scrierile pe cel sincron
+    engine_uri = (engine, engine_async.sync_engine)
+    for e in engine_uri:
+        event.listen(e, "before_cursor_execute", _la_executie)
+    try:
+        yield contor
+    finally:
+        for e in engine_uri:
+            event.remove(e, "before_cursor_execute", _la_executie)
+
+
+def ruleaza_async(ruta, **kwargs):
+    """Apeleaza o ruta `async def` cu o sesiune async noua (ca FastAPI)."""
+    async def _apel():
+        try:
+            async with AsyncSessionCitire() as db:
+                return await ruta(db=db, **kwargs)
+        finally:
+            # Conexiunile aiosqlite sunt legate de event loop-ul curent
+            await engine_async.dispose()
+    return asyncio.run(_apel())
+
+
+def cerere(query_string=""):
+    """Un `Request` minimal pentru rutele care citesc filtrele din query string."""
+    return main.Request({"type": "http", "query_string": query_string.encode(), "headers": []})
+
+
+def _raport(nume, contor, durata):
+    print(f"  {nume:<28} {contor['n']:>6} query-uri  {durata * 1000:>9.1f} ms")
+
+
+# ========================== FACTURI ==========================
+
+def _facturi_n_plus_1(db, skip=0, limit=100):
+    """Varianta veche a read_facturi: un query pentru pagina + unul per factura."""
+    rezultat = []
+    for f in db.query(models.Factura).offset(skip).limit(limit).all():
+        nume = "Client Necunoscut"
+        if f.client_id:
+            c = db.query(models.Client).filter(models.Client.id == f.client_id).first()
+            if c:
+                nume = c.nume_afisare
+        rezultat.append((f.id, nume))
+    return rezultat
+
+
+def bench_facturi(nr_facturi=100):
+    print(f"\n[facturi] GET /facturi/ cu o pagina de {nr_facturi} facturi")
+    db = SessionLocal()
+    try:
+        luna_id = luni.get_or_create_luna_id(db, date.today())
+        for i in range(nr_facturi):
+            client = models.Client(tip="partener", nume_afisare=f"Client {i}")
+            db.add(client)
+            db.flush()
+            db.add(models.Factura(
+                serie_numar=f"BEN-{i}", client_id=client.id, luna_id=luna_id,
+                data_emitere=date.today(), data_scadenta=date.today() + timedelta(days=15),
+                total_plata=100 + i,
+            ))
+        db.commit()
+
+        for nume, functie in (
+            ("inainte (N+1)", lambda: _facturi_n_plus_1(db, limit=nr_facturi)),
+            ("dupa (JOIN)", lambda: ruleaza_async(
+                main.read_facturi, request=cerere(), response=main.Response(), skip=0, limit=nr_facturi
+            )),
+        ):
+            db.expire_all()
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                functie()
+                durata = time.perf_counter() - t0
+            _raport(nume, contor, durata)
+    finally:
+        db.close()
+
+
+# ========================== CATALOG ==========================
+
+def _grupa_cu_elevi(db, nr_elevi):
+    """Creeaza o grupa cu nr_elevi inscrisi si o sesiune; jumatate au prezenta marcata."""
+    profesor = models.Profesor(nume_complet="Prof Bench")
+    curs = models.Curs(nume_curs="Curs Bench")
+    db.add_all([profesor, curs])
+    db.flush()
+    grupa = models.Grupa(nume_grupa=f"Grupa {nr_elevi}", curs_id=curs.id, profesor_titular_id=profesor.id)
+    db.add(grupa)
+    db.flush()
+    sesiune = models.Sesiune(
+        grupa_id=grupa.id, profesor_id=profesor.id,
+        data_ora_start=datetime(2026, 1, 5, 10), data_ora_end=datetime(2026, 1, 5, 12),
+    )
+    db.add(sesiune)
+    db.flush()
+    for i in range(nr_elevi):
+        elev = models.Elev(nume_complet=f"Elev {i}")
+        db.add(elev)
+        db.flush()
+        inscriere = models.Inscriere(grupa_id=grupa.id, elev_id=elev.id, data_inscriere=date.today())
+        db.add(inscriere)
+        db.flush()
+        if i % 2 == 0:
+            db.add(models.Prezenta(sesiune_id=sesiune.id, inscriere_id=inscriere.id, is_prezent=True))
+    db.commit()
+    return sesiune.id
+
+
+def bench_catalog():
+    print("\n[catalog] GET /catalog/{sesiune_id} - numarul de query-uri nu trebuie sa depinda de marimea clasei")
+    db = SessionLocal()
+    try:
+        numar_queryuri = {}
+        for nr_elevi in (5, 25, 100):
+            sesiune_id = _grupa_cu_elevi(db, nr_elevi)
+            db.expire_all()
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                catalog = ruleaza_async(main.get_catalog_sesiune, sesiune_id=sesiune_id)
+                durata = time.perf_counter() - t0
+            assert len(catalog) == nr_elevi
+            assert sum(1 for c in catalog if c.is_prezent) == (nr_elevi + 1) // 2
+            _raport(f"{nr_elevi} elevi", contor, durata)
+            numar_queryuri[nr_elevi] = contor["n"]
+
+        assert len(set(numar_queryuri.values())) == 1, f"Catalogul nu e constant: {numar_queryuri}"
+        print(f"  OK: {numar_queryuri[5]} query-uri indiferent de marimea clasei")
+    finally:
+        db.close()
+
+
+# ========================== DASHBOARD ==========================
+
+def _dashboard_vechi(db):
+    """Varianta veche a get_dashboard_stats: extract() / date() pe coloane, fara cache."""
+    from sqlalchemy import extract, func
+    today = datetime.now().date()
+    db.query(func.count(models.Elev.id)).scalar()
+    db.query(func.sum(models.Factura.total_plata)).filter(
+        extract('month', models.Factura.data_emitere) == today.month,
+        extract('year', models.Factura.data_emitere) == today.year,
+    ).scalar()
+    db.query(func.count(models.Grupa.id)).filter(models.Grupa.status_grupa == "activa").scalar()
+    db.query(models.Sesiune).filter(func.date(models.Sesiune.data_ora_start) == today).all()
+    return db.query(func.count(models.Lead.id)).filter(
+        extract('month', models.Lead.created_at) == today.month, models.Lead.status == "nou"
+    ).scalar()
+
+
+def _umple_dashboard(db, nr_randuri):
+    """nr_randuri sesiuni / facturi / lead-uri imprastiate pe ~3 ani (inclusiv luna curenta de anul trecut)."""
+    from sqlalchemy import insert
+    azi = datetime.combine(date.today(), datetime.min.time())
+    luna_id = luni.get_or_create_luna_id(db, date.today())
+    grupa = db.query(models.Grupa).first()
+    if grupa is None:
+        profesor = models.Profesor(nume_complet="Prof Dashboard")
+        curs = models.Curs(nume_curs="Curs Dashboard")
+        db.add_all([profesor, curs])
+        db.flush()
+        grupa = models.Grupa(nume_grupa="Grupa Dashboard", curs_id=curs.id, profesor_titular_id=profesor.id)
+        db.add(grupa)
+        db.flush()
+    zile = [azi - timedelta(days=i % 1100) for i in range(nr_randuri)]
+    db.execute(insert(models.Sesiune), [
+        dict(grupa_id=grupa.id, profesor_id=grupa.profesor_titular_id, data_ora_start=z + timedelta(hours=10),
+             data_ora_end=z + timedelta(hours=12), tema_lectiei="Dashboard")
+        for z in zile
+    ])
+    db.execute(insert(models.Factura), [
+        dict(serie_numar=f"DASH-{nr_randuri}-{i}", luna_id=luna_id, data_emitere=z.date(),
+             data_scadenta=z.date(), total_plata=10)
+        for i, z in enumerate(zile)
+    ])
+    db.execute(insert(models.Lead), [
+        dict(nume_contact=f"Lead {i}", status=models.StatusLead.NOU, created_at=z) for i, z in enumerate(zile)
+    ])
+    db.commit()
+
+
+def bench_dashboard():
+    import cache
+
+    print("\n[dashboard] GET /dashboard/stats - timpul nu trebuie sa creasca odata cu tabelele")
+    db = SessionLocal()
+    try:
+        total = 0
+        for nr_randuri in (10000, 40000):
+            _umple_dashboard(db, nr_randuri - total)
+            total = nr_randuri
+            print(f"  {nr_randuri} sesiuni / facturi / lead-uri")
+
+            cache.dashboard.invalideaza()
+            for nume, functie in (
+                ("inainte (extract / date())", lambda: _dashboard_vechi(db)),
+                ("dupa, fara cache", lambda: ruleaza_async(main.get_dashboard_stats)),
+                ("dupa, din cache", lambda: ruleaza_async(main.get_dashboard_stats)),
+            ):
+                with numara_queryuri() as contor:
+                    t0 = time.perf_counter()
+                    rezultat = functie()
+                    durata = time.perf_counter() - t0
+                _raport(nume, contor, durata)
+                if nume == "inainte (extract / date())":
+                    leaduri_vechi = rezultat
+                else:
+                    # Varianta veche numara si lead-urile din aceeasi luna a anilor trecuti
+                    assert rezultat["leaduri_noi"] < leaduri_vechi, (rezultat["leaduri_noi"], leaduri_vechi)
+
+        # O scriere invalideaza snapshot-ul
+        db.add(models.Lead(nume_contact="Lead nou", status=models.StatusLead.NOU))
+        db.commit()
+        assert cache.dashboard.get(date.today()) is None
+        print("  OK: snapshot invalidat dupa crearea unui lead")
+    finally:
+        db.close()
+
+
+# ========================== KPI LUNARE ==========================
+
+def bench_kpi(nr_randuri=40000):
+    import kpi
+
+    print("\n[kpi] KPI-urile unei luni: scanarea tabelelor vs agregatul kpi_lunar")
+    db = SessionLocal()
+    try:
+        existente = db.query(models.Sesiune).count()
+        if existente < nr_randuri:
+            _umple_dashboard(db, nr_randuri - existente)
+        cod = date.today().strftime("%Y-%m")
+        print(f"  {max(existente, nr_randuri)} sesiuni / facturi / lead-uri, luna {cod}")
+
+        for nume, functie in (
+            ("reconstruire completa", lambda: kpi.reconstruieste(db)),
+            ("scanare o luna (agregate)", lambda: kpi.agregate(db, *luni.limite_luna(date.today()))),
+            ("GET /kpi (doar agregatul)", lambda: main.get_kpi_luna(cod, db=db)),
+        ):
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                functie()
+                durata = time.perf_counter() - t0
+            _raport(nume, contor, durata)
+
+        # O scriere recalculeaza doar luna ei, in tranzactia care a facut-o
+        total_inainte = main.get_kpi_luna(cod, db=db).total_facturat
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            db.add(models.Factura(serie_numar="KPI-1", data_emitere=date.today(),
+                                  data_scadenta=date.today(), total_plata=125))
+            db.commit()
+            durata = time.perf_counter() - t0
+        _raport("factura noua + commit", contor, durata)
+        assert main.get_kpi_luna(cod, db=db).total_facturat == total_inainte + 125
+
+        incremental = {k.luna_id: [getattr(k, m) for m in kpi.METRICI] for k in db.query(models.KpiLunar)}
+        kpi.reconstruieste(db)
+        assert incremental == {k.luna_id: [getattr(k, m) for m in kpi.METRICI] for k in db.query(models.KpiLunar)}
+        print("  OK: agregatul incremental coincide cu reconstruirea completa")
+    finally:
+        db.close()
+
+
+# ========================== BACKUP ==========================
+
+def _backup_vechi(db):
+    """Varianta veche a download_backup: 5 tabele in DataFrame-uri, tot XLSX-ul intr-un BytesIO."""
+    from io import BytesIO
+    import pandas as pd
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for model, foaie in ((models.Elev, "Elevi"), (models.Profesor, "Profesori"), (models.Grupa, "Grupe"),
+                             (models.Factura, "Facturi"), (models.Produs, "Inventar")):
+            date_foaie = [o.__dict__ for o in db.query(model).all()]
+            if date_foaie:
+                df = pd.DataFrame(date_foaie)
+                del df["_sa_instance_state"]
+                df.to_excel(writer, sheet_name=foaie, index=False)
+    return output.getvalue()
+
+
+def bench_backup():
+    import tracemalloc
+    import backup
+
+    print("\n[backup] GET /system/backup - memoria nu trebuie sa creasca odata cu tabelele")
+    db = SessionLocal()
+    try:
+        total = db.query(models.Sesiune).count()
+        for nr_randuri in (2000, 8000):
+            if total < nr_randuri:
+                _umple_dashboard(db, nr_randuri - total)
+                total = nr_randuri
+            print(f"  {total} sesiuni / facturi / lead-uri")
+            for nume, functie in (
+                ("inainte (pandas, XLSX)", lambda: len(_backup_vechi(db))),
+                ("dupa (ZIP in flux)", lambda: sum(len(b) for b in backup.genereaza_zip(engine))),
+            ):
+                db.expunge_all()
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                octeti = functie()
+                durata = time.perf_counter() - t0
+                _, varf = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"  {nume:<28} varf {varf / 2**20:>7.1f} MB  {durata * 1000:>9.1f} ms  ({octeti / 2**20:.1f} MB)")
+    finally:
+        db.close()
+
+
+# ========================== SNAPSHOT ==========================
+
+def bench_snapshot(nr_randuri=40000):
+    import snapshot
+
+    print("\n[snapshot] POST /system/snapshot - scrierile continua in timpul copiei")
+    db = SessionLocal()
+    try:
+        existente = db.query(models.Sesiune).count()
+        if existente < nr_randuri:
+            _umple_dashboard(db, nr_randuri - existente)
+    finally:
+        db.close()
+    director = os.path.join(_DIR_TEMP, "snapshots")
+    print(f"  baza: {os.path.getsize(snapshot.cale_baza()) / 2**20:.1f} MB")
+
+    for nume, pagini, comprima in (
+        ("un singur pas", -1, False),
+        (f"pasi de {snapshot.PAGINI_PE_PAS} pagini", snapshot.PAGINI_PE_PAS, False),
+        (f"pasi de {snapshot.PAGINI_PE_PAS} + gzip", snapshot.PAGINI_PE_PAS, True),
+    ):
+        gata = threading.Event()
+        latente = []
+
+        def scriitor():
+            while not gata.is_set():
+                t0 = time.perf_counter()
+                with engine.begin() as conn:
+                    conn.exec_driver_sql("UPDATE settings SET numar_curent_factura = numar_curent_factura")
+                latente.append(time.perf_counter() - t0)
+                time.sleep(0.002)
+
+        copiaza_original = snapshot._copiaza
+        snapshot._copiaza = lambda sursa, destinatie, **kw: copiaza_original(sursa, destinatie, pagini=pagini)
+        t = threading.Thread(target=scriitor)
+        t.start()
+        try:
+            t0 = time.perf_counter()
+            rezultat = snapshot.creeaza(comprima=comprima, director=director, pastreaza=1)
+            durata = time.perf_counter() - t0
+        finally:
+            snapshot._copiaza = copiaza_original
+            gata.set()
+            t.join()
+        print(f"  {nume:<28} {durata * 1000:>9.1f} ms  {rezultat['marime'] / 2**20:>6.1f} MB  "
+              f"{len(latente)} commit-uri in paralel, max {max(latente) * 1000:.1f} ms")
+
+
+# ========================== IMPORT IN BLOC ==========================
+
+def bench_import(nr_randuri=50000, nr_unul_cate_unul=500):
+    import importuri
+    import schemas
+
+    print(f"\n[import] {nr_randuri} elevi: POST /elevi/ rand cu rand vs POST /import/elevi")
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        for i in range(nr_unul_cate_unul):
+            main.create_elev(schemas.ElevCreate(nume_complet=f"Elev {i}", email_parinte=f"p{i}@x.ro"), db=db)
+        durata = time.perf_counter() - t0
+        print(f"  {'rand cu rand (commit+refresh)':<32} {durata / nr_unul_cate_unul * nr_randuri:>9.1f} s"
+              f"  (extrapolat din {nr_unul_cate_unul} randuri)")
+
+        continut = "nume_complet,email_parinte,gdpr_accepted\n" + "".join(
+            f"Elev {i},p{i}@x.ro,{'da' if i % 2 else 'nu'}\n" for i in range(nr_randuri)
+        )
+        t0 = time.perf_counter()
+        raport = importuri.importa(db, "elevi", importuri.citeste_randuri(io.BytesIO(continut.encode()), "elevi.csv"))
+        durata = time.perf_counter() - t0
+        assert raport["inserate"] == nr_randuri and raport["respinse"] == 0, raport
+        print(f"  {f'import in loturi de {importuri.LOT}':<32} {durata:>9.1f} s")
+    finally:
+        db.close()
+
+
+# ========================== CAUTARE (FTS5) ==========================
+
+def bench_cautare(nr_randuri=100000):
+    import random
+    from sqlalchemy import insert
+    import cautare
+
+    print(f"\n[cautare] GET /search pe {nr_randuri} elevi + leaduri")
+    rnd = random.Random(7)
+    prenume = ["Andrei", "Ioana", "Ștefan", "Maria", "Mihai", "Elena", "Radu", "Ana", "Matei", "Sofia"]
+    nume = ["Popescu", "Ionescu", "Dumitrescu", "Stan", "Georgescu", "Munteanu", "Constantin", "Marin", "Tudor", "Lazăr"]
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        db.execute(insert(models.Elev), [
+            dict(nume_complet=f"{rnd.choice(prenume)} {rnd.choice(nume)}{i}", telefon_parinte=f"07{i:08d}",
+                 email_parinte=f"parinte{i}@exemplu.ro", scoala_curenta=f"Scoala nr. {i % 300}")
+            for i in range(nr_randuri // 2)
+        ])
+        db.execute(insert(models.Lead), [
+            dict(nume_contact=f"{rnd.choice(prenume)} {rnd.choice(nume)}{i}", email_contact=f"lead{i}@exemplu.ro",
+                 status=models.StatusLead.NOU)
+            for i in range(nr_randuri // 2)
+        ])
+        db.commit()
+        print(f"  insert {nr_randuri} randuri (cu trigger-ele FTS)  {(time.perf_counter() - t0) * 1000:>9.1f} ms")
+
+        def _vechi(q):
+            """Ce facea frontend-ul: descarca lista si filtreaza local."""
+            return [e for e in db.query(models.Elev).all() if q.lower() in (e.nume_complet or "").lower()]
+
+        for nume_test, functie in (
+            ("inainte: lista + filtru local", lambda: _vechi("popescu12")),
+            ("prefix 'popescu12'", lambda: ruleaza_async(main.search, q="popescu12")),
+            ("doua cuvinte 'ana marin'", lambda: ruleaza_async(main.search, q="ana marin")),
+            ("telefon '0700012345'", lambda: ruleaza_async(main.search, q="0700012345")),
+            ("greseala 'Georgesku777'", lambda: ruleaza_async(main.search, q="Georgesku777")),
+        ):
+            db.expunge_all()
+            t0 = time.perf_counter()
+            rezultat = functie()
+            durata = time.perf_counter() - t0
+            print(f"  {nume_test:<36} {durata * 1000:>9.1f} ms  {len(rezultat)} rezultate")
+        assert any(r["titlu"].endswith("Georgescu777") for r in ruleaza_async(main.search, q="Georgesku777"))
+        print(f"  OK: index de {cautare.__name__} sincronizat de trigger-e")
+    finally:
+        db.close()
+
+
+# ========================== FILTRE PE LISTE ==========================
+
+def bench_filtre(nr_facturi=50000):
+    import random
+    from sqlalchemy import insert
+
+    azi = date.today()
+    print(f"\n[filtre] GET /facturi/ emise si scadente, din {nr_facturi} facturi")
+    rnd = random.Random(19)
+    statusuri = list(models.StatusFactura)
+    db = SessionLocal()
+    try:
+        luna_id = luni.get_or_create_luna_id(db, azi)
+        client = models.Client(tip="partener", nume_afisare="Client filtre")
+        db.add(client)
+        db.flush()
+        db.execute(insert(models.Factura), [
+            dict(serie_numar=f"FLT-{i}", client_id=client.id, luna_id=luna_id, status=rnd.choice(statusuri),
+                 data_emitere=azi - timedelta(days=rnd.randrange(730)),
+                 data_scadenta=azi + timedelta(days=rnd.randrange(-700, 30)), total_plata=100 + i % 900)
+            for i in range(nr_facturi)
+        ])
+        db.commit()
+
+        def _vechi():
+            """Ce facea frontend-ul: descarca toate facturile si filtreaza local."""
+            toate = ruleaza_async(main.read_facturi, request=cerere(), response=main.Response(), limit=nr_facturi)
+            return [f for f in toate if f.status == models.StatusFactura.EMISA and f.data_scadenta < azi][:100]
+
+        filtru = f"status=emisa&data_scadenta__lt={azi.isoformat()}&sort=data_scadenta"
+        rezultate = {}
+        for nume, functie in (
+            ("inainte: lista + filtru local", _vechi),
+            ("dupa: filtre in SQL", lambda: ruleaza_async(
+                main.read_facturi, request=cerere(filtru), response=main.Response(), limit=100, sort="data_scadenta"
+            )),
+        ):
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                rezultate[nume] = functie()
+                durata = time.perf_counter() - t0
+            _raport(nume, contor, durata)
+        nou = rezultate["dupa: filtre in SQL"]
+        assert all(f.status == models.StatusFactura.EMISA and f.data_scadenta < azi for f in nou)
+        assert [f.data_scadenta for f in nou] == sorted(f.data_scadenta for f in nou)
+    finally:
+        db.close()
+
+
+# ========================== SESIUNI RECURENTE ==========================
+
+def bench_recurente(nr_grupe=10):
+    import schemas
+
+    print(f"\n[recurente] un semestru (2 sesiuni / saptamana) pentru {nr_grupe} grupe")
+    db = SessionLocal()
+    try:
+        curs = models.Curs(nume_curs="Curs Recurente")
+        db.add(curs)
+        db.flush()
+        regula = schemas.RegulaRecurenta(
+            zile_saptamana=[0, 3], ora_start="15:00", durata_minute=90,
+            data_inceput=date(2030, 9, 9), data_sfarsit=date(2031, 1, 31),
+            excluderi=[schemas.PerioadaExclusa(de_la=date(2030, 12, 21), pana_la=date(2031, 1, 7))],
+        )
+        intervale = main.planificare.expandeaza(regula, regula.data_inceput, regula.data_sfarsit)
+
+        def _grupa_noua():
+            profesor = models.Profesor(nume_complet="Prof Recurente")
+            db.add(profesor)
+            db.flush()
+            grupa = models.Grupa(nume_grupa="Grupa Recurente", curs_id=curs.id, profesor_titular_id=profesor.id)
+            db.add(grupa)
+            db.commit()
+            return grupa
+
+        def _unul_cate_unul(grupa):
+            for start, sfarsit in intervale:
+                main.create_sesiune(schemas.SesiuneCreate(
+                    grupa_id=grupa.id, profesor_id=grupa.profesor_titular_id,
+                    data_ora_start=start, data_ora_end=sfarsit, durata_ore=1.5,
+                ), db=db)
+
+        def _generator(grupa):
+            main.genereaza_sesiuni(grupa.id, regula, db=db)
+
+        for nume, functie in (("inainte: POST /sesiuni/ x N", _unul_cate_unul), ("dupa: genereaza-sesiuni", _generator)):
+            grupe = [_grupa_noua() for _ in range(nr_grupe)]
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                for grupa in grupe:
+                    functie(grupa)
+                durata = time.perf_counter() - t0
+            _raport(nume, contor, durata)
+        print(f"  ({len(intervale)} sesiuni per grupa)")
+    finally:
+        db.close()
+
+
+# ========================== SUPRAPUNERI SESIUNI ==========================
+
+def bench_conflicte(nr_sesiuni=50000):
+    import random
+    from sqlalchemy import insert
+    import planificare
+    import schemas
+
+    print(f"\n[conflicte] orar cu {nr_sesiuni} sesiuni (~5 ani, 40 profesori, 25 sali)")
+    rnd = random.Random(21)
+    db = SessionLocal()
+    try:
+        curs = models.Curs(nume_curs="Curs Conflicte")
+        profesori = [models.Profesor(nume_complet=f"Prof {i}") for i in range(40)]
+        db.add_all([curs, *profesori])
+        db.flush()
+        grupe = [models.Grupa(nume_grupa=f"G{i}", curs_id=curs.id, profesor_titular_id=profesori[i % 40].id)
+                 for i in range(200)]
+        db.add_all(grupe)
+        db.flush()
+        inceput = datetime(2026, 1, 5, 8)
+        randuri = []
+        for _ in range(nr_sesiuni):
+            start = inceput + timedelta(days=rnd.randrange(5 * 365), minutes=30 * rnd.randrange(20))
+            randuri.append(dict(grupa_id=rnd.choice(grupe).id, profesor_id=rnd.choice(profesori).id,
+                                sala=f"S{rnd.randrange(25)}", data_ora_start=start,
+                                data_ora_end=start + timedelta(minutes=90)))
+        db.execute(insert(models.Sesiune), randuri)
+        db.commit()
+
+        def _perechi_vechi(sesiuni):
+            """Comparatia fiecare-cu-fiecare (O(n^2))."""
+            return sum(
+                1 for i, a in enumerate(sesiuni) for b in sesiuni[i + 1:]
+                if a.data_ora_start < b.data_ora_end and b.data_ora_start < a.data_ora_end
+                and planificare._motive(a, b)
+            )
+
+        trimestru = (datetime(2027, 1, 1), datetime(2027, 4, 1))
+        sesiuni_trimestru = db.execute(planificare._sesiuni_active(*trimestru)).all()
+        for nume, functie in (
+            (f"inainte: O(n^2), {len(sesiuni_trimestru)} sesiuni", lambda: _perechi_vechi(sesiuni_trimestru)),
+            ("dupa: GET /sesiuni/conflicte (3 luni)", lambda: len(main.read_conflicte_sesiuni(*trimestru, db=db))),
+            ("dupa: GET /sesiuni/conflicte (tot)", lambda: len(main.read_conflicte_sesiuni(None, None, db=db))),
+        ):
+            t0 = time.perf_counter()
+            perechi = functie()
+            print(f"  {nume:<40} {(time.perf_counter() - t0) * 1000:>9.1f} ms  {perechi} perechi")
+
+        sesiune = schemas.SesiuneCreate(grupa_id=grupe[0].id, profesor_id=profesori[0].id, sala="S0",
+                                        data_ora_start=datetime(2028, 6, 1, 7), data_ora_end=datetime(2028, 6, 1, 7, 45))
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            for _ in range(100):
+                planificare.verifica_sesiune(db, sesiune)
+            durata = time.perf_counter() - t0
+        print(f"  {'verificare la scriere (medie)':<40} {durata * 10:>9.2f} ms  {contor['n'] // 100} query")
+    finally:
+        db.close()
+
+
+# ========================== FACTURARE LUNARA ==========================
+
+def bench_facturare(nr_elevi=2000, nr_parteneri=50):
+    import facturare
+    import schemas
+
+    print(f"\n[facturare] {nr_elevi} elevi (per copil, platesc parintii) + {nr_parteneri} contracte pausale")
+    db = SessionLocal()
+    try:
+        profesor = models.Profesor(nume_complet="Prof Facturare")
+        curs = models.Curs(nume_curs="Curs Facturare")
+        parteneri = [models.Partener(nume=f"Scoala Facturare {i}", tip=models.TipInstitutie.SCOALA_STAT) for i in range(nr_parteneri)]
+        db.add_all([profesor, curs, *parteneri])
+        db.flush()
+        contracte = [models.Contract(partener_id=p.id, nume_contract=f"Abonament {p.id}", status="activ",
+                                     mod_calcul_pret=models.ModCalculPret.PAUSAL, valoare=1500) for p in parteneri]
+        per_copil = models.Contract(partener_id=parteneri[0].id, nume_contract="Per copil", status="activ",
+                                    mod_calcul_pret=models.ModCalculPret.PER_COPIL, valoare=250)
+        db.add_all([*contracte, per_copil])
+        db.flush()
+        grupe = [models.Grupa(nume_grupa=f"GF{i}", curs_id=curs.id, profesor_titular_id=profesor.id,
+                              contract_id=per_copil.id, tip_plata_grupa=models.TipPlataGrupa.PLATESTE_PARINTII)
+                 for i in range(nr_elevi // 20)]
+        db.add_all(grupe)
+        db.flush()
+        db.add_all([models.Sesiune(grupa_id=g.id, profesor_id=profesor.id, data_ora_start=datetime(2031, 3, 3, 10),
+                                   data_ora_end=datetime(2031, 3, 3, 12)) for g in grupe])
+        elevi = [models.Elev(nume_complet=f"Elev Facturare {i}", nume_parinte=f"Parinte {i}") for i in range(nr_elevi)]
+        db.add_all(elevi)
+        db.flush()
+        db.add_all([models.Inscriere(grupa_id=grupe[i // 20].id, elev_id=e.id, data_inscriere=date(2031, 1, 1))
+                    for i, e in enumerate(elevi)])
+        db.commit()
+
+        raport = facturare.genereaza(db, 2031, 3, simulare=True)
+
+        # Inainte: cate un POST /facturi/ pentru fiecare platitor, completat de mana
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            for i, f in enumerate(raport["facturi"]):
+                main.create_factura(schemas.FacturaCreate(
+                    serie_numar=f"MANUAL-{i}", client_nume=f["client_nume"], data_emitere=raport["data_emitere"],
+                    data_scadenta=raport["data_scadenta"], total_plata=f["total_plata"],
+                ), db=db)
+            durata = time.perf_counter() - t0
+        print(f"  {'inainte (un POST /facturi/ per client)':<42} {contor['n']:>6} query  {durata * 1000:>9.1f} ms"
+              f"  {len(raport['facturi'])} facturi, fara linii")
+        db.query(models.Factura).filter(models.Factura.serie_numar.like("MANUAL-%")).delete(synchronize_session=False)
+        db.commit()
+
+        for nume, simulare in (("dupa: simulare", True), ("dupa: POST /facturare/genereaza", False)):
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                raport = facturare.genereaza(db, 2031, 3, simulare=simulare)
+                durata = time.perf_counter() - t0
+            print(f"  {nume:<42} {contor['n']:>6} query  {durata * 1000:>9.1f} ms"
+                  f"  {raport['nr_facturi']} facturi, {raport['nr_linii']} linii, total {raport['total']:.0f}")
+        assert raport["nr_facturi"] == nr_elevi + nr_parteneri
+    finally:
+        db.close()
+
+
+# ========================== NUMEROTARE FACTURI ==========================
+
+def _aloca_vechi(db, cate):
+    """Varianta veche: citeste contorul, apoi il scrie inapoi calculat in Python."""
+    setari = db.query(models.Settings).order_by(models.Settings.id).first()
+    primul = setari.numar_curent_factura or 1
+    setari.numar_curent_factura = primul + cate
+    db.flush()
+    return setari.serie_facturi, primul, setari.moneda_default
+
+
+def _alocari_concurente(aloca, threaduri=8, alocari_per_thread=250):
+    """Fiecare thread aloca cate un numar per tranzactie; returneaza (numere, erori, durata)."""
+    numere, erori, lock = [], 0, threading.Lock()
+
+    def lucreaza():
+        nonlocal erori
+        for _ in range(alocari_per_thread):
+            db = SessionLocal()
+            try:
+                _, numar, _ = aloca(db, 1)
+                db.commit()
+                with lock:
+                    numere.append(numar)
+            except OperationalError:
+                with lock:
+                    erori += 1
+            finally:
+                db.close()
+
+    t0 = time.perf_counter()
+    lista = [threading.Thread(target=lucreaza) for _ in range(threaduri)]
+    for t in lista:
+        t.start()
+    for t in lista:
+        t.join()
+    return numere, erori, time.perf_counter() - t0
+
+
+def bench_numerotare(threaduri=8, alocari_per_thread=250, bloc=10000):
+    import numerotare
+
+    print(f"\n[numerotare] {threaduri} thread-uri x {alocari_per_thread} alocari (cate o tranzactie), apoi un bloc de {bloc}")
+    db = SessionLocal()
+    try:
+        if db.query(models.Settings.id).first() is None:
+            db.add(models.Settings())
+            db.commit()
+    finally:
+        db.close()
+
+    for nume, aloca in (("inainte (SELECT + UPDATE)", _aloca_vechi), ("dupa (UPDATE ... RETURNING)", numerotare.aloca)):
+        numere, erori, durata = _alocari_concurente(aloca, threaduri, alocari_per_thread)
+        duplicate = len(numere) - len(set(numere))
+        print(f"  {nume:<30} {len(numere) / durata:>8.0f} numere/s  erori {erori:>4}  duplicate {duplicate}")
+
+    db = SessionLocal()
+    try:
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            for _ in range(1000):
+                numerotare.aloca(db, 1)
+            durata_unul = time.perf_counter() - t0
+            n_unul = contor["n"]
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            numere, _ = numerotare.aloca_numere(db, bloc)
+            durata_bloc = time.perf_counter() - t0
+        db.commit()
+        print(f"  {'1000 x aloca(1)':<30} {n_unul:>6} query  {durata_unul * 1000:>9.1f} ms")
+        print(f"  {f'aloca_numere({bloc})':<30} {contor['n']:>6} query  {durata_bloc * 1000:>9.1f} ms  {numere[0]} .. {numere[-1]}")
+    finally:
+        db.close()
+
+
+# ========================== IMPORT PLATI (EXTRAS BANCAR) ==========================
+
+def _extras_csv(linii):
+    text = "Data;Suma;Referinta;Detalii;CUI\n" + "".join(
+        f"{d:%d.%m.%Y};{suma:.2f};{ref};{detalii};{cui}\n" for d, suma, ref, detalii, cui in linii
+    )
+    return io.BytesIO(text.encode())
+
+
+def _reconciliaza_vechi(db, linii):
+    """Varianta "manuala": pentru fiecare linie cauta factura cu query-uri, insereaza plata, recalculeaza statusul."""
+    from sqlalchemy import func
+    import incasari
+
+    potrivite = 0
+    for d, suma, ref, detalii, cui in linii:
+        numar = detalii.split()[-1] if detalii.startswith("factura") else None
+        factura = db.query(models.Factura).filter(models.Factura.serie_numar == numar).first() if numar else None
+        if factura is None and cui:
+            factura = (db.query(models.Factura).join(models.Client)
+                       .filter(models.Client.cui_cnp == cui, models.Factura.status.in_(incasari.DESCHISE))
+                       .order_by(models.Factura.data_scadenta).first())
+        if factura is None:
+            continue
+        db.add(models.Plata(factura_id=factura.id, data_plata=d, suma_achitata=suma, referinta_plata=ref))
+        db.flush()
+        platit = db.query(func.sum(models.Plata.suma_achitata)).filter(models.Plata.factura_id == factura.id).scalar()
+        factura.status = (models.StatusFactura.PLATITA_INTEGRAL if platit >= factura.total_plata
+                          else models.StatusFactura.PLATITA_PARTIAL)
+        potrivite += 1
+    db.commit()
+    return potrivite
+
+
+def bench_plati(nr_facturi=20000, nr_vechi=2000):
+    import random
+    from sqlalchemy import insert, update
+    import incasari
+
+    print(f"\n[plati] extras bancar cu {nr_facturi} incasari peste {nr_facturi} facturi deschise")
+    rnd = random.Random(24)
+    db = SessionLocal()
+    try:
+        clienti = [models.Client(tip=models.TipClient.PARTENER, nume_afisare=f"Client plati {i}", cui_cnp=f"RO{100000 + i}")
+                   for i in range(nr_facturi // 4)]
+        db.add_all(clienti)
+        db.flush()
+        facturi = [dict(serie_numar=f"PL-{i:05d}", client_id=clienti[i % len(clienti)].id, total_plata=100 + i % 900,
+                        data_emitere=date(2031, 1, 1), data_scadenta=date(2031, 1, 15) + timedelta(days=i % 60),
+                        status=models.StatusFactura.EMISA)
+                   for i in range(nr_facturi)]
+        db.execute(insert(models.Factura), facturi)
+        db.commit()
+        # Jumatate platite cu numarul facturii in detalii, restul doar cu CUI-ul clientului
+        linii = [
+            (date(2031, 2, 1), f["total_plata"], f"TRX{i}", f"factura {f['serie_numar']}" if i % 2 else "plata servicii",
+             "" if i % 2 else f"RO{100000 + i % len(clienti)}")
+            for i, f in enumerate(facturi)
+        ]
+        rnd.shuffle(linii)
+
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            potrivite = _reconciliaza_vechi(db, linii[:nr_vechi])
+            durata = time.perf_counter() - t0
+        print(f"  {f'inainte ({nr_vechi} linii, query-uri per linie)':<40} {contor['n']:>7} query  {durata * 1000:>9.1f} ms"
+              f"  {potrivite} potrivite")
+        db.query(models.Plata).delete()
+        db.execute(update(models.Factura).values(status=models.StatusFactura.EMISA))
+        db.commit()
+
+        for selectie in (linii[:nr_vechi], linii[nr_vechi:]):
+            nume = f"dupa ({len(selectie)} linii, POST /plati/import)"
+            with numara_queryuri() as contor:
+                t0 = time.perf_counter()
+                raport = incasari.importa(db, incasari.citeste_extras(_extras_csv(selectie), "extras.csv"))
+                durata = time.perf_counter() - t0
+            print(f"  {nume:<40} {contor['n']:>7} query  {durata * 1000:>9.1f} ms  {raport['potrivite']} potrivite,"
+                  f" {raport['nepotrivite']} nepotrivite, {raport['facturi_actualizate']} facturi actualizate")
+    finally:
+        db.close()
+
+
+# ========================== RESTANTE (SCADENTE + VECHIME) ==========================
+
+def _restante_vechi(db, azi):
+    """Varianta in Python: toate facturile si platile in memorie, sumele per factura, statusul prin ORM."""
+    platit = {}
+    for plata in db.query(models.Plata).all():
+        platit[plata.factura_id] = platit.get(plata.factura_id, 0) + float(plata.suma_achitata)
+    vechime = {}
+    for factura in db.query(models.Factura).all():
+        if factura.status == models.StatusFactura.EMISA and factura.data_scadenta < azi:
+            factura.status = models.StatusFactura.SCADENTA_DEPASITA
+        sold = float(factura.total_plata) - platit.get(factura.id, 0)
+        if factura.status in (models.StatusFactura.EMISA, models.StatusFactura.SCADENTA_DEPASITA,
+                              models.StatusFactura.PLATITA_PARTIAL) and sold > 0:
+            zile = (azi - factura.data_scadenta).days
+            interval = "nescadent" if zile < 0 else "0-30" if zile <= 30 else "31-60" if zile <= 60 else \
+                "61-90" if zile <= 90 else "90+"
+            sume = vechime.setdefault(factura.client_id, {})
+            sume[interval] = sume.get(interval, 0) + sold
+    db.commit()
+    return vechime
+
+
+def bench_restante(nr_facturi=100000, nr_clienti=5000):
+    import random
+    from sqlalchemy import func, insert, update
+    import restante
+
+    print(f"\n[restante] {nr_facturi} facturi ({nr_clienti} clienti, ~1/3 cu plati): scadente depasite + vechime")
+    rnd = random.Random(25)
+    azi = date(2031, 6, 1)
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Client), [dict(tip=models.TipClient.PARINTE, nume_afisare=f"Client restante {i}")
+                                           for i in range(nr_clienti)])
+        primul_client = db.query(func.min(models.Client.id)).scalar()
+        statusuri = (models.StatusFactura.EMISA,) * 6 + (models.StatusFactura.PLATITA_INTEGRAL,) * 3 + \
+            (models.StatusFactura.ANULATA,)
+        db.execute(insert(models.Factura), [
+            dict(serie_numar=f"RS-{i}", client_id=primul_client + rnd.randrange(nr_clienti), total_plata=rnd.randrange(50, 2000),
+                 data_emitere=azi - timedelta(days=200), data_scadenta=azi - timedelta(days=rnd.randrange(-30, 180)),
+                 status=rnd.choice(statusuri))
+            for i in range(nr_facturi)
+        ])
+        primul_id = db.query(func.min(models.Factura.id)).scalar()
+        db.execute(insert(models.Plata), [
+            dict(factura_id=primul_id + i, data_plata=azi, suma_achitata=rnd.randrange(10, 50))
+            for i in range(0, nr_facturi, 3)
+        ])
+        db.commit()
+
+        def reseteaza():
+            db.execute(update(models.Factura).where(models.Factura.status == models.StatusFactura.SCADENTA_DEPASITA)
+                       .values(status=models.StatusFactura.EMISA))
+            db.commit()
+            db.expunge_all()
+
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            vechime = _restante_vechi(db, azi)
+            durata = time.perf_counter() - t0
+        print(f"  {'inainte (tot in Python, flush ORM)':<44} {contor['n']:>6} query  {durata * 1000:>9.1f} ms"
+              f"  {len(vechime)} clienti")
+        reseteaza()
+
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            marcate = restante.marcheaza_scadente(db, azi)
+            durata = time.perf_counter() - t0
+        print(f"  {'dupa: marcheaza_scadente (un UPDATE)':<44} {contor['n']:>6} query  {durata * 1000:>9.1f} ms  {marcate} marcate")
+        with numara_queryuri() as contor:
+            t0 = time.perf_counter()
+            raport = ruleaza_async(restante.vechime, la=azi)
+            durata = time.perf_counter() - t0
+        print(f"  {'dupa: GET /facturi/aging (un query grupat)':<44} {contor['n']:>6} query  {durata * 1000:>9.1f} ms"
+              f"  {len(raport['clienti'])} clienti, sold {raport['total']['total']:.0f}")
+        # A doua trecere a worker-ului: nimic de marcat, doar o cautare in index
+        t0 = time.perf_counter()
+        marcate = restante.marcheaza_scadente(db, azi)
+        print(f"  {'dupa: a doua trecere a worker-ului':<44} {'':>6}        {(time.perf_counter() - t0) * 1000:>9.1f} ms  {marcate} marcate")
+    finally:
+        db.close()
+
+
+# ========================== CONCURENTA (WAL) ==========================
+
+def _trafic_concurent(engine, durata=3.0, cititori=4, scriitori=2, randuri_per_commit=200):
+    """Cititori si scriitori in paralel pe acelasi fisier; returneaza statisticile."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS bench_jurnal (id INTEGER PRIMARY KEY, text TEXT)")
+
+    stop = time.perf_counter() + durata
+    lock = threading.Lock()
+    stats = {"citiri": 0, "scrieri": 0, "erori": 0, "latente_citire": []}
+
+    def cititor():
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.exec_driver_sql("SELECT id, text FROM bench_jurnal ORDER BY id DESC LIMIT 20").all()
+            except OperationalError:
+                with lock:
+                    stats["erori"] += 1
+                continue
+            with lock:
+                stats["citiri"] += 1
+                stats["latente_citire"].append(time.perf_counter() - t0)
+
+    def scriitor():
+        randuri = [("x" * 200,)] * randuri_per_commit
+        while time.perf_counter() < stop:
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql("INSERT INTO bench_jurnal (text) VALUES (?)", randuri)
+            except OperationalError:
+                with lock:
+                    stats["erori"] += 1
+                continue
+            with lock:
+                stats["scrieri"] += 1
+
+    threaduri = [threading.Thread(target=cititor) for _ in range(cititori)]
+    threaduri += [threading.Thread(target=scriitor) for _ in range(scriitori)]
+    for t in threaduri:
+        t.start()
+    for t in threaduri:
+        t.join()
+    engine.dispose()
+    return stats
+
+
+def bench_concurenta(durata=3.0):
+    print(f"\n[concurenta] 4 cititori + 2 scriitori in paralel, {durata:.0f}s per profil")
+    profile = (
+        # Engine-ul vechi: create_engine simplu, jurnal rollback (DELETE), fara PRAGMA-uri
+        ("inainte (rollback journal)", lambda url: create_engine(url, connect_args={"check_same_thread": False})),
+        ("dupa (WAL + PRAGMA)", lambda url: creeaza_engine(url)),
+    )
+    for nume, fabrica in profile:
+        url = f"sqlite:///{os.path.join(_DIR_TEMP, 'concurenta_' + str(abs(hash(nume))) + '.db')}"
+        stats = _trafic_concurent(fabrica(url), durata=durata)
+        latente = sorted(stats["latente_citire"]) or [0.0]
+        p99 = latente[min(len(latente) - 1, int(len(latente) * 0.99))]
+        print(
+            f"  {nume:<28} {stats['citiri'] / durata:>8.0f} citiri/s  {stats['scrieri'] / durata:>6.0f} commit-uri/s"
+            f"  p99 citire {p99 * 1000:>7.1f} ms  erori {stats['erori']}"
+        )
+
+
+# ========================== INCARCARE (SYNC vs ASYNC) ==========================
+
+def _aplicatie_sync():
+    """Aceeasi ruta GET /elevi/, dar in varianta veche: `def` sincron pe threadpool.
+
+    Sesiunea tine conexiunea pana la inchiderea dependentei, iar inchiderea are nevoie
+    si ea de un thread liber: peste ~40 de cereri simultane pool-ul si threadpool-ul
+    se asteapta reciproc. pool_timeout mic transforma blocajul in erori numarate.
+    """
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import sessionmaker
+    from database import SQLALCHEMY_DATABASE_URL
+    import schemas
+
+    engine_sync = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, pool_timeout=2,
+    )
+    SesiuneSync = sessionmaker(autoflush=False, bind=engine_sync)
+
+    def get_db_sync():
+        db = SesiuneSync()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/elevi/", response_model=list[schemas.Elev])
+    def read_elevi_sync(skip: int = 0, limit: int = 100, db=Depends(get_db_sync)):
+        return db.query(models.Elev).offset(skip).limit(limit).all()
+
+    return app
+
+
+async def _incarca(app, clienti, cereri_per_client):
+    import httpx
+
+    erori = 0
+
+    async def client(http):
+        nonlocal erori
+        for _ in range(cereri_per_client):
+            try:
+                r = await http.get("/elevi/", params={"limit": 50})
+                r.raise_for_status()
+            except Exception:
+                erori += 1
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(client(http) for _ in range(clienti)))
+            return time.perf_counter() - t0, erori
+    finally:
+        await engine_async.dispose()
+
+
+def bench_incarcare(cereri_per_client=5):
+    print(f"\n[incarcare] GET /elevi/?limit=50, {cereri_per_client} cereri per client")
+    db = SessionLocal()
+    try:
+        db.add_all([models.Elev(nume_complet=f"Elev incarcare {i}") for i in range(200)])
+        db.commit()
+    finally:
+        db.close()
+
+    aplicatii = (("sync (threadpool)", _aplicatie_sync()), ("async (aiosqlite)", main.app))
+    for clienti in (50, 200):
+        for nume, app in aplicatii:
+            durata, erori = asyncio.run(_incarca(app, clienti, cereri_per_client))
+            total = clienti * cereri_per_client
+            print(f"  {clienti:>3} clienti  {nume:<20} {total / durata:>8.0f} cereri/s  ({durata:.2f}s, erori {erori})")
+
+
+# ========================== GOOGLE CALENDAR (BATCH) ==========================
+
+def bench_calendar(nr_sesiuni=100, latenta_ms=80):
+    import calendar_stub
+    import google_calendar
+
+    print(f"\n[calendar] push a {nr_sesiuni} sesiuni noi in Google Calendar (stub local, {latenta_ms} ms / cerere HTTP)")
+    server, stub, endpoint = calendar_stub.porneste(latenta_s=latenta_ms / 1000)
+    google_calendar.API_ENDPOINT = endpoint
+    google_calendar.invalideaza_service()
+    db = SessionLocal()
+    try:
+        db.query(models.GoogleToken).delete()
+        # Salvarile lasate in outbox de benchmark-urile anterioare (ex: recurente) ar ajunge si ele la stub
+        db.query(models.OutboxCalendar).delete()
+        db.add(models.GoogleToken(access_token="stub", token_uri="http://127.0.0.1/token", scopes="[]"))
+        profesor = models.Profesor(nume_complet="Prof Calendar")
+        curs = models.Curs(nume_curs="Curs Calendar")
+        db.add_all([profesor, curs])
+        db.flush()
+        grupa = models.Grupa(nume_grupa="Grupa Calendar", curs_id=curs.id, profesor_titular_id=profesor.id)
+        db.add(grupa)
+        db.flush()
+
+        def semestru():
+            start = datetime(2026, 2, 2, 10)
+            sesiuni = [
+                models.Sesiune(grupa_id=grupa.id, profesor_id=profesor.id, tema_lectiei=f"Lectia {i}",
+                               data_ora_start=start + timedelta(days=7 * i),
+                               data_ora_end=start + timedelta(days=7 * i, hours=2))
+                for i in range(nr_sesiuni)
+            ]
+            db.add_all(sesiuni)
+            db.commit()
+            return sesiuni
+
+        # Inainte: create_sesiune trimitea cate un events().insert() per sesiune
+        sesiuni = semestru()
+        service = google_calendar.get_google_service(db)
+        cereri_inainte = stub.cereri_http
+        t0 = time.perf_counter()
+        for sesiune in sesiuni:
+            event = service.events().insert(calendarId='primary', body=google_calendar.corp_eveniment(sesiune)).execute()
+            sesiune.google_event_id = event['id']
+        db.commit()
+        durata = time.perf_counter() - t0
+        print(f"  {'inainte (o cerere/sesiune)':<28} {stub.cereri_http - cereri_inainte:>6} cereri HTTP  {durata * 1000:>9.1f} ms")
+
+        # Dupa: outbox + batch-uri de cate LOT operatii
+        sesiuni = semestru()
+        google_calendar.inregistreaza_salvare(db, [s.id for s in sesiuni])
+        db.commit()
+        cereri_inainte = stub.cereri_http
+        t0 = time.perf_counter()
+        while google_calendar.proceseaza_outbox(SessionLocal) != (0, 0):
+            pass
+        durata = time.perf_counter() - t0
+        print(f"  {'dupa (batch outbox)':<28} {stub.cereri_http - cereri_inainte:>6} cereri HTTP  {durata * 1000:>9.1f} ms")
+
+        db.expire_all()
+        fara_eveniment = sum(1 for s in sesiuni if not s.google_event_id)
+        assert fara_eveniment == 0, f"{fara_eveniment} sesiuni fara google_event_id"
+        assert len(stub.evenimente) == 2 * nr_sesiuni
+        print(f"  OK: toate cele {nr_sesiuni} sesiuni au google_event_id")
+    finally:
+        db.close()
+        server.shutdown()
+
+
+BENCHMARKS = {
+    "facturi": bench_facturi,
+    "catalog": bench_catalog,
+    "dashboard": bench_dashboard,
+    "kpi": bench_kpi,
+    "backup": bench_backup,
+    "snapshot": bench_snapshot,
+    "import": bench_import,
+    "cautare": bench_cautare,
+    "filtre": bench_filtre,
+    "recurente": bench_recurente,
+    "conflicte": bench_conflicte,
+    "facturare": bench_facturare,
+    "numerotare": bench_numerotare,
+    "plati": bench_plati,
+    "restante": bench_restante,
+    "concurenta": bench_concurenta,
+    "incarcare": bench_incarcare,
+    "calendar": bench_calendar,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark-uri CRM")
+    parser.add_argument("nume", nargs="*", help=f"benchmark-urile de rulat ({', '.join(BENCHMARKS)})")
+    args = parser.parse_args()
+
+    necunoscute = [n for n in args.nume if n not in BENCHMARKS]
+    if necunoscute:
+        parser.error(f"benchmark necunoscut: {', '.join(necunoscute)}")
+
+    for nume in args.nume or BENCHMARKS:
+        BENCHMARKS[nume]()
@@ -0,0 +1,124 @@
+"""Cache-uri in proces pentru lookup-uri frecvente.
+
+Cache-urile sunt invalidate automat prin evenimentele SQLAlchemy cand se scriu
+randurile din care provin, deci rutele nu trebuie sa le goleasca manual.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+
+
+class CacheLRU:
+    """Dictionar marginit (LRU), sigur pentru threadurile din threadpool-ul FastAPI."""
+
+    def __init__(self, capacitate=1024):
+        self.capacitate = capacitate
+        self._date = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cheie):
+        with self._lock:
+            if cheie not in self._date:
+                return None
+            self._date.move_to_end(cheie)
+            return self._date[cheie]
+
+    def set(self, cheie, valoare):
+        with self._lock:
+            self._date[cheie] = valoare
+            self._date.move_to_end(cheie)
+            while len(self._date) > self.capacitate:
+                self._date.popitem(last=False)
+
+    def invalideaza(self):
+        with self._lock:
+            self._date.clear()
+
+    def __len__(self):
+        return len(self._date)
+
+
+# nume_afisare -> client_id (folosit la facturi, unde clientul vine ca nume)
+clienti = CacheLRU(capacitate=2048)
+
+
+@event.listens_for(models.Client, "after_insert")
+@event.listens_for(models.Client, "after_update")
+@event.listens_for(models.Client, "after_delete")
+def _invalideaza_clienti(mapper, connection, target):
+    clienti.invalideaza()
+
+
+class CacheTTL:
+    """Valori care expira dupa `ttl_s` secunde (sau la invalidare).
+
+    `generatie` creste la fiecare invalidare: cine calculeaza o valoare o citeste
+    inainte de query-uri si o da la `set`, ca un rezultat calculat in timpul unei
+    scrieri sa nu fie pus in cache dupa invalidarea ei.
+    """
+
+    def __init__(self, ttl_s):
+        self.ttl_s = ttl_s
+        self.generatie = 0
+        self._date = {}
+        self._lock = threading.Lock()
+
+    def get(self, cheie):
+        with self._lock:
+            intrare = self._date.get(cheie)
+            if intrare is None or intrare[0] < time.monotonic():
+                return None
+            return intrare[1]
+
+    def set(self, cheie, valoare, generatie=None):
+        with self._lock:
+            if generatie is not None and generatie != self.generatie:
+                return
+            self._date[cheie] = (time.monotonic() + self.ttl_s, valoare)
+
+    def invalideaza(self):
+        with self._lock:
+            self.generatie += 1
+            self._date.clear()
+
+
+# Snapshot-ul dashboard-ului (cheie: ziua curenta)
+dashboard = CacheTTL(ttl_s=float(os.getenv("CRM_DASHBOARD_TTL_S", "30")))
+
+# Tabelele din care se calculeaza dashboard-ul
+MODELE_DASHBOARD = (models.Factura, models.Lead, models.Sesiune, models.Grupa, models.Elev)
+_TABELE_DASHBOARD = {model.__table__ for model in MODELE_DASHBOARD}
+_CHEIE_DASHBOARD = "cache_dashboard_modificat"
+
+
+# Dashboard-ul se invalideaza la commit (nu la flush), ca o citire concurenta sa nu
+# puna inapoi in cache starea dinaintea commit-ului
+@event.listens_for(Session, "after_flush")
+def _marcheaza_dashboard(session, flush_context):
+    if any(isinstance(o, MODELE_DASHBOARD) for o in itertools.chain(session.new, session.dirty, session.deleted)):
+        session.info[_CHEIE_DASHBOARD] = True
+
+
+# INSERT / UPDATE / DELETE in bloc (ex: sesiuni importate din Google) nu trec prin flush
+@event.listens_for(Session, "do_orm_execute")
+def _marcheaza_dashboard_bulk(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    if getattr(orm_execute_state.statement, "table", None) in _TABELE_DASHBOARD:
+        orm_execute_state.session.info[_CHEIE_DASHBOARD] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalideaza_dashboard(session):
+    if session.info.pop(_CHEIE_DASHBOARD, False):
+        dashboard.invalideaza()
+
+
+@event.listens_for(Session, "after_rollback")
+def _renunta_dashboard(session):
+    session.info.pop(_CHEIE_DASHBOARD, None)
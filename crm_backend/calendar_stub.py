@@ -0,0 +1,142 @@
+"""Server HTTP local care imita Google Calendar API v3 (subsetul folosit de CRM).
+
+Pentru benchmark-uri si teste offline: evenimentele stau in memorie, iar fiecare
+cerere HTTP (inclusiv un batch intreg) primeste o latenta artificiala, ca un
+round trip pana la Google.
+
+Rulare:
+    python calendar_stub.py --port 8099 --latenta-ms 80
+    CRM_CALENDAR_API_ENDPOINT=http://127.0.0.1:8099/calendar/v3/ uvicorn main:app
+
+Rute: insert / update / delete / list pe /calendar/v3/calendars/{id}/events si
+batch-ul multipart pe /batch/calendar/v3.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+RUTA_EVENIMENTE = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+GRANITA = "batch_crm_stub"
+
+
+class CalendarStub:
+    """Starea serverului: evenimentele si contoarele de cereri."""
+
+    def __init__(self, latenta_s=0.08):
+        self.latenta_s = latenta_s
+        self.evenimente = {}
+        self.cereri_http = 0
+        self.operatii = 0
+        self._id = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def executa(self, metoda, cale, corp):
+        """O operatie Calendar API -> (status, raspuns JSON sau None)."""
+        potrivire = RUTA_EVENIMENTE.match(urlsplit(cale).path)
+        if not potrivire:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        event_id = potrivire.group(2)
+        with self._lock:
+            self.operatii += 1
+            if metoda == "POST" and event_id is None:
+                eveniment = dict(corp, id=f"stub{next(self._id)}", status="confirmed")
+                self.evenimente[eveniment["id"]] = eveniment
+                return 200, eveniment
+            if metoda == "GET" and event_id is None:
+                return 200, {"items": list(self.evenimente.values()), "nextSyncToken": "stub"}
+            if event_id not in self.evenimente:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if metoda in ("PUT", "PATCH"):
+                self.evenimente[event_id] = dict(corp, id=event_id, status="confirmed")
+                return 200, self.evenimente[event_id]
+            if metoda == "DELETE":
+                del self.evenimente[event_id]
+                return 204, None
+            if metoda == "GET":
+                return 200, self.evenimente[event_id]
+        return 405, {"error": {"code": 405, "message": "Method Not Allowed"}}
+
+    def executa_batch(self, content_type, corp):
+        """Imparte un batch multipart/mixed in operatii si construieste raspunsul multipart."""
+        mesaj = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + corp
+        )
+        parti = []
+        for parte in mesaj.iter_parts():
+            cerere = parte.get_payload(decode=True).decode()
+            antet, _, corp_cerere = cerere.replace("\r\n", "\n").partition("\n\n")
+            metoda, cale, _ = antet.split("\n", 1)[0].split(" ", 2)
+            status, raspuns = self.executa(metoda, cale, json.loads(corp_cerere) if corp_cerere.strip() else None)
+            continut = json.dumps(raspuns) if raspuns is not None else ""
+            parti.append(
+                f"--{GRANITA}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{parte['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{continut}\r\n"
+            )
+        return "".join(parti) + f"--{GRANITA}--\r\n"
+
+
+def _handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _raspunde(self, status, corp, content_type="application/json; charset=UTF-8"):
+            date = corp.encode() if corp else b""
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(date)))
+            self.end_headers()
+            self.wfile.write(date)
+
+        def _proceseaza(self):
+            lungime = int(self.headers.get("Content-Length") or 0)
+            corp = self.rfile.read(lungime) if lungime else b""
+            with stub._lock:
+                stub.cereri_http += 1
+            time.sleep(stub.latenta_s)
+
+            if urlsplit(self.path).path == "/batch/calendar/v3":
+                raspuns = stub.executa_batch(self.headers["Content-Type"], corp)
+                return self._raspunde(200, raspuns, f"multipart/mixed; boundary={GRANITA}")
+            status, raspuns = stub.executa(self.command, self.path, json.loads(corp) if corp else None)
+            self._raspunde(status, json.dumps(raspuns) if raspuns is not None else "")
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _proceseaza
+
+    return Handler
+
+
+def porneste(port=0, latenta_s=0.08):
+    """Porneste serverul intr-un thread. Returneaza (server, stub, endpoint pentru CRM_CALENDAR_API_ENDPOINT)."""
+    stub = CalendarStub(latenta_s)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub, f"http://127.0.0.1:{server.server_address[1]}/calendar/v3/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server local care imita Google Calendar API v3")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latenta-ms", type=float, default=80, help="latenta per cerere HTTP")
+    args = parser.parse_args()
+
+    server, stub, endpoint = porneste(args.port, args.latenta_ms / 1000)
+    print(f"Calendar stub pe {endpoint} (latenta {args.latenta_ms:.0f} ms)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
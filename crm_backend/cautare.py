@@ -0,0 +1,229 @@
+"""Cautare full-text (SQLite FTS5) peste parteneri, elevi, leaduri si clienti.
+
+Doua tabele virtuale, tinute la zi de trigger-e pe tabelele sursa:
+- `cautare_fts` (tokenizer unicode61 fara diacritice, index de prefix): numele si
+  detaliile (telefoane, emailuri, scoala, note); raspunde la cautarea normala,
+  cu potrivire pe prefix ("ion pop" gaseste "Ionescu Popa");
+- `cautare_trigram` (tokenizer trigram): doar numele; cand cautarea normala da
+  prea putine rezultate, se cauta dupa trigrame comune, ca greselile de tastare
+  ("Popesku") sa gaseasca totusi numele.
+
+Ambele folosesc rowid = id * 8 + codul entitatii, deci trigger-ele sterg si
+rescriu randul direct dupa rowid.
+
+Rulare din linia de comanda:
+    python cautare.py --reconstruieste   # reindexeaza totul de la zero
+    python cautare.py "ion pop"          # cautare de proba
+"""
+import difflib
+import re
+import unicodedata
+from sqlalchemy import text
+
+# entitate -> (cod in rowid, coloana cu numele, coloanele de detalii, coloanele cu telefoane)
+SURSE = {
+    "elevi": (1, "nume_complet",
+              ("nume_parinte", "telefon_parinte", "email_parinte", "scoala_curenta", "note"), ("telefon_parinte",)),
+    "parteneri": (2, "nume",
+                  ("oras", "persoana_contact", "telefon", "email", "cui_fiscal", "note"), ("telefon",)),
+    "leaduri": (3, "nume_contact",
+                ("telefon_contact", "email_contact", "sursa_lead", "note"), ("telefon_contact",)),
+    "clienti": (4, "nume_afisare",
+                ("cui_cnp", "email_facturare", "telefon_facturare", "adresa_facturare"), ("telefon_facturare",)),
+}
+ENTITATE_DUPA_COD = {cod: entitate for entitate, (cod, *_) in SURSE.items()}
+
+TABELE_FTS = {
+    "cautare_fts": (
+        "CREATE VIRTUAL TABLE cautare_fts USING fts5("
+        "titlu, detalii, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ),
+    "cautare_trigram": "CREATE VIRTUAL TABLE cautare_trigram USING fts5(titlu, tokenize = 'trigram')",
+}
+
+# Ponderile bm25: o potrivire in nume conteaza mai mult decat una in detalii
+PONDERE_TITLU, PONDERE_DETALII = 10.0, 1.0
+# Asemanarea minima (0..1, difflib) dintre cuvintele cautate si cele din nume pentru un rezultat aproximativ
+PRAG_APROXIMATIV = 0.75
+
+
+def _expresii(tabela, r):
+    """(rowid, titlu, detalii) ca expresii SQL pentru randul `r` (NEW / OLD / numele tabelei)."""
+    cod, titlu, detalii, telefoane = SURSE[tabela]
+    parti = [f"coalesce({r}.{c}, '')" for c in detalii]
+    # Telefoanele se indexeaza si fara spatii / cratime, ca "0722123456" sa gaseasca "0722 123 456"
+    parti += [
+        f"replace(replace(replace(coalesce({r}.{c}, ''), ' ', ''), '-', ''), '.', '')" for c in telefoane
+    ]
+    return f"{r}.id * 8 + {cod}", f"{r}.{titlu}", " || ' ' || ".join(parti)
+
+
+def _insert(tabela, r):
+    rowid, titlu, detalii = _expresii(tabela, r)
+    return (
+        f"INSERT INTO cautare_fts (rowid, titlu, detalii) VALUES ({rowid}, {titlu}, {detalii}); "
+        f"INSERT INTO cautare_trigram (rowid, titlu) VALUES ({rowid}, {titlu}); "
+    )
+
+
+def _delete(tabela, r):
+    rowid = _expresii(tabela, r)[0]
+    return f"DELETE FROM cautare_fts WHERE rowid = {rowid}; DELETE FROM cautare_trigram WHERE rowid = {rowid}; "
+
+
+def _ddl_triggere(tabela):
+    _, titlu, detalii, _ = SURSE[tabela]
+    coloane = ", ".join((titlu, *detalii))
+    return {
+        f"trg_cautare_{tabela}_insert":
+            f"CREATE TRIGGER trg_cautare_{tabela}_insert AFTER INSERT ON {tabela} BEGIN {_insert(tabela, 'NEW')}END",
+        f"trg_cautare_{tabela}_update":
+            f"CREATE TRIGGER trg_cautare_{tabela}_update AFTER UPDATE OF {coloane} ON {tabela} "
+            f"BEGIN {_delete(tabela, 'OLD')}{_insert(tabela, 'NEW')}END",
+        f"trg_cautare_{tabela}_delete":
+            f"CREATE TRIGGER trg_cautare_{tabela}_delete AFTER DELETE ON {tabela} BEGIN {_delete(tabela, 'OLD')}END",
+    }
+
+
+# nume trigger -> DDL (aplicate de migrari.sincronizeaza_triggere)
+TRIGGERE = {nume: ddl for tabela in SURSE for nume, ddl in _ddl_triggere(tabela).items()}
+
+
+def reconstruieste(conn):
+    """Goleste si reface ambele indexuri din tabelele sursa (in tranzactia conexiunii date)."""
+    for tabela_fts in TABELE_FTS:
+        conn.exec_driver_sql(f"DELETE FROM {tabela_fts}")
+    total = 0
+    for tabela in SURSE:
+        rowid, titlu, detalii = _expresii(tabela, tabela)
+        total += conn.exec_driver_sql(
+            f"INSERT INTO cautare_fts (rowid, titlu, detalii) SELECT {rowid}, {titlu}, {detalii} FROM {tabela}"
+        ).rowcount
+        conn.exec_driver_sql(f"INSERT INTO cautare_trigram (rowid, titlu) SELECT {rowid}, {titlu} FROM {tabela}")
+    for tabela_fts in TABELE_FTS:
+        conn.exec_driver_sql(f"INSERT INTO {tabela_fts} ({tabela_fts}) VALUES ('optimize')")
+    return total
+
+
+# ========================== CAUTARE ==========================
+
+def _fara_diacritice(s):
+    return "".join(c for c in unicodedata.normalize("NFKD", s.lower()) if not unicodedata.combining(c))
+
+
+def cuvinte(q):
+    """Cuvintele din textul cautat (litere / cifre), fara operatorii sintaxei FTS5."""
+    return re.findall(r"\w+", q.lower())
+
+
+def _trigrame(cuvant):
+    cuvant = _fara_diacritice(cuvant)
+    return {cuvant[i:i + 3] for i in range(len(cuvant) - 2)}
+
+
+def _filtru_entitate(entitate):
+    if entitate is None:
+        return "", {}
+    return " AND rowid % 8 = :cod", {"cod": SURSE[entitate][0]}
+
+
+def _rezultat(rowid, titlu, fragment, scor, aproximativ):
+    """Scorul: mai mare = mai relevant (-bm25 pentru potriviri, asemanarea 0..1 pentru cele aproximative)."""
+    return {"entitate": ENTITATE_DUPA_COD[rowid % 8], "id": rowid // 8, "titlu": titlu,
+            "fragment": fragment, "scor": round(scor, 4), "aproximativ": aproximativ}
+
+
+def _interogare_exacta(cuvinte_q, entitate, limit):
+    filtru, parametri = _filtru_entitate(entitate)
+    sql = text(
+        "SELECT rowid, titlu, snippet(cautare_fts, 1, '', '', '…', 10), "
+        f"bm25(cautare_fts, {PONDERE_TITLU}, {PONDERE_DETALII}) AS scor "
+        f"FROM cautare_fts WHERE cautare_fts MATCH :q{filtru} ORDER BY scor LIMIT :limit"
+    )
+    # Fiecare cuvant intre ghilimele (fara operatori FTS5 din input) si cu '*' pentru prefix
+    q = " ".join(f'"{c}"*' for c in cuvinte_q)
+    return sql, {"q": q, "limit": limit, **parametri}
+
+
+def _interogare_aproximativa(trigrame, entitate, limit):
+    filtru, parametri = _filtru_entitate(entitate)
+    sql = text(
+        "SELECT rowid, titlu FROM cautare_trigram "
+        f"WHERE cautare_trigram MATCH :q{filtru} ORDER BY bm25(cautare_trigram) LIMIT :limit"
+    )
+    q = " OR ".join(f'"{t}"' for t in sorted(trigrame))
+    return sql, {"q": q, "limit": limit, **parametri}
+
+
+def _asemanare(cuvinte_q, titlu):
+    """Media, pe cuvintele cautate, a celei mai bune asemanari cu un cuvant din nume (fara diacritice)."""
+    cuvinte_titlu = cuvinte(_fara_diacritice(titlu))
+    if not cuvinte_titlu:
+        return 0.0
+    return sum(
+        max(difflib.SequenceMatcher(None, c, t).ratio() for t in cuvinte_titlu) for c in cuvinte_q
+    ) / len(cuvinte_q)
+
+
+def _filtreaza_aproximative(randuri, cuvinte_q, vazute, limit):
+    """Candidatii gasiti dupa trigrame, pastrati doar daca seamana destul cu cuvintele cautate."""
+    cuvinte_q = [_fara_diacritice(c) for c in cuvinte_q]
+    rezultate = []
+    for rowid, titlu in randuri:
+        if rowid in vazute or not titlu:
+            continue
+        asemanare = _asemanare(cuvinte_q, titlu)
+        if asemanare >= PRAG_APROXIMATIV:
+            rezultate.append(_rezultat(rowid, titlu, None, asemanare, True))
+    rezultate.sort(key=lambda r: -r["scor"])
+    return rezultate[:limit]
+
+
+async def cauta(db, q, entitate=None, limit=20):
+    """Rezultatele pentru `q`: intai potrivirile exacte / de prefix, apoi (daca nu ajung) cele aproximative."""
+    cuvinte_q = cuvinte(q)
+    if not cuvinte_q:
+        return []
+    sql, parametri = _interogare_exacta(cuvinte_q, entitate, limit)
+    rezultate = [
+        _rezultat(rowid, titlu, fragment, -scor, False)
+        for rowid, titlu, fragment, scor in (await db.execute(sql, parametri)).all()
+    ]
+
+    trigrame = set().union(*(_trigrame(c) for c in cuvinte_q))
+    if len(rezultate) < limit and trigrame:
+        sql, parametri = _interogare_aproximativa(trigrame, entitate, limit * 5)
+        vazute = {r["id"] * 8 + SURSE[r["entitate"]][0] for r in rezultate}
+        randuri = (await db.execute(sql, parametri)).all()
+        rezultate += _filtreaza_aproximative(randuri, cuvinte_q, vazute, limit - len(rezultate))
+    return rezultate
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    from database import AsyncSessionCitire, engine, engine_async
+    import migrari
+    import models
+
+    async def _cauta(q):
+        try:
+            async with AsyncSessionCitire() as db:
+                return await cauta(db, q)
+        finally:
+            # Altfel thread-ul conexiunii aiosqlite tine procesul deschis
+            await engine_async.dispose()
+
+    parser = argparse.ArgumentParser(description="Cautare full-text (FTS5)")
+    parser.add_argument("q", nargs="?", help="textul cautat")
+    parser.add_argument("--reconstruieste", action="store_true", help="reindexeaza totul de la zero")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    migrari.aplica_migrari(engine)
+    if args.reconstruieste:
+        with engine.begin() as conn:
+            print(f"OK: {reconstruieste(conn)} inregistrari indexate.")
+    if args.q:
+        for r in asyncio.run(_cauta(args.q)):
+            print(f"{'~' if r['aproximativ'] else ' '} {r['entitate']:<10} {r['id']:>7}  {r['titlu']}")
@@ -1,19 +1,115 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 # Aici specificăm unde va sta fișierul bazei de date (crm.db)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./crm.db"
+# Se poate schimba din variabila de mediu CRM_DATABASE_URL (ex: pentru teste / benchmark)
+SQLALCHEMY_DATABASE_URL = os.getenv("CRM_DATABASE_URL", "sqlite:///./crm.db")
 
-# Creăm motorul (Engine) care gestionează conexiunea
-# "check_same_thread": False este necesar doar pentru SQLite
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# --- PROFIL ENGINE (toate valorile pot fi suprascrise din variabile de mediu) ---
+# Cate conexiuni tine pool-ul deschise (+ cate poate deschide temporar peste)
+# 10 + 30 = 40, cat threadpool-ul implicit al Starlette: rutele sync nu pot epuiza pool-ul
+POOL_SIZE = int(os.getenv("CRM_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("CRM_DB_MAX_OVERFLOW", "30"))
+# WAL: cititorii nu mai asteapta dupa commit-uri, iar scrierile nu blocheaza citirile
+JOURNAL_MODE = os.getenv("CRM_DB_JOURNAL_MODE", "WAL")
+# NORMAL e sigur in modul WAL (nu corupe baza), doar ultimul commit poate fi pierdut la o pana de curent
+SYNCHRONOUS = os.getenv("CRM_DB_SYNCHRONOUS", "NORMAL")
+# Cat asteapta o conexiune dupa lock inainte de "database is locked"
+BUSY_TIMEOUT_MS = int(os.getenv("CRM_DB_BUSY_TIMEOUT_MS", "5000"))
+# Cache de pagini per conexiune (KB) si cat din fisier se citeste prin mmap (bytes)
+CACHE_SIZE_KB = int(os.getenv("CRM_DB_CACHE_SIZE_KB", "65536"))
+MMAP_SIZE = int(os.getenv("CRM_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+FOREIGN_KEYS = os.getenv("CRM_DB_FOREIGN_KEYS", "1") == "1"
+
+# Varianta async a URL-ului (driver aiosqlite), folosita de rutele de citire async
+ASYNC_DATABASE_URL = os.getenv(
+    "CRM_ASYNC_DATABASE_URL", SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 )
 
+
+def _este_sqlite_in_memorie(url):
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _configureaza_sqlite(dbapi_connection, read_only, journal_mode, in_memorie):
+    """PRAGMA-urile aplicate pe fiecare conexiune noua din pool."""
+    cursor = dbapi_connection.cursor()
+    if not in_memorie:
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    cursor.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if FOREIGN_KEYS else 'OFF'}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def creeaza_engine(url=SQLALCHEMY_DATABASE_URL, read_only=False, journal_mode=JOURNAL_MODE):
+    """Creeaza un engine cu profilul de productie (pentru SQLite: WAL + PRAGMA-uri).
+
+    read_only=True da un engine pentru rutele GET: orice scriere prin el esueaza.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+
+    in_memorie = _este_sqlite_in_memorie(url)
+    # "check_same_thread": False este necesar doar pentru SQLite
+    # "timeout" e echivalentul busy_timeout pentru driverul Python (in secunde)
+    connect_args = {"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000}
+    if in_memorie:
+        engine = create_engine(url, connect_args=connect_args)
+    else:
+        engine = create_engine(url, connect_args=connect_args, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+
+    @event.listens_for(engine, "connect")
+    def _la_conectare(dbapi_connection, connection_record):
+        _configureaza_sqlite(dbapi_connection, read_only, journal_mode, in_memorie)
+
+    return engine
+
+
+def creeaza_engine_async(url=ASYNC_DATABASE_URL, read_only=True):
+    """Engine async (aiosqlite) cu acelasi profil de PRAGMA-uri ca engine-ul sincron.
+
+    Implicit e read-only: il folosesc doar rutele GET portate pe async; scrierile
+    raman pe engine-ul sincron.
+    """
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True)
+
+    in_memorie = _este_sqlite_in_memorie(url)
+    connect_args = {"timeout": BUSY_TIMEOUT_MS / 1000}
+    if in_memorie:
+        engine = create_async_engine(url, connect_args=connect_args)
+    else:
+        engine = create_async_engine(url, connect_args=connect_args, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+
+    # Evenimentele de conectare se pun pe engine-ul sincron din spatele celui async
+    @event.listens_for(engine.sync_engine, "connect")
+    def _la_conectare(dbapi_connection, connection_record):
+        _configureaza_sqlite(dbapi_connection, read_only, JOURNAL_MODE, in_memorie)
+
+    return engine
+
+
+# Creăm motorul (Engine) care gestionează conexiunea
+engine = creeaza_engine()
+# Motor separat pentru citiri (rutele GET): conexiunile lui nu pot scrie
+engine_citire = creeaza_engine(read_only=True)
+
 # Creăm o "fabrică" de sesiuni. De fiecare dată când avem nevoie să vorbim cu DB,
 # folosim o instanță din SessionLocal.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionCitire = sessionmaker(autocommit=False, autoflush=False, bind=engine_citire)
+
+# Motor + sesiuni async pentru rutele de citire "fierbinti" (liste, catalog, dashboard)
+engine_async = creeaza_engine_async()
+AsyncSessionCitire = async_sessionmaker(engine_async, autoflush=False, expire_on_commit=False)
 
 # Base este clasa părinte pentru toate modelele (tabelele) pe care le vom crea ulterior
 Base = declarative_base()
@@ -25,4 +121,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# La fel, dar pe engine-ul read-only (pentru rutele care doar citesc)
+def get_db_citire():
+    db = SessionCitire()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Sesiune async (read-only) pentru rutele `async def`
+async def get_db_async():
+    async with AsyncSessionCitire() as db:
+        yield db
@@ -0,0 +1,311 @@
+"""Generarea in bloc a facturilor lunare, din contracte, inscrieri si prezente.
+
+Pretul vine din contractul grupei (`Contract.mod_calcul_pret` + `valoare`):
+- pausal: o linie pe luna pentru contract, la partener;
+- per_grupa: valoarea pe luna pentru o grupa (cu cel putin o sesiune in luna);
+- per_copil: valoarea pentru fiecare copil inscris activ;
+- per_prezenta: valoarea pentru fiecare prezenta din luna.
+Cine plateste o spune `Grupa.tip_plata_grupa`: scoala (o linie pe grupa la partener),
+parintii (o linie pe inscriere la clientul parintelui, cu `reducere_percent`) sau mixt
+(dupa `Inscriere.tip_plata` a fiecarui copil; implicit parintii). La per_grupa platit
+de parinti, valoarea se imparte egal intre copiii activi.
+
+Datele lunii se citesc cu cateva query-uri pe multimi, liniile se calculeaza
+vectorizat cu pandas, iar facturile si liniile se insereaza in bloc, intr-o singura
+tranzactie. Clientii care au deja o factura (neanulata) pe luna sunt sariti.
+"""
+import enum
+import itertools
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import exists, func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import luni
+import models
+import numerotare
+
+TERMEN_PLATA_ZILE = 15
+
+# Valorile text ale enum-urilor, asa cum apar in DataFrame-uri (vezi _cadru)
+PAUSAL = models.ModCalculPret.PAUSAL.value
+PER_GRUPA = models.ModCalculPret.PER_GRUPA.value
+PER_COPIL = models.ModCalculPret.PER_COPIL.value
+PER_PREZENTA = models.ModCalculPret.PER_PREZENTA.value
+SCOALA = models.TipPlataGrupa.PLATESTE_SCOALA.value
+MIXT = models.TipPlataGrupa.MIXT.value
+
+UNITATI = {
+    PAUSAL: "abonament lunar",
+    PER_GRUPA: "abonament grupa",
+    PER_COPIL: "per copil",
+    PER_PREZENTA: "per prezenta",
+}
+# Valorile din Inscriere.tip_plata care trimit plata la scoala, pentru grupele mixte
+PLATESTE_SCOALA = {SCOALA, "scoala"}
+
+COLOANE_LINII = ["partener_id", "elev_id", "grupa_id", "inscriere_id", "descriere_serviciu",
+                 "cantitate", "pret_unitar", "valoare_totala"]
+
+
+def parseaza_luna(text):
+    """'2026-03' -> (2026, 3); 400 pentru alt format."""
+    try:
+        zi = datetime.strptime(text, "%Y-%m").date()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Parametrul luna trebuie sa fie de forma YYYY-MM")
+    return zi.year, zi.month
+
+
+def _cadru(db, query, coloane):
+    cadru = pd.DataFrame(db.execute(query).all(), columns=coloane)
+    # Enum-urile devin valorile lor text: pandas nu compara sigur scalarii enum (str, Enum)
+    for coloana in coloane:
+        cadru[coloana] = cadru[coloana].map(lambda v: v.value if isinstance(v, enum.Enum) else v)
+    return cadru
+
+
+# ========================== CITIRE (query-uri pe multimi) ==========================
+
+def _contracte_active(start, end):
+    C = models.Contract
+    return select(C.id, C.partener_id, C.nume_contract, C.mod_calcul_pret, C.valoare).where(
+        C.partener_id.is_not(None),
+        C.valoare.is_not(None),
+        or_(C.status.is_(None), C.status != "expirat"),
+        or_(C.data_start.is_(None), C.data_start < end),
+        or_(C.data_expirare.is_(None), C.data_expirare >= start),
+    )
+
+
+def _citeste(db, start, end):
+    """DataFrame-urile lunii: contracte active, grupe facturabile, inscrieri active, prezente."""
+    G, S, I, E, P = models.Grupa, models.Sesiune, models.Inscriere, models.Elev, models.Prezenta
+    start_dt, end_dt = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    in_luna = [S.data_ora_start >= start_dt, S.data_ora_start < end_dt]
+
+    contracte = _cadru(db, _contracte_active(start, end),
+                       ["contract_id", "partener_id", "nume_contract", "mod", "valoare"])
+    # Grupele cu cel putin o sesiune neanulata in luna, pe contracte active (nu cele pausale)
+    grupe = _cadru(db, select(G.id, G.nume_grupa, G.contract_id, G.tip_plata_grupa).where(
+        G.contract_id.in_([int(c) for c in contracte.loc[contracte["mod"] != PAUSAL, "contract_id"]]),
+        G.status_grupa != models.StatusGrupa.ANULATA,
+        exists().where(S.grupa_id == G.id, S.status_sesiune != models.StatusSesiune.ANULATA, *in_luna),
+    ), ["grupa_id", "nume_grupa", "contract_id", "tip_plata_grupa"])
+    inscrieri = _cadru(db, select(I.id, I.grupa_id, I.elev_id, I.reducere_percent, I.tip_plata, E.nume_complet)
+                       .join(E, E.id == I.elev_id)
+                       .where(I.grupa_id.in_([int(g) for g in grupe["grupa_id"]]),
+                              I.status_inscriere == models.StatusInscriere.ACTIV,
+                              or_(I.data_inscriere.is_(None), I.data_inscriere < end)),
+                       ["inscriere_id", "grupa_id", "elev_id", "reducere_percent", "tip_plata", "nume_elev"])
+    prezente = _cadru(db, select(P.inscriere_id, func.count(P.id))
+                      .join(S, S.id == P.sesiune_id)
+                      .where(P.is_prezent.is_(True), *in_luna)
+                      .group_by(P.inscriere_id),
+                      ["inscriere_id", "nr_prezente"])
+    return contracte, grupe, inscrieri, prezente
+
+
+# ========================== CALCUL (vectorizat) ==========================
+
+def calculeaza_linii(contracte, grupe, inscrieri, prezente, perioada):
+    """Toate liniile de factura ale lunii (DataFrame cu COLOANE_LINII); partener_id / elev_id = cine plateste."""
+    bucati = []
+
+    # 1. Contractele pausale: o linie pe contract
+    pausal = contracte[contracte["mod"] == PAUSAL]
+    bucati.append(pd.DataFrame({
+        "partener_id": pausal["partener_id"], "elev_id": np.nan, "grupa_id": np.nan, "inscriere_id": np.nan,
+        "descriere_serviciu": UNITATI[PAUSAL] + " - " + pausal["nume_contract"].fillna("contract")
+                              + " - " + perioada,
+        "cantitate": 1.0, "pret_unitar": pausal["valoare"].astype(float),
+    }))
+
+    grupe = grupe.merge(contracte[["contract_id", "partener_id", "mod", "valoare"]], on="contract_id")
+    grupe["valoare"] = grupe["valoare"].astype(float)
+    grupe["unitate"] = grupe["mod"].map(UNITATI)
+
+    # 2. per_grupa platit integral de scoala: o linie pe grupa, chiar si fara copii inscrisi
+    intregi = (grupe["mod"] == PER_GRUPA) & (
+        grupe["tip_plata_grupa"] == SCOALA)
+    g = grupe[intregi]
+    bucati.append(pd.DataFrame({
+        "partener_id": g["partener_id"], "elev_id": np.nan, "grupa_id": g["grupa_id"], "inscriere_id": np.nan,
+        "descriere_serviciu": g["nume_grupa"].fillna("Grupa") + " (" + g["unitate"] + ") - " + perioada,
+        "cantitate": 1.0, "pret_unitar": g["valoare"],
+    }))
+
+    # 3. Restul, pornind de la inscrieri: cantitatea si pretul fiecarui copil
+    df = inscrieri.merge(grupe[~intregi], on="grupa_id").merge(prezente, on="inscriere_id", how="left")
+    df["nr_prezente"] = df["nr_prezente"].fillna(0).astype(float)
+    df["nr_activi"] = df.groupby("grupa_id")["inscriere_id"].transform("size").astype(float)
+    df["cantitate"] = np.where(df["mod"] == PER_PREZENTA, df["nr_prezente"], 1.0)
+    df["pret"] = np.where(df["mod"] == PER_GRUPA, df["valoare"] / df["nr_activi"], df["valoare"])
+    df["scoala"] = (df["tip_plata_grupa"] == SCOALA) | (
+        (df["tip_plata_grupa"] == MIXT) & df["tip_plata"].isin(PLATESTE_SCOALA))
+    df = df[df["cantitate"] > 0]
+
+    # 3a. Platite de parinti: o linie pe inscriere, cu reducerea inscrierii
+    p = df[~df["scoala"]]
+    reducere = p["reducere_percent"].astype(float).fillna(0).clip(0, 100)
+    bucati.append(pd.DataFrame({
+        "partener_id": np.nan, "elev_id": p["elev_id"], "grupa_id": p["grupa_id"], "inscriere_id": p["inscriere_id"],
+        "descriere_serviciu": p["nume_grupa"].fillna("Grupa") + " - " + p["nume_elev"].fillna("") + " ("
+                              + p["unitate"] + ") - " + perioada,
+        "cantitate": p["cantitate"], "pret_unitar": (p["pret"] * (1 - reducere / 100)).round(2),
+    }))
+
+    # 3b. Platite de scoala: cantitatile copiilor adunate intr-o linie pe grupa
+    s = df[df["scoala"]].assign(valoare_bruta=lambda x: x["cantitate"] * x["pret"])
+    s = s.groupby("grupa_id", as_index=False).agg(
+        partener_id=("partener_id", "first"), nume_grupa=("nume_grupa", "first"), unitate=("unitate", "first"),
+        cantitate=("cantitate", "sum"), valoare_bruta=("valoare_bruta", "sum"),
+    )
+    bucati.append(pd.DataFrame({
+        "partener_id": s["partener_id"], "elev_id": np.nan, "grupa_id": s["grupa_id"], "inscriere_id": np.nan,
+        "descriere_serviciu": s["nume_grupa"].fillna("Grupa") + " (" + s["unitate"] + ") - " + perioada,
+        "cantitate": s["cantitate"], "pret_unitar": (s["valoare_bruta"] / s["cantitate"]).round(2),
+    }))
+
+    bucati = [b for b in bucati if not b.empty]
+    linii = pd.concat(bucati, ignore_index=True) if bucati else pd.DataFrame(columns=COLOANE_LINII)
+    linii["pret_unitar"] = linii["pret_unitar"].astype(float).round(2)
+    linii["cantitate"] = linii["cantitate"].astype(float)
+    linii["valoare_totala"] = (linii["cantitate"] * linii["pret_unitar"]).round(2)
+    return linii.loc[linii["valoare_totala"] > 0, COLOANE_LINII].reset_index(drop=True)
+
+
+# ========================== CLIENTI ==========================
+
+def _clienti_existenti(db, coloana, valori):
+    """{partener_id / elev_id: id-ul clientului} (cel mai vechi client, daca sunt mai multi)."""
+    if not valori:
+        return {}
+    return dict(db.execute(
+        select(coloana, func.min(models.Client.id)).where(coloana.in_(valori)).group_by(coloana)
+    ).all())
+
+
+def _creeaza_clienti(db, parteneri_lipsa, elevi_lipsa):
+    """Clientii lipsa (partener -> client 'partener', elev -> client 'parinte'), cu un INSERT per tip."""
+    Pt, E = models.Partener, models.Elev
+    if parteneri_lipsa:
+        db.execute(insert(models.Client), [
+            dict(tip=models.TipClient.PARTENER, partener_id=r.id, nume_afisare=r.nume, cui_cnp=r.cui_fiscal,
+                 adresa_facturare=r.adresa_completa, email_facturare=r.email, telefon_facturare=r.telefon)
+            for r in db.execute(select(Pt.id, Pt.nume, Pt.cui_fiscal, Pt.adresa_completa, Pt.email, Pt.telefon)
+                                .where(Pt.id.in_(parteneri_lipsa)))
+        ])
+    if elevi_lipsa:
+        db.execute(insert(models.Client), [
+            dict(tip=models.TipClient.PARINTE, elev_id=r.id,
+                 nume_afisare=r.nume_parinte or f"Parinte {r.nume_complet}",
+                 email_facturare=r.email_parinte, telefon_facturare=r.telefon_parinte)
+            for r in db.execute(select(E.id, E.nume_parinte, E.nume_complet, E.email_parinte, E.telefon_parinte)
+                                .where(E.id.in_(elevi_lipsa)))
+        ])
+
+
+def _nume_platitori(db, parteneri, elevi):
+    """Numele afisate in simulare pentru platitorii fara client (cum ar fi creati)."""
+    nume = {("partener", i): n for i, n in db.execute(
+        select(models.Partener.id, models.Partener.nume).where(models.Partener.id.in_(parteneri)))}
+    nume.update({("elev", i): p or f"Parinte {e}" for i, p, e in db.execute(
+        select(models.Elev.id, models.Elev.nume_parinte, models.Elev.nume_complet).where(models.Elev.id.in_(elevi)))})
+    return nume
+
+
+# ========================== GENERARE ==========================
+
+def _linii_factura(linii):
+    """Liniile ca dict-uri pentru insert / raspuns (NaN -> None, tipuri Python), intr-o singura trecere."""
+    coloane = [linii[c].tolist() for c in ("descriere_serviciu", "cantitate", "pret_unitar", "valoare_totala",
+                                            "grupa_id", "inscriere_id")]
+    return [
+        {"descriere_serviciu": descriere, "cantitate": float(cantitate), "pret_unitar": float(pret),
+         "valoare_totala": float(valoare), "grupa_id": None if pd.isna(grupa_id) else int(grupa_id),
+         "inscriere_id": None if pd.isna(inscriere_id) else int(inscriere_id)}
+        for descriere, cantitate, pret, valoare, grupa_id, inscriere_id in zip(*coloane)
+    ]
+
+
+def genereaza(db, an, luna, simulare=False, data_emitere=None, termen_plata_zile=TERMEN_PLATA_ZILE):
+    """Facturile lunii `an`-`luna`; daca nu e simulare, le insereaza (commit inclus). Returneaza raportul."""
+    start, end = luni.limite_luna(date(an, luna, 1))
+    perioada = f"{luni.NUME_LUNI[luna - 1]} {an}"
+    data_emitere = data_emitere or date.today()
+    data_scadenta = data_emitere + timedelta(days=termen_plata_zile)
+
+    linii = calculeaza_linii(*_citeste(db, start, end), perioada)
+    parteneri = sorted({int(v) for v in linii["partener_id"].dropna()})
+    elevi = sorted({int(v) for v in linii["elev_id"].dropna()})
+    clienti_parteneri = _clienti_existenti(db, models.Client.partener_id, parteneri)
+    clienti_elevi = _clienti_existenti(db, models.Client.elev_id, elevi)
+
+    if not simulare:
+        _creeaza_clienti(db, [p for p in parteneri if p not in clienti_parteneri],
+                         [e for e in elevi if e not in clienti_elevi])
+        clienti_parteneri = _clienti_existenti(db, models.Client.partener_id, parteneri)
+        clienti_elevi = _clienti_existenti(db, models.Client.elev_id, elevi)
+    nume_platitori = _nume_platitori(db, parteneri, elevi)
+
+    # Cheia platitorului: ("partener", id) sau ("elev", id)
+    linii["platitor"] = [("partener", int(p)) if not np.isnan(p) else ("elev", int(e))
+                         for p, e in zip(linii["partener_id"], linii["elev_id"])]
+    linii["client_id"] = [clienti_parteneri.get(k[1]) if k[0] == "partener" else clienti_elevi.get(k[1])
+                          for k in linii["platitor"]]
+
+    # Clientii care au deja o factura neanulata pe luna nu se mai factureaza o data
+    luna_id = luni.get_or_create_luna_id(db, start) if not simulare else db.scalar(
+        select(models.Luna.id).where(models.Luna.cod_luna == luni.cod_luna(start)))
+    deja = set()
+    ids_clienti = [int(c) for c in linii["client_id"].dropna().unique()]
+    if luna_id is not None and ids_clienti:
+        deja = set(db.scalars(select(models.Factura.client_id.distinct()).where(
+            models.Factura.luna_id == luna_id, models.Factura.client_id.in_(ids_clienti),
+            models.Factura.status != models.StatusFactura.ANULATA,
+        )))
+    sarite = linii["client_id"].isin(deja)
+    clienti_sariti = sorted({nume_platitori.get(k, "") for k in linii.loc[sarite, "platitor"]})
+    linii = linii[~sarite]
+
+    # Gruparea pe platitor pe liste Python: un sub-cadru pandas per factura costa ~1 ms / factura
+    facturi = []
+    randuri = sorted(zip(linii["platitor"], linii["client_id"], _linii_factura(linii)), key=lambda r: r[0])
+    for platitor, grup in itertools.groupby(randuri, key=lambda r: r[0]):
+        grup = list(grup)
+        client_id = grup[0][1]
+        facturi.append({
+            "client_id": None if pd.isna(client_id) else int(client_id),
+            "client_nume": nume_platitori.get(platitor, ""),
+            "serie_numar": None,
+            "total_plata": round(sum(r[2]["valoare_totala"] for r in grup), 2),
+            "linii": [r[2] for r in grup],
+        })
+    raport = {
+        "luna": luni.cod_luna(start), "simulare": simulare, "data_emitere": data_emitere,
+        "data_scadenta": data_scadenta, "nr_facturi": len(facturi), "nr_linii": len(linii),
+        "total": round(sum(f["total_plata"] for f in facturi), 2), "clienti_deja_facturati": clienti_sariti,
+        "facturi": facturi,
+    }
+    if simulare:
+        return raport
+
+    if facturi:
+        numere, moneda = numerotare.aloca_numere(db, len(facturi))
+        for f, numar in zip(facturi, numere):
+            f["serie_numar"] = numar
+        # Id-urile se aloca crescator in ordinea VALUES (vezi planificare.genereaza)
+        ids = sorted(db.scalars(
+            sqlite_insert(models.Factura).returning(models.Factura.id),
+            [dict(serie_numar=f["serie_numar"], client_id=f["client_id"], luna_id=luna_id,
+                  data_emitere=data_emitere, data_scadenta=data_scadenta, total_plata=f["total_plata"],
+                  moneda=moneda, status=models.StatusFactura.EMISA)
+             for f in facturi],
+        ))
+        db.execute(insert(models.LinieFactura), [
+            dict(factura_id=factura_id, **linie) for f, factura_id in zip(facturi, ids) for linie in f["linii"]
+        ])
+    db.commit()
+    return raport
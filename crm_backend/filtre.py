@@ -0,0 +1,141 @@
+"""Filtrare si sortare pe server pentru rutele de listare.
+
+Fiecare ruta declara ce campuri se pot filtra si sorta (`Filtre`); orice alt
+parametru din query string este respins cu 400. Sintaxa:
+
+    ?status=nou                         egalitate
+    ?status__in=nou,contactat           IN
+    ?status__ne=anulata                 diferit
+    ?data_emitere__gte=2026-01-01       interval (gt, gte, lt, lte)
+    ?sort=-data_scadenta,serie_numar    ordonare ('-' = descrescator; id se adauga la final)
+
+Valorile se convertesc dupa tipul coloanei (enum-urile dupa valoare, datele ISO),
+deci ajung in SQL ca parametri pe coloana, iar predicatele pot folosi indexurile.
+"""
+import enum
+from datetime import date, datetime
+from decimal import InvalidOperation
+from fastapi import HTTPException
+import models
+
+# Parametrii rutelor de listare care nu sunt filtre
+PARAMETRI_REZERVATI = {"skip", "limit", "after", "sort"}
+
+OPERATORI = {
+    "eq": lambda c, v: c == v,
+    "ne": lambda c, v: c != v,
+    "in": lambda c, v: c.in_(v),
+    "gt": lambda c, v: c > v,
+    "gte": lambda c, v: c >= v,
+    "lt": lambda c, v: c < v,
+    "lte": lambda c, v: c <= v,
+}
+# Operatorii de interval au sens doar pe coloane ordonabile
+OPERATORI_INTERVAL = {"gt", "gte", "lt", "lte"}
+
+VALORI_BOOLEENE = {"true": True, "1": True, "da": True, "false": False, "0": False, "nu": False}
+
+
+def _converteste(coloana, text):
+    tip = coloana.type.python_type
+    try:
+        if issubclass(tip, enum.Enum):
+            return tip(text)
+        if tip is bool:
+            return VALORI_BOOLEENE[text.lower()]
+        if tip is datetime:
+            return datetime.fromisoformat(text)
+        if tip is date:
+            return date.fromisoformat(text)
+        return tip(text)
+    except (ValueError, KeyError, InvalidOperation):
+        raise HTTPException(status_code=400, detail=f"Valoare invalida pentru {coloana.key}: {text!r}")
+
+
+class Filtre:
+    """Campurile filtrabile / sortabile ale unei rute de listare."""
+
+    def __init__(self, model, campuri, sortari=()):
+        self.campuri = {nume: getattr(model, nume) for nume in campuri}
+        self.sortari = {nume: getattr(model, nume) for nume in (*campuri, *sortari, "id")}
+
+    def aplica(self, query, parametri):
+        """Adauga in WHERE filtrele din query string (un `QueryParams` / dict de liste)."""
+        for cheie in parametri.keys():
+            if cheie in PARAMETRI_REZERVATI:
+                continue
+            camp, _, operator = cheie.partition("__")
+            operator = operator or "eq"
+            coloana = self.campuri.get(camp)
+            if coloana is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Camp de filtrare necunoscut: {camp} (permise: {', '.join(self.campuri) or 'niciunul'})",
+                )
+            if operator not in OPERATORI:
+                raise HTTPException(status_code=400, detail=f"Operator necunoscut: {operator} (permise: {', '.join(OPERATORI)})")
+            tip = coloana.type.python_type
+            if operator in OPERATORI_INTERVAL and (tip is bool or issubclass(tip, enum.Enum)):
+                raise HTTPException(status_code=400, detail=f"Operatorul {operator} nu se aplica pe {camp}")
+
+            for text in parametri.getlist(cheie):
+                if operator == "in":
+                    valoare = [_converteste(coloana, t) for t in text.split(",") if t != ""]
+                else:
+                    valoare = _converteste(coloana, text)
+                query = query.where(OPERATORI[operator](coloana, valoare))
+        return query
+
+    def ordine(self, sort):
+        """Expresiile ORDER BY pentru `sort` ("-camp,camp2"); id e mereu ultima cheie (ordine stabila)."""
+        expresii, vazute = [], set()
+        for parte in (sort or "").split(","):
+            parte = parte.strip()
+            if not parte:
+                continue
+            camp = parte.lstrip("-")
+            coloana = self.sortari.get(camp)
+            if coloana is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Camp de sortare necunoscut: {camp} (permise: {', '.join(self.sortari)})",
+                )
+            if camp not in vazute:
+                vazute.add(camp)
+                expresii.append(coloana.desc() if parte.startswith("-") else coloana.asc())
+        if "id" not in vazute:
+            expresii.append(self.sortari["id"].asc())
+        return expresii
+
+
+def fara_sortare_cu_cursor(after, sort):
+    """Paginarea cursor (keyset) are cheile ei fixe: nu se combina cu `sort`."""
+    if after is not None and sort:
+        raise HTTPException(status_code=400, detail="Parametrul sort nu se poate folosi impreuna cu paginarea cursor (after)")
+
+
+# ruta de listare -> campurile filtrabile (si, pe langa ele, cele doar sortabile)
+PARTENERI = Filtre(models.Partener, ("tip", "status", "oras", "created_at"), sortari=("nume",))
+LEADURI = Filtre(
+    models.Lead,
+    ("status", "campanie_id", "partener_id", "sursa_lead", "created_at", "urmatorul_follow_up"),
+    sortari=("nume_contact",),
+)
+CONTRACTE = Filtre(
+    models.Contract, ("partener_id", "lead_id", "status", "data_semnarii", "data_expirare"), sortari=("valoare",)
+)
+ELEVI = Filtre(models.Elev, ("gdpr_accepted", "data_nasterii"), sortari=("nume_complet",))
+GRUPE = Filtre(
+    models.Grupa,
+    ("status_grupa", "curs_id", "profesor_titular_id", "contract_id", "data_inceput", "data_sfarsit"),
+    sortari=("nume_grupa",),
+)
+INSCRIERI = Filtre(models.Inscriere, ("grupa_id", "elev_id", "status_inscriere", "data_inscriere"))
+SESIUNI = Filtre(
+    models.Sesiune, ("grupa_id", "profesor_id", "sala", "status_sesiune", "data_ora_start"), sortari=("data_ora_end",)
+)
+FACTURI = Filtre(
+    models.Factura,
+    ("status", "client_id", "luna_id", "serie_numar", "data_emitere", "data_scadenta"),
+    sortari=("total_plata", "created_at"),
+)
@@ -0,0 +1,524 @@
+"""Sincronizarea sesiunilor cu Google Calendar printr-un outbox.
+
+Rutele nu mai vorbesc cu Google in timpul cererii: scriu un rand in
+`outbox_calendar` in aceeasi tranzactie cu sesiunea (`inregistreaza_salvare` /
+`inregistreaza_stergere`), iar un thread de fundal (`WorkerCalendar`) goleste
+outbox-ul in batch-uri Google de pana la 50 de operatii per round trip HTTP.
+Daca Google e lent sau pica, randul ramane in coada si se reincearca cu backoff
+exponential.
+
+Coalescare: o sesiune are cel mult o salvare in asteptare, rescrisa la fiecare
+modificare, iar stergerea sesiunii anuleaza salvarea. create + update + ...
+ajung la Google ca un singur apel; create + update + delete, niciunul daca
+evenimentul nu fusese inca creat.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from urllib.parse import urljoin
+from zoneinfo import ZoneInfo
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from sqlalchemy import bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import SessionLocal
+import models
+
+SALVEAZA = "salveaza"
+STERGE = "sterge"
+
+# Cat de des se uita worker-ul in outbox cand nu e trezit explicit (secunde)
+INTERVAL_S = float(os.getenv("CRM_CALENDAR_INTERVAL_S", "5"))
+# Backoff: prima reincercare dupa BACKOFF_BAZA_S, apoi dublu, plafonat la BACKOFF_MAX_S
+BACKOFF_BAZA_S = float(os.getenv("CRM_CALENDAR_BACKOFF_BAZA_S", "5"))
+BACKOFF_MAX_S = float(os.getenv("CRM_CALENDAR_BACKOFF_MAX_S", "3600"))
+# Cate randuri se proceseaza intr-o trecere (= un batch request; Google accepta maxim 50)
+LOT = min(int(os.getenv("CRM_CALENDAR_LOT", "50")), 50)
+# Worker-ul poate fi oprit (ex: pe o masina fara acces la Google)
+WORKER_ACTIV = os.getenv("CRM_CALENDAR_WORKER", "1") == "1"
+
+FUS_ORAR = "Europe/Bucharest"
+# Alt server pentru Calendar API (ex: calendar_stub.py la benchmark), implicit Google
+API_ENDPOINT = os.getenv("CRM_CALENDAR_API_ENDPOINT")
+# Evenimente per pagina la import (maximul acceptat de Google e 2500)
+PAGINA_IMPORT = int(os.getenv("CRM_CALENDAR_PAGINA_IMPORT", "250"))
+
+
+class _CredentialeSalvate(Credentials):
+    """Credentials care scriu inapoi in GoogleToken tokenul reimprospatat.
+
+    Altfel fiecare proces (si fiecare restart) ar reimprospata din nou tokenul expirat.
+    """
+
+    def refresh(self, request):
+        super().refresh(request)
+        with SessionLocal() as db:
+            valori = {"access_token": self.token, "expiry": self.expiry}
+            if self.refresh_token:
+                valori["refresh_token"] = self.refresh_token
+            # versiune ramane aceeasi: serviciul din cache are deja tokenul nou
+            db.query(models.GoogleToken).update(valori, synchronize_session=False)
+            db.commit()
+
+
+# Un serviciu per thread (clientul HTTP al googleapiclient nu e thread-safe),
+# refolosit cat timp tokenul din baza de date are aceeasi versiune
+_servicii = threading.local()
+_generatie = 0
+
+
+def invalideaza_service():
+    """Chemat la conectare / deconectare: toate thread-urile isi reconstruiesc serviciul."""
+    global _generatie
+    _generatie += 1
+
+
+def get_google_service(db):
+    """Returneaza serviciul Google Calendar sau None daca nu suntem logati."""
+    db_token = db.query(models.GoogleToken).first()
+    if not db_token:
+        return None
+
+    cheie = (db_token.id, db_token.versiune, _generatie)
+    if getattr(_servicii, "cheie", None) == cheie:
+        return _servicii.service
+
+    creds = _CredentialeSalvate(
+        token=db_token.access_token,
+        refresh_token=db_token.refresh_token,
+        token_uri=db_token.token_uri,
+        client_id=db_token.client_id,
+        client_secret=db_token.client_secret,
+        scopes=json.loads(db_token.scopes),
+        expiry=db_token.expiry,
+    )
+    # Documentul de discovery inclus in biblioteca: fara cerere HTTP la construire
+    client_options = {"api_endpoint": API_ENDPOINT} if API_ENDPOINT else None
+    service = build(
+        'calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False,
+        client_options=client_options,
+    )
+    _servicii.cheie, _servicii.service = cheie, service
+    return service
+
+
+def corp_eveniment(sesiune):
+    """Evenimentul Google pentru o sesiune din CRM."""
+    return {
+        'summary': f"{sesiune.tema_lectiei} (EduCRM)",
+        'location': sesiune.sala,
+        'description': f"Sesiune creata automat din EduCRM.\nStatus: {sesiune.status_sesiune}",
+        'start': {'dateTime': sesiune.data_ora_start.isoformat(), 'timeZone': FUS_ORAR},
+        'end': {'dateTime': sesiune.data_ora_end.isoformat(), 'timeZone': FUS_ORAR},
+    }
+
+
+def inregistreaza_salvare(db, sesiune_ids):
+    """Pune in outbox crearea/actualizarea evenimentelor. Fara commit: intra in tranzactia apelantului.
+
+    Daca o sesiune are deja o salvare in asteptare, randul existent e rescris
+    (coalescare): worker-ul va trimite doar ultima stare a sesiunii.
+    """
+    sesiune_ids = list(sesiune_ids)
+    if not sesiune_ids:
+        return
+    tabela = models.OutboxCalendar.__table__
+    acum = datetime.utcnow()
+    stmt = sqlite_insert(tabela).values([
+        dict(sesiune_id=sesiune_id, operatie=SALVEAZA, versiune=1, incercari=0,
+             urmatoarea_incercare=acum, created_at=acum)
+        for sesiune_id in sesiune_ids
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[tabela.c.sesiune_id],
+        index_where=tabela.c.operatie == SALVEAZA,
+        set_={
+            "versiune": tabela.c.versiune + 1,
+            "incercari": 0,
+            "urmatoarea_incercare": acum,
+            "ultima_eroare": None,
+        },
+    ))
+
+
+def inregistreaza_stergere(db, sesiune_id):
+    """Pune in outbox stergerea evenimentului; se cheama inainte de stergerea sesiunii, fara commit.
+
+    Salvarea in asteptare a sesiunii nu mai are rost si dispare. Stergerea intra
+    in coada doar daca evenimentul exista in Google: create + update + delete
+    inainte ca worker-ul sa ajunga la sesiune nu produc niciun apel.
+    """
+    Outbox = models.OutboxCalendar
+    db.query(Outbox).filter(Outbox.sesiune_id == sesiune_id, Outbox.operatie == SALVEAZA).delete(
+        synchronize_session=False
+    )
+    # ID-ul evenimentului se citeste in aceeasi instructiune de scriere, deci vede si
+    # un eveniment creat de worker chiar inainte de aceasta tranzactie
+    acum = datetime.utcnow()
+    db.execute(
+        insert(Outbox.__table__).from_select(
+            ["sesiune_id", "operatie", "google_event_id", "versiune", "incercari", "urmatoarea_incercare", "created_at"],
+            select(
+                models.Sesiune.id, literal(STERGE), models.Sesiune.google_event_id, literal(1), literal(0),
+                literal(acum), literal(acum),
+            ).where(models.Sesiune.id == sesiune_id, models.Sesiune.google_event_id.isnot(None)),
+        )
+    )
+
+
+def _backoff(incercari):
+    return timedelta(seconds=min(BACKOFF_BAZA_S * 2 ** (incercari - 1), BACKOFF_MAX_S))
+
+
+def _inexistent(eroare):
+    return isinstance(eroare, HttpError) and eroare.resp.status in (404, 410)
+
+
+def _lot_nou(service, callback):
+    """Un batch request Google (pana la LOT operatii intr-un singur round trip HTTP)."""
+    if API_ENDPOINT:
+        # new_batch_http_request ia adresa din documentul de discovery, nu din api_endpoint
+        return BatchHttpRequest(callback=callback, batch_uri=urljoin(API_ENDPOINT, "/batch/calendar/v3"))
+    return service.new_batch_http_request(callback=callback)
+
+
+def _cereri_lot(db, service, randuri):
+    """Cererea Google pentru fiecare rand de outbox: {id rand: (tip, cerere sau None)}.
+
+    Tipuri: "insert" / "update" / "delete"; cerere None inseamna ca nu e nimic de trimis
+    (sesiune stearsa intre timp, sau stergere pentru un eveniment care nu a fost creat).
+    """
+    evenimente = service.events()
+    sesiuni = {
+        s.id: s for s in db.query(models.Sesiune).filter(
+            models.Sesiune.id.in_([r.sesiune_id for r in randuri if r.operatie == SALVEAZA])
+        )
+    }
+    cereri = {}
+    for rand in randuri:
+        if rand.operatie == STERGE:
+            cerere = None
+            if rand.google_event_id:
+                cerere = evenimente.delete(calendarId='primary', eventId=rand.google_event_id)
+            cereri[rand.id] = ("delete", cerere)
+            continue
+
+        sesiune = sesiuni.get(rand.sesiune_id)
+        if sesiune is None:
+            cereri[rand.id] = ("update", None)
+        elif sesiune.google_event_id:
+            cereri[rand.id] = ("update", evenimente.update(
+                calendarId='primary', eventId=sesiune.google_event_id, body=corp_eveniment(sesiune)
+            ))
+        else:
+            cereri[rand.id] = ("insert", evenimente.insert(calendarId='primary', body=corp_eveniment(sesiune)))
+    return cereri
+
+
+def _trimite_lot(service, cereri):
+    """Trimite cererile intr-un singur batch. Returneaza {id rand: (raspuns, eroare)}."""
+    rezultate = {}
+    de_trimis = {id_rand: cerere for id_rand, (_, cerere) in cereri.items() if cerere is not None}
+    if not de_trimis:
+        return rezultate
+
+    def _la_raspuns(request_id, raspuns, eroare):
+        rezultate[int(request_id)] = (raspuns, eroare)
+
+    lot = _lot_nou(service, _la_raspuns)
+    for id_rand, cerere in de_trimis.items():
+        lot.add(cerere, request_id=str(id_rand))
+    try:
+        lot.execute()
+    except Exception as e:
+        # Batch-ul intreg a esuat (retea, autentificare): toate operatiile se reincearca
+        for id_rand in de_trimis:
+            rezultate.setdefault(id_rand, (None, e))
+    return rezultate
+
+
+def proceseaza_outbox(SessionFactory, limit=LOT):
+    """O trecere prin outbox: trimite randurile scadente intr-un batch. Returneaza (trimise, esuate).
+
+    Rezultatele se scriu intr-o singura tranzactie: google_event_id-urile primite,
+    randurile terminate (sterse doar daca nu au fost rescrise intre timp) si
+    reincercarile cu backoff pentru cele esuate.
+    """
+    Outbox = models.OutboxCalendar
+    tabela = Outbox.__table__
+    with SessionFactory() as db:
+        randuri = (
+            db.query(Outbox)
+            .filter(Outbox.urmatoarea_incercare <= datetime.utcnow())
+            .order_by(Outbox.urmatoarea_incercare)
+            .limit(limit)
+            .all()
+        )
+        if not randuri:
+            return 0, 0
+
+        service = get_google_service(db)
+        if service is None:
+            # Fara cont Google conectat nu avem ce sincroniza (ca inainte de outbox)
+            cereri, rezultate = {r.id: (None, None) for r in randuri}, {}
+        else:
+            cereri = _cereri_lot(db, service, randuri)
+            rezultate = _trimite_lot(service, cereri)
+
+        terminate, event_ids, reincercari = [], [], []
+        for rand in randuri:
+            tip, _ = cereri[rand.id]
+            raspuns, eroare = rezultate.get(rand.id, (None, None))
+            if eroare is not None and _inexistent(eroare):
+                if tip == "update":
+                    # Evenimentul a disparut din Google: trecerea urmatoare il creeaza din nou
+                    event_ids.append({"b_id": rand.sesiune_id, "b_event": None})
+                    continue
+                # Stergere: evenimentul nu mai exista, exact ce voiam
+                eroare = None
+            if eroare is not None:
+                incercari = rand.incercari + 1
+                reincercari.append({
+                    "b_id": rand.id, "b_versiune": rand.versiune, "incercari": incercari,
+                    "urmatoarea_incercare": datetime.utcnow() + _backoff(incercari),
+                    "ultima_eroare": str(eroare)[:1000],
+                })
+                print(f"⚠️ Eroare sync Google (sesiunea {rand.sesiune_id}, incercarea {incercari}): {eroare}")
+                continue
+            if tip == "insert" and raspuns is not None:
+                event_ids.append({"b_id": rand.sesiune_id, "b_event": raspuns['id']})
+            terminate.append({"b_id": rand.id, "b_versiune": rand.versiune})
+
+        sesiuni = models.Sesiune.__table__
+        if event_ids:
+            db.execute(
+                update(sesiuni).where(sesiuni.c.id == bindparam("b_id")).values(google_event_id=bindparam("b_event")),
+                event_ids,
+            )
+            # Sesiunile sterse cat timp asteptam dupa Google: evenimentele create pentru ele
+            # ar ramane orfane, deci le punem la sters
+            create = {p["b_id"]: p["b_event"] for p in event_ids if p["b_event"]}
+            existente = set(db.scalars(select(sesiuni.c.id).where(sesiuni.c.id.in_(create))))
+            acum = datetime.utcnow()
+            orfane = [
+                dict(sesiune_id=sesiune_id, operatie=STERGE, google_event_id=event_id, versiune=1,
+                     incercari=0, urmatoarea_incercare=acum, created_at=acum)
+                for sesiune_id, event_id in create.items() if sesiune_id not in existente
+            ]
+            if orfane:
+                db.execute(insert(tabela), orfane)
+        if terminate:
+            db.execute(
+                delete(tabela).where(tabela.c.id == bindparam("b_id"), tabela.c.versiune == bindparam("b_versiune")),
+                terminate,
+            )
+        if reincercari:
+            db.execute(
+                update(tabela)
+                .where(tabela.c.id == bindparam("b_id"), tabela.c.versiune == bindparam("b_versiune"))
+                .values(
+                    incercari=bindparam("incercari"),
+                    urmatoarea_incercare=bindparam("urmatoarea_incercare"),
+                    ultima_eroare=bindparam("ultima_eroare"),
+                ),
+                reincercari,
+            )
+        db.commit()
+    return len(terminate), len(reincercari)
+
+
+# ========================== IMPORT DIN GOOGLE ==========================
+
+class SyncTokenExpirat(Exception):
+    """Google a raspuns 410: sync token-ul nu mai e valid, trebuie reluat importul complet."""
+
+
+def _data_locala(moment):
+    """Campul start/end al unui eveniment Google -> datetime local, fara fus (ca in CRM)."""
+    if 'dateTime' in moment:
+        valoare = datetime.fromisoformat(moment['dateTime'])
+        if valoare.tzinfo is not None:
+            valoare = valoare.astimezone(ZoneInfo(FUS_ORAR)).replace(tzinfo=None)
+        return valoare
+    # Eveniment de o zi intreaga
+    return datetime.combine(date.fromisoformat(moment['date']), datetime.min.time())
+
+
+def _pagini_evenimente(service, sync_token):
+    """Genereaza paginile de evenimente una cate una: (evenimente, nextSyncToken sau None).
+
+    Fara sync token e un import complet al evenimentelor viitoare; cu sync token,
+    Google trimite doar evenimentele modificate/anulate de la ultimul import.
+    """
+    page_token = None
+    while True:
+        parametri = dict(calendarId='primary', singleEvents=True, maxResults=PAGINA_IMPORT, pageToken=page_token)
+        if sync_token:
+            parametri['syncToken'] = sync_token
+        else:
+            parametri['timeMin'] = datetime.utcnow().isoformat() + 'Z'
+        try:
+            pagina = service.events().list(**parametri).execute()
+        except HttpError as e:
+            if sync_token and e.resp.status == 410:
+                raise SyncTokenExpirat() from e
+            raise
+        yield pagina.get('items', []), pagina.get('nextSyncToken')
+        page_token = pagina.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def _aplica_pagina(db, evenimente, grupa_id, profesor_id, contor):
+    """Aplica o pagina de evenimente: un query IN pentru sesiunile existente, un INSERT pentru cele noi."""
+    import planificare  # planificare importa acest modul
+
+    ids = [e['id'] for e in evenimente]
+    existente = {
+        s.google_event_id: s
+        for s in db.query(models.Sesiune).filter(models.Sesiune.google_event_id.in_(ids))
+    }
+
+    noi = []
+    for event in evenimente:
+        sesiune = existente.get(event['id'])
+        if event.get('status') == 'cancelled':
+            # Evenimentele anulate vin doar cu ID-ul (fara titlu / ore)
+            if sesiune is not None and sesiune.status_sesiune != models.StatusSesiune.ANULATA:
+                sesiune.status_sesiune = models.StatusSesiune.ANULATA
+                contor["anulate"] += 1
+            continue
+
+        summary = event.get('summary', 'Fără Titlu')
+        # Ignoram evenimentele create tot de noi (cele care au (EduCRM) in titlu)
+        if "(EduCRM)" in summary:
+            continue
+
+        start = _data_locala(event['start'])
+        end = _data_locala(event['end'])
+        # Evenimentele de mai multe zile (concedii, tabere) nu sunt sesiuni; verificarea
+        # suprapunerilor presupune sesiuni de cel mult planificare.DURATA_MAXIMA
+        if end - start > planificare.DURATA_MAXIMA:
+            continue
+        if sesiune is None:
+            noi.append(dict(
+                grupa_id=grupa_id,
+                profesor_id=profesor_id,
+                data_ora_start=start,
+                data_ora_end=end,
+                sala="Google Calendar",
+                tema_lectiei=summary,
+                status_sesiune=models.StatusSesiune.PLANIFICATA,
+                note="Importat din Google",
+                google_event_id=event['id'],
+            ))
+        elif (sesiune.data_ora_start, sesiune.data_ora_end, sesiune.tema_lectiei) != (start, end, summary):
+            sesiune.data_ora_start = start
+            sesiune.data_ora_end = end
+            sesiune.tema_lectiei = summary
+            contor["actualizate"] += 1
+
+    # Sesiunile noi ale paginii intr-un singur INSERT (executemany)
+    if noi:
+        db.execute(insert(models.Sesiune), noi)
+        contor["noi"] += len(noi)
+
+
+def importa_evenimente(db, service, grupa_id, profesor_id):
+    """Import incremental din Google Calendar in sesiuni. Returneaza contorii (noi/actualizate/anulate).
+
+    Paginile se proceseaza pe rand si se commit-uie fiecare, deci memoria nu
+    depinde de marimea calendarului. Sync token-ul se salveaza doar dupa ultima
+    pagina; un import intrerupt se reia de la vechiul token (re-aplicarea e idempotenta).
+    Daca token-ul expira, importul se reia complet, iar contorii includ si paginile
+    deja aplicate inainte de expirare.
+    """
+    contor = {"noi": 0, "actualizate": 0, "anulate": 0}
+    db_token = db.query(models.GoogleToken).first()
+
+    while True:
+        try:
+            pagini = _pagini_evenimente(service, db_token.sync_token)
+            for evenimente, next_sync_token in pagini:
+                _aplica_pagina(db, evenimente, grupa_id, profesor_id, contor)
+                if next_sync_token:
+                    db_token.sync_token = next_sync_token
+                db.commit()
+            return contor
+        except SyncTokenExpirat:
+            # Fara sync token, importul complet nu mai poate ridica SyncTokenExpirat
+            db.rollback()
+            db_token.sync_token = None
+            db.commit()
+            print("Sync token expirat: reluam importul complet din Google Calendar.")
+
+
+def stare_outbox(db):
+    """Adancimea cozii si ultima eroare, pentru endpoint-ul de status."""
+    Outbox = models.OutboxCalendar
+    in_asteptare, cu_erori, cea_mai_veche = db.query(
+        func.count(Outbox.id),
+        func.count(Outbox.id).filter(Outbox.incercari > 0),
+        func.min(Outbox.created_at),
+    ).one()
+    ultima = (
+        db.query(Outbox.sesiune_id, Outbox.incercari, Outbox.urmatoarea_incercare, Outbox.ultima_eroare)
+        .filter(Outbox.ultima_eroare.isnot(None))
+        .order_by(Outbox.urmatoarea_incercare.desc())
+        .first()
+    )
+    return {
+        "in_asteptare": in_asteptare,
+        "cu_erori": cu_erori,
+        "cea_mai_veche": cea_mai_veche,
+        "ultima_eroare": dict(ultima._mapping) if ultima else None,
+        "worker_activ": worker.is_alive(),
+    }
+
+
+class WorkerCalendar:
+    """Thread de fundal care goleste outbox-ul. Clientul Google e sincron, deci un thread, nu un task async."""
+
+    def __init__(self, SessionFactory):
+        self.SessionFactory = SessionFactory
+        self._trezire = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._ruleaza, name="worker-calendar", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._trezire.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trezeste(self):
+        """Chemat dupa commit-ul unei sesiuni: proceseaza imediat, fara sa astepte intervalul."""
+        self._trezire.set()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ruleaza(self):
+        while not self._stop.is_set():
+            self._trezire.clear()
+            try:
+                trimise, esuate = proceseaza_outbox(self.SessionFactory)
+            except Exception as e:
+                print(f"⚠️ Worker calendar: {e}")
+                trimise = esuate = 0
+            # Lot plin: pot fi si alte randuri scadente, continuam fara pauza
+            if trimise + esuate < LOT:
+                self._trezire.wait(INTERVAL_S)
+
+
+worker = WorkerCalendar(SessionLocal)
@@ -0,0 +1,198 @@
+"""Import in bloc din CSV / XLSX pentru elevi, parteneri si leaduri.
+
+Fisierul se citeste rand cu rand (CSV prin csv.reader, XLSX cu openpyxl in modul
+read_only), fiecare rand se valideaza cu schema `*Create` a entitatii, iar randurile
+valide se insereaza cu executemany in loturi de CRM_IMPORT_LOT, cate o tranzactie
+per lot. Randurile invalide nu opresc importul: apar in raportul de erori cu
+numarul lor din fisier (antetul e randul 1; in CSV, linia pe care incepe randul,
+chiar daca un camp intre ghilimele se intinde pe mai multe linii). CSV-urile pot fi in UTF-8 sau in cp1250
+(codificarea in care salveaza Excel in romana).
+"""
+import codecs
+import csv
+import io
+import os
+import zipfile
+from datetime import date, datetime
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+import models
+import schemas
+
+LOT = int(os.getenv("CRM_IMPORT_LOT", "1000"))
+# Cate randuri invalide se descriu in raport (restul doar se numara)
+MAX_ERORI_RAPORTATE = int(os.getenv("CRM_IMPORT_MAX_ERORI", "1000"))
+
+# entitate din URL -> (model, schema de validare)
+ENTITATI = {
+    "elevi": (models.Elev, schemas.ElevCreate),
+    "parteneri": (models.Partener, schemas.PartenerCreate),
+    "leaduri": (models.Lead, schemas.LeadCreate),
+}
+
+VALORI_BOOLEENE = {"da": True, "nu": False}
+
+# Codificarile incercate pentru CSV, in ordine: UTF-8 (cu sau fara BOM), apoi Windows-1250
+CODIFICARI_CSV = ("utf-8-sig", "cp1250")
+
+
+def _text(valoare):
+    """Celulele XLSX ajung la validare ca text, la fel ca cele din CSV."""
+    if valoare is None:
+        return None
+    if isinstance(valoare, datetime):
+        return valoare.date().isoformat() if valoare.time() == datetime.min.time() else valoare.isoformat()
+    if isinstance(valoare, date):
+        return valoare.isoformat()
+    if isinstance(valoare, float) and valoare.is_integer():
+        return str(int(valoare))
+    return str(valoare)
+
+
+def _codificare(fisier):
+    """UTF-8 sau, altfel, cp1250 (Excel in romana); fisierul se verifica pe bucati, inainte de import."""
+    for codificare in CODIFICARI_CSV:
+        decodor = codecs.getincrementaldecoder(codificare)()
+        try:
+            while bucata := fisier.read(1 << 16):
+                decodor.decode(bucata)
+            decodor.decode(b"", final=True)
+            return codificare
+        except UnicodeDecodeError:
+            continue
+        finally:
+            fisier.seek(0)
+    raise HTTPException(
+        status_code=400, detail=f"Fisierul CSV nu este text valid in niciuna din codificarile: {', '.join(CODIFICARI_CSV)}"
+    )
+
+
+def _randuri_csv(fisier):
+    text = io.TextIOWrapper(fisier, encoding=_codificare(fisier), newline="")
+    # Separatorul se alege din antet: Excel in romana salveaza CSV-urile cu ';'
+    antet = text.readline()
+    separator = max(",;\t", key=antet.count)
+    text.seek(0)
+    cititor = csv.reader(text, delimiter=separator)
+    linie = 1
+    for rand in cititor:
+        # line_num = ultima linie citita; randul incepe dupa sfarsitul celui anterior
+        yield linie, rand
+        linie = cititor.line_num + 1
+
+
+def _randuri_xlsx(fisier):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        registru = load_workbook(fisier, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        # Nu e o arhiva XLSX (fisier redenumit, corupt sau alt format)
+        raise HTTPException(status_code=400, detail="Fisierul XLSX nu poate fi citit")
+
+    def _randuri():
+        try:
+            # iter_rows porneste de la randul 1, inclusiv randurile goale de la inceput
+            for nr_rand, rand in enumerate(registru.worksheets[0].iter_rows(values_only=True), start=1):
+                yield nr_rand, [_text(v) for v in rand]
+        finally:
+            registru.close()
+
+    return _randuri()
+
+
+def citeste_randuri(fisier, nume_fisier):
+    """Randurile brute ale fisierului, dupa extensie: (numarul randului in fisier, valori); primul = antetul."""
+    extensie = os.path.splitext(nume_fisier or "")[1].lower()
+    if extensie == ".csv":
+        return _randuri_csv(fisier)
+    if extensie in (".xlsx", ".xlsm"):
+        return _randuri_xlsx(fisier)
+    raise HTTPException(status_code=400, detail="Format nesuportat (se accepta .csv si .xlsx)")
+
+
+def _antet(rand, schema):
+    """Normalizeaza antetul si verifica coloanele obligatorii. -> (coloane, coloane ignorate)."""
+    coloane = [(c or "").strip().lower() for c in rand]
+    campuri = schema.model_fields
+    lipsa = [nume for nume, camp in campuri.items() if camp.is_required() and nume not in coloane]
+    if lipsa:
+        raise HTTPException(status_code=400, detail=f"Lipsesc coloanele obligatorii: {', '.join(lipsa)}")
+    return coloane, [c for c in coloane if c and c not in campuri]
+
+
+def _valideaza(schema, coloane, rand):
+    """Un rand din fisier -> dict pentru insert (ridica ValidationError)."""
+    valori = {}
+    for coloana, valoare in zip(coloane, rand):
+        if coloana not in schema.model_fields:
+            continue
+        if isinstance(valoare, str):
+            valoare = valoare.strip() or None
+        if valoare is not None and schema.model_fields[coloana].annotation is bool:
+            valoare = VALORI_BOOLEENE.get(valoare.lower(), valoare)
+        if valoare is not None:
+            valori[coloana] = valoare
+    return schema.model_validate(valori).model_dump()
+
+
+def _fk_inexistente(db, model, lot):
+    """Pentru randurile din lot: {pozitie in lot: mesaj} pentru cheile straine care nu exista."""
+    erori = {}
+    for fk in model.__table__.foreign_keys:
+        coloana, tinta = fk.parent.name, fk.column
+        valori = {r[coloana] for _, r in lot if r.get(coloana) is not None}
+        if not valori:
+            continue
+        existente = set(db.scalars(select(tinta).where(tinta.in_(valori))))
+        for i, (_, r) in enumerate(lot):
+            if r.get(coloana) is not None and r[coloana] not in existente:
+                erori[i] = f"{coloana}: nu exista {tinta.table.name} cu id {r[coloana]}"
+    return erori
+
+
+def importa(db, entitate, randuri, lot_marime=LOT):
+    """Valideaza si insereaza randurile; face commit dupa fiecare lot. Returneaza raportul."""
+    model, schema = ENTITATI[entitate]
+    raport = {"entitate": entitate, "randuri_citite": 0, "inserate": 0, "respinse": 0,
+              "coloane_ignorate": [], "erori": []}
+
+    def _respinge(nr_rand, mesaje):
+        raport["respinse"] += 1
+        if len(raport["erori"]) < MAX_ERORI_RAPORTATE:
+            raport["erori"].append({"rand": nr_rand, "erori": mesaje})
+
+    def _insereaza(lot):
+        erori_fk = _fk_inexistente(db, model, lot)
+        for i in sorted(erori_fk):
+            _respinge(lot[i][0], [erori_fk[i]])
+        valide = [r for i, (_, r) in enumerate(lot) if i not in erori_fk]
+        if valide:
+            db.execute(insert(model), valide)
+            db.commit()
+            raport["inserate"] += len(valide)
+
+    randuri = iter(randuri)
+    _, antet = next(randuri, (None, None))
+    if antet is None:
+        raise HTTPException(status_code=400, detail="Fisierul este gol")
+    coloane, raport["coloane_ignorate"] = _antet(antet, schema)
+
+    lot = []
+    for nr_rand, rand in randuri:
+        if not any(v not in (None, "") for v in rand):
+            continue
+        raport["randuri_citite"] += 1
+        try:
+            lot.append((nr_rand, _valideaza(schema, coloane, rand)))
+        except ValidationError as e:
+            _respinge(nr_rand, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()])
+        if len(lot) >= lot_marime:
+            _insereaza(lot)
+            lot = []
+    if lot:
+        _insereaza(lot)
+    raport["erori"].sort(key=lambda e: e["rand"])
+    return raport
@@ -0,0 +1,377 @@
+"""Importul extraselor bancare (CSV / XLSX / MT940) si reconcilierea incasarilor cu facturile.
+
+Extrasul se citeste rand cu rand. Fiecare incasare se potriveste cu facturile
+deschise (emise, cu scadenta depasita sau platite partial) prin dictionare construite
+o singura data, la inceputul importului:
+1. numarul facturii din referinta / detalii ("EDU-007", "edu 7", "EDU0007");
+2. CUI-ul / CNP-ul clientului (coloana din extras sau un numar din detalii): suma merge
+   pe factura clientului cu exact acest rest de plata, altfel pe facturile lui in
+   ordinea scadentelor (surplusul ramane pe ultima);
+3. doar suma: factura deschisa cu exact acest rest de plata, daca e una singura.
+Incasarile deja importate se sar, deci acelasi extras importat de doua ori nu dubleaza
+platile: dupa referinta bancara (plati.referinta_plata) sau, pentru liniile fara
+referinta, dupa (data, suma, platitor + detalii). Doua linii fara referinta identice
+pe aceste trei campuri conteaza ca duplicat.
+
+Platile se insereaza cu executemany, iar statusul facturilor atinse se recalculeaza
+cu un singur UPDATE (suma platilor fata de total_plata), totul intr-o tranzactie.
+"""
+import io
+import itertools
+import os
+import re
+import unicodedata
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from fastapi import HTTPException
+from sqlalchemy import case, func, insert, literal, select, update
+import importuri
+import models
+
+METODA_PLATA = "transfer bancar"
+# Statusurile pe care o incasare le poate schimba
+DESCHISE = (models.StatusFactura.EMISA, models.StatusFactura.SCADENTA_DEPASITA, models.StatusFactura.PLATITA_PARTIAL)
+
+# camp -> antetele acceptate (litere mici, fara diacritice)
+ALIASURI = {
+    "data_plata": ("data_plata", "data", "data operatiunii", "data tranzactiei", "data valutei",
+                   "booking date", "value date"),
+    "suma": ("suma", "suma_achitata", "credit", "incasari", "amount"),
+    "referinta": ("referinta", "referinta_plata", "referinta tranzactiei", "id tranzactie", "reference"),
+    "detalii": ("detalii", "descriere", "explicatii", "detalii tranzactie", "details", "description"),
+    "cui": ("cui", "cui_cnp", "cif", "cod fiscal", "cnp"),
+    "platitor": ("platitor", "nume platitor", "ordonator", "payer"),
+}
+OBLIGATORII = ("data_plata", "suma")
+EXTENSII_MT940 = (".sta", ".mt940", ".940", ".txt")
+
+FORMATE_DATA = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y")
+# Suma cu separator de mii si fara zecimale: "1.234", "12,500", "1.234.567"
+MII_RE = re.compile(r"[+-]?[1-9]\d{0,2}(?:([.,])\d{3})+")
+# Candidati pentru numar de factura: litere, separatori optionali, cifre ("EDU-007", "EDU 7")
+NUMAR_RE = re.compile(r"\b([A-Z]{1,10})[\s\-/]*(\d{1,9})\b")
+# Candidati pentru CUI (cu sau fara RO) / CNP in textul liber
+CUI_RE = re.compile(r"\b(?:RO)?\s?(\d{4,13})\b")
+
+# MT940: ":61:" = tranzactia (data, C/D, suma, tip, referinte), ":86:" = detaliile ei
+TAG_RE = re.compile(r"^:(\d{2}[A-Z]?):(.*)$")
+RAND_61 = re.compile(r"^(\d{6})(\d{4})?(RC|RD|C|D)[A-Z]?(\d+,\d*)(?:[NSF][A-Z0-9]{3})?([^/]*)(?://(.*))?$")
+
+
+# ========================== CITIRE ==========================
+
+def _fara_diacritice(s):
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def _bani(text):
+    """'1.234,56' / '1,234.56' / '1234.5' -> 123456 (bani). ValueError daca nu e o suma.
+
+    Un singur tip de separator urmat de grupuri de exact trei cifre ('1.234', '12,500',
+    '1.234.567') e separator de mii, nu de zecimale.
+    """
+    text = re.sub(r"[\s']", "", text or "")
+    if "," in text and "." in text:
+        mii, zecimale = (".", ",") if text.rfind(",") > text.rfind(".") else (",", ".")
+        text = text.replace(mii, "").replace(zecimale, ".")
+    elif (grupat := MII_RE.fullmatch(text)) is not None:
+        text = text.replace(grupat.group(1), "")
+    else:
+        text = text.replace(",", ".")
+    try:
+        return int((Decimal(text) * 100).quantize(Decimal(1)))
+    except InvalidOperation:
+        raise ValueError(f"suma invalida: {text!r}")
+
+
+def _data(text):
+    for format_data in FORMATE_DATA:
+        try:
+            return datetime.strptime(text.strip(), format_data).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data invalida: {text!r}")
+
+
+def _coloane(antet):
+    """Antetul extrasului -> {camp: pozitie}; 400 daca lipsesc data sau suma."""
+    normalizate = [_fara_diacritice((c or "").strip().lower()) for c in antet]
+    pozitii = {}
+    for camp, aliasuri in ALIASURI.items():
+        for alias in aliasuri:
+            if alias in normalizate:
+                pozitii[camp] = normalizate.index(alias)
+                break
+    lipsa = [camp for camp in OBLIGATORII if camp not in pozitii]
+    if lipsa:
+        raise HTTPException(status_code=400, detail=f"Lipsesc coloanele obligatorii: {', '.join(lipsa)}")
+    return pozitii
+
+
+def _linii_tabel(randuri):
+    randuri = iter(randuri)
+    _, antet = next(randuri, (None, None))
+    if antet is None:
+        raise HTTPException(status_code=400, detail="Fisierul este gol")
+    pozitii = _coloane(antet)
+    for nr_rand, rand in randuri:
+        if not any(v not in (None, "") for v in rand):
+            continue
+        valori = dict.fromkeys(ALIASURI, "")
+        valori.update({camp: ((rand[i] if i < len(rand) else None) or "").strip() for camp, i in pozitii.items()})
+        try:
+            # Celula de credit goala = rand de debit (in extrasele cu coloane debit / credit separate)
+            suma = _bani(valori["suma"]) if valori["suma"] else 0
+            yield nr_rand, dict(valori, data_plata=_data(valori["data_plata"]), suma=suma), None
+        except ValueError as e:
+            yield nr_rand, None, str(e)
+
+
+def _linii_mt940(fisier):
+    text = io.TextIOWrapper(fisier, encoding="utf-8", errors="replace", newline="")
+    curenta, tag = None, None
+    for nr_rand, rand in enumerate(text, start=1):
+        rand = rand.rstrip("\r\n")
+        potrivire = TAG_RE.match(rand)
+        if potrivire is None:
+            # Continuarea tag-ului anterior (":86:" are de obicei mai multe linii)
+            if tag == "86" and curenta is not None:
+                curenta["detalii"] += " " + rand.strip()
+            continue
+        tag, valoare = potrivire.groups()
+        if tag == "61" or tag.startswith("62"):
+            if curenta is not None:
+                yield curenta.pop("rand"), curenta, None
+                curenta = None
+        if tag == "61":
+            tranzactie = RAND_61.match(valoare)
+            if tranzactie is None:
+                yield nr_rand, None, f"linie :61: nerecunoscuta: {valoare!r}"
+                continue
+            data_valuta, _, marcaj, suma, ref_client, ref_banca = tranzactie.groups()
+            # C = credit, RD = stornarea unui debit (tot o intrare de bani)
+            semn = 1 if marcaj in ("C", "RD") else -1
+            ref_client = ref_client.strip()
+            curenta = {
+                "rand": nr_rand,
+                "data_plata": datetime.strptime(data_valuta, "%y%m%d").date(),
+                "suma": semn * _bani(suma),
+                "referinta": (ref_banca or "").strip() or (ref_client if ref_client != "NONREF" else ""),
+                "detalii": "", "cui": "", "platitor": "",
+            }
+        elif tag == "86" and curenta is not None:
+            curenta["detalii"] = valoare.strip()
+    if curenta is not None:
+        yield curenta.pop("rand"), curenta, None
+
+
+def citeste_extras(fisier, nume_fisier):
+    """Liniile extrasului, dupa extensie: (nr rand, linie sau None, eroare sau None)."""
+    extensie = os.path.splitext(nume_fisier or "")[1].lower()
+    if extensie in EXTENSII_MT940:
+        return _linii_mt940(fisier)
+    if extensie in (".csv", ".xlsx", ".xlsm"):
+        return _linii_tabel(importuri.citeste_randuri(fisier, nume_fisier))
+    raise HTTPException(status_code=400, detail="Format nesuportat (se accepta .csv, .xlsx si MT940: .sta / .940 / .txt)")
+
+
+# ========================== POTRIVIRE ==========================
+
+def _cheie_numar(serie, numar):
+    """('edu', '007') -> ('EDU', 7): aceeasi cheie pentru 'EDU-007', 'EDU 7', 'edu0007'."""
+    return serie.upper(), int(numar)
+
+
+def _cheie_cui(text):
+    return re.sub(r"\D", "", text or "").lstrip("0")
+
+
+class Potrivire:
+    """Indexurile in memorie peste facturile deschise + restul de plata al fiecareia (in bani)."""
+
+    def __init__(self, db):
+        platit = (
+            select(models.Plata.factura_id, func.sum(models.Plata.suma_achitata).label("platit"))
+            .group_by(models.Plata.factura_id).subquery()
+        )
+        randuri = db.execute(
+            select(models.Factura.id, models.Factura.serie_numar, models.Factura.total_plata,
+                   func.coalesce(platit.c.platit, 0), models.Client.cui_cnp)
+            .outerjoin(models.Client, models.Client.id == models.Factura.client_id)
+            .outerjoin(platit, platit.c.factura_id == models.Factura.id)
+            .where(models.Factura.status.in_(DESCHISE))
+            .order_by(models.Factura.data_scadenta, models.Factura.id)
+        ).all()
+
+        self.rest = {}
+        self.dupa_numar, self.dupa_cui, self.dupa_suma = {}, {}, {}
+        for factura_id, serie_numar, total, platit_deja, cui in randuri:
+            self.rest[factura_id] = round((float(total or 0) - float(platit_deja)) * 100)
+            potrivire = NUMAR_RE.fullmatch((serie_numar or "").upper().strip())
+            if potrivire:
+                self.dupa_numar[_cheie_numar(*potrivire.groups())] = factura_id
+            if _cheie_cui(cui):
+                # In ordinea scadentelor (vezi ORDER BY)
+                self.dupa_cui.setdefault(_cheie_cui(cui), []).append(factura_id)
+            self._indexeaza_suma(factura_id)
+        self.importate = set(db.scalars(
+            select(models.Plata.referinta_plata.distinct()).where(models.Plata.referinta_plata.is_not(None))
+        ))
+        # Incasarile fara referinta: cheia pe fiecare plata si pe linia de extras (o linie
+        # repartizata pe mai multe facturi = mai multe plati cu aceeasi data si note)
+        Plata = models.Plata
+        fara_referinta = (Plata.referinta_plata.is_(None), Plata.metoda_plata == METODA_PLATA)
+        pe_plata = db.execute(select(Plata.data_plata, Plata.suma_achitata, Plata.note).where(*fara_referinta))
+        pe_linie = db.execute(
+            select(Plata.data_plata, func.sum(Plata.suma_achitata), Plata.note)
+            .where(*fara_referinta).group_by(Plata.data_plata, Plata.note)
+        )
+        self.importate.update(
+            (data_plata, round(float(suma or 0) * 100), note)
+            for data_plata, suma, note in itertools.chain(pe_plata, pe_linie)
+        )
+
+    def _indexeaza_suma(self, factura_id):
+        if self.rest[factura_id] > 0:
+            self.dupa_suma.setdefault(self.rest[factura_id], set()).add(factura_id)
+
+    def _scade(self, factura_id, bani):
+        self.dupa_suma.get(self.rest[factura_id], set()).discard(factura_id)
+        self.rest[factura_id] -= bani
+        self._indexeaza_suma(factura_id)
+
+    def _pe_numar(self, text, suma):
+        for potrivire in NUMAR_RE.finditer(text):
+            factura_id = self.dupa_numar.get(_cheie_numar(*potrivire.groups()))
+            if factura_id is not None:
+                return [(factura_id, suma)]
+        return None
+
+    def _pe_cui(self, cuiuri, suma):
+        for cui in cuiuri:
+            deschise = [f for f in self.dupa_cui.get(_cheie_cui(cui), ()) if self.rest[f] > 0]
+            if not deschise:
+                continue
+            exacta = next((f for f in deschise if self.rest[f] == suma), None)
+            if exacta is not None:
+                return [(exacta, suma)]
+            alocari, ramas = [], suma
+            for factura_id in deschise:
+                bani = min(ramas, self.rest[factura_id])
+                alocari.append((factura_id, bani))
+                ramas -= bani
+                if ramas == 0:
+                    break
+            if ramas:
+                factura_id, bani = alocari[-1]
+                alocari[-1] = (factura_id, bani + ramas)
+            return alocari
+        return None
+
+    def potriveste(self, linie):
+        """[(factura_id, bani)] pentru incasare, sau (None, motiv) daca nu se poate atribui."""
+        suma = linie["suma"]
+        text = f"{linie['referinta']} {linie['detalii']}".upper()
+        alocari = self._pe_numar(text, suma)
+        if alocari is None:
+            cuiuri = ([linie["cui"]] if linie["cui"] else []) + CUI_RE.findall(text)
+            alocari = self._pe_cui(cuiuri, suma)
+        if alocari is None:
+            candidate = self.dupa_suma.get(suma, ())
+            if len(candidate) > 1:
+                return None, f"{len(candidate)} facturi deschise au exact aceasta suma de plata"
+            if not candidate:
+                return None, "nicio factura deschisa cu acest numar, CUI sau suma"
+            alocari = [(next(iter(candidate)), suma)]
+        for factura_id, bani in alocari:
+            self._scade(factura_id, bani)
+        return alocari, None
+
+
+# ========================== IMPORT ==========================
+
+def _recalculeaza_statusuri(db, prag_id):
+    """Un singur UPDATE pentru facturile cu plati noi (id > prag_id): integral / partial dupa suma platilor."""
+    platit = (
+        select(func.coalesce(func.sum(models.Plata.suma_achitata), 0))
+        .where(models.Plata.factura_id == models.Factura.id).scalar_subquery()
+    )
+    tip_status = models.Factura.status.type
+    status_nou = case(
+        # Toleranta de o jumatate de ban pentru rotunjirile coloanei Numeric
+        (platit >= models.Factura.total_plata - 0.005, literal(models.StatusFactura.PLATITA_INTEGRAL, tip_status)),
+        (platit > 0, literal(models.StatusFactura.PLATITA_PARTIAL, tip_status)),
+        else_=models.Factura.status,
+    )
+    return db.execute(
+        update(models.Factura)
+        .where(models.Factura.id.in_(select(models.Plata.factura_id).where(models.Plata.id > prag_id)),
+               models.Factura.status.in_(DESCHISE))
+        .values(status=status_nou)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def importa(db, linii, lot_marime=importuri.LOT):
+    """Potriveste si insereaza incasarile extrasului, apoi actualizeaza statusurile (un commit). -> raport."""
+    raport = {"randuri_citite": 0, "incasari": 0, "debite_ignorate": 0, "duplicate": 0, "invalide": 0,
+              "potrivite": 0, "nepotrivite": 0, "plati_inserate": 0, "suma_potrivita": 0.0,
+              "facturi_actualizate": 0, "linii_nepotrivite": []}
+
+    def _raporteaza(nr_rand, linie, motiv):
+        if len(raport["linii_nepotrivite"]) < importuri.MAX_ERORI_RAPORTATE:
+            linie = linie or {}
+            raport["linii_nepotrivite"].append({
+                "rand": nr_rand, "data_plata": linie.get("data_plata"),
+                "suma": linie["suma"] / 100 if "suma" in linie else None,
+                "referinta": linie.get("referinta") or None, "detalii": linie.get("detalii") or None,
+                "motiv": motiv,
+            })
+
+    potrivire = Potrivire(db)
+    prag_id = db.scalar(select(func.coalesce(func.max(models.Plata.id), 0)))
+    importate_acum, lot, bani_potriviti = set(), [], 0
+    for nr_rand, linie, eroare in linii:
+        raport["randuri_citite"] += 1
+        if eroare:
+            raport["invalide"] += 1
+            _raporteaza(nr_rand, None, eroare)
+            continue
+        if linie["suma"] <= 0:
+            raport["debite_ignorate"] += 1
+            continue
+        raport["incasari"] += 1
+        referinta = linie["referinta"] or None
+        note = " ".join(filter(None, (linie["platitor"], linie["detalii"]))) or None
+        cheie = referinta or (linie["data_plata"], linie["suma"], note)
+        if cheie in potrivire.importate or cheie in importate_acum:
+            raport["duplicate"] += 1
+            continue
+        importate_acum.add(cheie)
+
+        alocari, motiv = potrivire.potriveste(linie)
+        if alocari is None:
+            raport["nepotrivite"] += 1
+            _raporteaza(nr_rand, linie, motiv)
+            continue
+        raport["potrivite"] += 1
+        bani_potriviti += linie["suma"]
+        lot.extend(
+            dict(factura_id=factura_id, data_plata=linie["data_plata"], suma_achitata=Decimal(bani) / 100,
+                 metoda_plata=METODA_PLATA, referinta_plata=referinta, note=note)
+            for factura_id, bani in alocari
+        )
+        if len(lot) >= lot_marime:
+            db.execute(insert(models.Plata), lot)
+            raport["plati_inserate"] += len(lot)
+            lot = []
+    if lot:
+        db.execute(insert(models.Plata), lot)
+        raport["plati_inserate"] += len(lot)
+
+    if raport["plati_inserate"]:
+        raport["facturi_actualizate"] = _recalculeaza_statusuri(db, prag_id)
+    db.commit()
+    raport["suma_potrivita"] = bani_potriviti / 100
+    raport["linii_nepotrivite"].sort(key=lambda l: l["rand"])
+    return raport
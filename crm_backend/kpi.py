@@ -0,0 +1,264 @@
+"""Agregatele lunare din `kpi_lunar`, mentinute incremental.
+
+Trigger-ele SQLite de pe tabelele sursa (prezente, facturi, plati, leaduri,
+contracte, sesiuni) noteaza in `kpi_luni_modificate` lunile atinse de fiecare
+INSERT / UPDATE / DELETE, indiferent daca scrierea vine prin ORM, in bloc sau
+din SQL direct. La commit-ul unei sesiuni care a scris in tabelele sursa,
+lunile notate se recalculeaza in aceeasi tranzactie, cu cate un query grupat pe
+luna per metrica, pe intervalul lunilor notate (foloseste indexurile pe date). Rapoartele citesc doar `kpi_lunar`.
+
+Rulare din linia de comanda:
+    python kpi.py                  # recalculeaza lunile notate ca modificate
+    python kpi.py --reconstruieste # recalculeaza toate lunile de la zero
+"""
+import argparse
+import itertools
+from datetime import date, datetime
+from sqlalchemy import DateTime, delete, event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+import luni
+import models
+
+TABELA_MODIFICATE = models.KpiLunaModificata.__tablename__
+
+# tabela -> (expresia lunii pentru randul X, coloanele care schimba KPI-urile, operatiile urmarite)
+SURSE = {
+    "prezente": (
+        "(SELECT strftime('%Y-%m', data_ora_start) FROM sesiuni WHERE id = {X}.sesiune_id)",
+        ("sesiune_id", "inscriere_id", "is_prezent"),
+        ("INSERT", "UPDATE", "DELETE"),
+    ),
+    "sesiuni": (
+        # Mutarea unei sesiuni in alta luna muta si prezentele ei
+        "strftime('%Y-%m', {X}.data_ora_start)",
+        ("data_ora_start",),
+        ("UPDATE", "DELETE"),
+    ),
+    "facturi": (
+        "strftime('%Y-%m', {X}.data_emitere)",
+        ("data_emitere", "total_plata", "status"),
+        ("INSERT", "UPDATE", "DELETE"),
+    ),
+    "plati": (
+        "strftime('%Y-%m', {X}.data_plata)",
+        ("data_plata", "suma_achitata"),
+        ("INSERT", "UPDATE", "DELETE"),
+    ),
+    "leaduri": (
+        "strftime('%Y-%m', {X}.created_at)",
+        ("created_at",),
+        ("INSERT", "UPDATE", "DELETE"),
+    ),
+    "contracte": (
+        "strftime('%Y-%m', {X}.data_semnarii)",
+        ("data_semnarii", "lead_id"),
+        ("INSERT", "UPDATE", "DELETE"),
+    ),
+}
+
+MODELE_SURSA = (
+    models.Prezenta, models.Sesiune, models.Factura, models.Plata, models.Lead, models.Contract,
+)
+_TABELE_SURSA = {model.__table__ for model in MODELE_SURSA}
+_CHEIE_SESIUNE = "kpi_modificat"
+
+METRICI = ("nr_prezente", "copii_activi", "total_facturat", "total_incasat", "leaduri_noi", "conversii")
+
+
+def _ddl_trigger(tabela, operatie, expresie, coloane):
+    """CREATE TRIGGER care noteaza luna randului vechi si/sau nou in kpi_luni_modificate."""
+    randuri = {"INSERT": ["NEW"], "DELETE": ["OLD"], "UPDATE": ["OLD", "NEW"]}[operatie]
+    luni_rand = " UNION ".join(f"SELECT {expresie.format(X=r)} AS cod" for r in randuri)
+    cand = f"UPDATE OF {', '.join(coloane)}" if operatie == "UPDATE" else operatie
+    return (
+        f"CREATE TRIGGER trg_kpi_{tabela}_{operatie.lower()} AFTER {cand} ON {tabela} "
+        f"BEGIN INSERT OR IGNORE INTO {TABELA_MODIFICATE} (cod_luna) "
+        f"SELECT cod FROM ({luni_rand}) WHERE cod IS NOT NULL; END"
+    )
+
+
+# nume trigger -> DDL (aplicate de migrari.sincronizeaza_triggere)
+TRIGGERE = {
+    f"trg_kpi_{tabela}_{operatie.lower()}": _ddl_trigger(tabela, operatie, expresie, coloane)
+    for tabela, (expresie, coloane, operatii) in SURSE.items()
+    for operatie in operatii
+}
+
+
+def _cod(coloana):
+    return func.strftime('%Y-%m', coloana)
+
+
+def _in_interval(coloana, start, end):
+    """Filtrul [start, end) pe o coloana de tip Date sau DateTime (None = fara limita)."""
+    if start is None:
+        return []
+    if isinstance(coloana.type, DateTime):
+        start, end = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    return [coloana >= start, coloana < end]
+
+
+def agregate(db, start=None, end=None):
+    """KPI-urile pe luni pentru intervalul [start, end) (implicit: toate). {cod_luna: {metrica: valoare}}."""
+    rezultat = {}
+
+    def _pune(randuri, *metrici):
+        for cod, *valori in randuri:
+            if cod is None:
+                continue
+            intrare = rezultat.setdefault(cod, dict.fromkeys(METRICI, 0))
+            for metrica, valoare in zip(metrici, valori):
+                intrare[metrica] = valoare or 0
+
+    Sesiune, Prezenta, Inscriere = models.Sesiune, models.Prezenta, models.Inscriere
+    _pune(db.execute(
+        select(_cod(Sesiune.data_ora_start), func.count(Prezenta.id), func.count(Inscriere.elev_id.distinct()))
+        .select_from(Prezenta)
+        .join(Sesiune, Sesiune.id == Prezenta.sesiune_id)
+        .join(Inscriere, Inscriere.id == Prezenta.inscriere_id)
+        .where(Prezenta.is_prezent.is_(True), *_in_interval(Sesiune.data_ora_start, start, end))
+        .group_by(_cod(Sesiune.data_ora_start))
+    ), "nr_prezente", "copii_activi")
+
+    Factura = models.Factura
+    _pune(db.execute(
+        select(_cod(Factura.data_emitere), func.sum(Factura.total_plata))
+        .where(Factura.status != models.StatusFactura.ANULATA, *_in_interval(Factura.data_emitere, start, end))
+        .group_by(_cod(Factura.data_emitere))
+    ), "total_facturat")
+
+    Plata = models.Plata
+    _pune(db.execute(
+        select(_cod(Plata.data_plata), func.sum(Plata.suma_achitata))
+        .where(*_in_interval(Plata.data_plata, start, end))
+        .group_by(_cod(Plata.data_plata))
+    ), "total_incasat")
+
+    Lead = models.Lead
+    _pune(db.execute(
+        select(_cod(Lead.created_at), func.count(Lead.id))
+        .where(*_in_interval(Lead.created_at, start, end))
+        .group_by(_cod(Lead.created_at))
+    ), "leaduri_noi")
+
+    Contract = models.Contract
+    _pune(db.execute(
+        select(_cod(Contract.data_semnarii), func.count(Contract.id))
+        .where(Contract.lead_id.isnot(None), *_in_interval(Contract.data_semnarii, start, end))
+        .group_by(_cod(Contract.data_semnarii))
+    ), "conversii")
+
+    return rezultat
+
+
+def _salveaza(db, valori_pe_luni):
+    """Upsert in kpi_lunar (cate un rand per luna; luna se creeaza in `luni` daca lipseste)."""
+    if not valori_pe_luni:
+        return
+    acum = datetime.utcnow()
+    randuri = []
+    for cod, valori in valori_pe_luni.items():
+        an, luna = map(int, cod.split("-"))
+        randuri.append(dict(luna_id=luni.get_or_create_luna_id(db, date(an, luna, 1)), actualizat_la=acum, **valori))
+
+    tabela = models.KpiLunar.__table__
+    stmt = sqlite_insert(tabela)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[tabela.c.luna_id],
+            set_={coloana: stmt.excluded[coloana] for coloana in (*METRICI, "actualizat_la")},
+        ),
+        randuri,
+    )
+
+
+def recalculeaza_luni(db, coduri):
+    """Recalculeaza lunile date (cod 'AAAA-LL'); o luna fara date ajunge la zero. Fara commit.
+
+    Toate lunile intr-o singura trecere `agregate` (grupata pe luna) peste intervalul
+    dintre prima si ultima luna; lunile nemodificate din interval se ignora.
+    """
+    coduri = set(coduri)
+    if not coduri:
+        return
+    limite = [luni.limite_luna(date(*map(int, cod.split("-")), 1)) for cod in coduri]
+    calculate = agregate(db, min(start for start, _ in limite), max(end for _, end in limite))
+    _salveaza(db, {cod: calculate.get(cod, dict.fromkeys(METRICI, 0)) for cod in coduri})
+
+
+def proceseaza_modificate(db):
+    """Recalculeaza lunile notate de trigger-e si goleste lista. Fara commit."""
+    Modificata = models.KpiLunaModificata
+    coduri = db.scalars(select(Modificata.cod_luna)).all()
+    if coduri:
+        recalculeaza_luni(db, coduri)
+        db.execute(delete(Modificata).where(Modificata.cod_luna.in_(coduri)))
+    return coduri
+
+
+def reconstruieste(db):
+    """Recalculeaza toate lunile dintr-o trecere (GROUP BY pe toata istoria) si face commit."""
+    valori = agregate(db)
+    # Lunile care au avut KPI dar nu mai au date ajung la zero
+    for (cod,) in db.query(models.Luna.cod_luna).join(models.KpiLunar, models.KpiLunar.luna_id == models.Luna.id):
+        valori.setdefault(cod, dict.fromkeys(METRICI, 0))
+    _salveaza(db, valori)
+    db.execute(delete(models.KpiLunaModificata))
+    db.commit()
+    return len(valori)
+
+
+# ========================== MENTINERE LA COMMIT ==========================
+
+def _are_obiecte_sursa(session):
+    return any(isinstance(o, MODELE_SURSA) for o in itertools.chain(session.new, session.dirty, session.deleted))
+
+
+@event.listens_for(Session, "after_flush")
+def _marcheaza(session, flush_context):
+    if _are_obiecte_sursa(session):
+        session.info[_CHEIE_SESIUNE] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcheaza_bulk(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    if getattr(orm_execute_state.statement, "table", None) in _TABELE_SURSA:
+        orm_execute_state.session.info[_CHEIE_SESIUNE] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _recalculeaza_la_commit(session):
+    # before_commit vine inaintea flush-ului de la commit: obiectele doar adaugate nu sunt inca marcate
+    if not (session.info.get(_CHEIE_SESIUNE) or _are_obiecte_sursa(session)):
+        return
+    # Scrierile inca ne-flush-uite trebuie sa ajunga la trigger-e inainte de recalculare
+    session.flush()
+    session.info.pop(_CHEIE_SESIUNE, None)
+    proceseaza_modificate(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _renunta(session):
+    session.info.pop(_CHEIE_SESIUNE, None)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    import migrari
+
+    parser = argparse.ArgumentParser(description="Agregatele lunare din kpi_lunar")
+    parser.add_argument("--reconstruieste", action="store_true", help="recalculeaza toate lunile de la zero")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    migrari.aplica_migrari(engine)
+    with SessionLocal() as db:
+        if args.reconstruieste:
+            print(f"OK: {reconstruieste(db)} luni recalculate.")
+        else:
+            coduri = proceseaza_modificate(db)
+            db.commit()
+            print(f"OK: {len(coduri)} luni recalculate ({', '.join(coduri) or 'nicio luna modificata'}).")
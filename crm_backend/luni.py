@@ -0,0 +1,53 @@
+"""Dimensiunea timp (tabela `luni`): gasirea / crearea lunii pentru o data."""
+import calendar
+from datetime import date
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import models
+
+NUME_LUNI = [
+    "Ianuarie", "Februarie", "Martie", "Aprilie", "Mai", "Iunie",
+    "Iulie", "August", "Septembrie", "Octombrie", "Noiembrie", "Decembrie",
+]
+
+
+def cod_luna(d):
+    """ex: date(2026, 1, 15) -> '2026-01'"""
+    return f"{d.year}-{d.month:02d}"
+
+
+def interval_luna(an, luna):
+    """Primul si ultimul zi din luna."""
+    return date(an, luna, 1), date(an, luna, calendar.monthrange(an, luna)[1])
+
+
+def limite_luna(d):
+    """Intervalul semi-deschis [prima zi a lunii, prima zi a lunii urmatoare) care contine `d`.
+
+    Pentru filtre de forma `coloana >= start AND coloana < end`, care pot folosi indexul
+    coloanei (spre deosebire de extract('month', coloana)).
+    """
+    start = date(d.year, d.month, 1)
+    if d.month == 12:
+        return start, date(d.year + 1, 1, 1)
+    return start, date(d.year, d.month + 1, 1)
+
+
+def get_or_create_luna_id(db, d):
+    """ID-ul lunii care contine data `d`; luna se creeaza daca nu exista (fara commit).
+
+    INSERT ... ON CONFLICT DO NOTHING pe cod_luna, ca doua cereri concurente sa nu
+    creeze aceeasi luna de doua ori.
+    """
+    cod = cod_luna(d)
+    data_start, data_end = interval_luna(d.year, d.month)
+    db.execute(
+        sqlite_insert(models.Luna.__table__).values(
+            cod_luna=cod,
+            an=d.year,
+            luna=d.month,
+            nume_luna=NUME_LUNI[d.month - 1],
+            data_start=data_start,
+            data_end=data_end,
+        ).on_conflict_do_nothing(index_elements=["cod_luna"])
+    )
+    return db.query(models.Luna.id).filter(models.Luna.cod_luna == cod).scalar()
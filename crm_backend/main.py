@@ -1,30 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from database import SessionLocal, engine
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal, engine, engine_async, engine_citire, get_db_citire, get_db_async
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, extract
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 import models
 import schemas
+import stocuri
+import cache
+import migrari
+import paginare
+import luni
+import google_calendar
+import kpi
+import backup
+import snapshot
+import importuri
+import cautare
+import filtre
+import planificare
+import facturare
+import numerotare
+import incasari
+import restante
 import os
+import re
 import json
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 
 # Creeaza tabelele (daca nu exista)
 models.Base.metadata.create_all(bind=engine)
+migrari.aplica_migrari(engine)
+
+# Populeaza soldurile de stoc pentru baze de date create inainte de tabela stocuri_produse
+with SessionLocal() as _db:
+    stocuri.initializeaza_stocuri(_db)
 
 origins = [
     "http://localhost:3000", 
 ]
 
+# Resursele deschise pe durata aplicatiei: worker-ele (Google Calendar, scadente) si conexiunile async
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if google_calendar.WORKER_ACTIV:
+        google_calendar.worker.start()
+    if restante.WORKER_ACTIV:
+        restante.worker.start()
+    yield
+    google_calendar.worker.stop()
+    restante.worker.stop()
+    await engine_async.dispose()
+
 # Initiaza aplicatia
-app = FastAPI(title="CRM Educational API", version="1.0.0")
+app = FastAPI(title="CRM Educational API", version="1.0.0", lifespan=lifespan)
 
 # --- CONFIGURARE CORS ---
 app.add_middleware(
@@ -33,8 +69,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"],
+    expose_headers=[paginare.HEADER_CURSOR],
 )
 
+# Cu foreign_keys=ON (vezi database.py), stergerea unui rand inca referit sau un ID inexistent
+# dau IntegrityError; raspundem cu 409 in loc de 500
+@app.exception_handler(IntegrityError)
+def integrity_error_handler(request: Request, exc: IntegrityError):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Operatia incalca o constrangere a bazei de date (inregistrare legata sau inexistenta)."}
+    )
+
 # Functie care ne da acces la baza de date
 def get_db():
     db = SessionLocal()
@@ -42,22 +88,6 @@ def get_db():
         yield db
     finally:
         db.close()
-        
-def get_google_service(db: Session):
-    """Returneaza serviciul Google Calendar sau None daca nu suntem logati."""
-    db_token = db.query(models.GoogleToken).first()
-    if not db_token:
-        return None
-    
-    creds = Credentials(
-        token=db_token.access_token,
-        refresh_token=db_token.refresh_token,
-        token_uri=db_token.token_uri,
-        client_id=db_token.client_id,
-        client_secret=db_token.client_secret,
-        scopes=json.loads(db_token.scopes)
-    )
-    return build('calendar', 'v3', credentials=creds)
 
 # ========================== RUTE PARTENERI ==========================
 
@@ -83,13 +113,13 @@ def create_partener(partener: schemas.PartenerCreate, db: Session = Depends(get_
 
 # 2. READ ALL Parteneri
 @app.get("/parteneri/", response_model=List[schemas.Partener])
-def read_parteneri(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    parteneri = db.query(models.Partener).offset(skip).limit(limit).all()
-    return parteneri
+async def read_parteneri(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Partener), [models.Partener.id], response, skip, limit, after,
+                                   filtre.PARTENERI, request, sort)
 
 # 3. READ ONE Partener
 @app.get("/parteneri/{partener_id}", response_model=schemas.Partener)
-def read_partener(partener_id: int, db: Session = Depends(get_db)):
+def read_partener(partener_id: int, db: Session = Depends(get_db_citire)):
     partener = db.query(models.Partener).filter(models.Partener.id == partener_id).first()
     if partener is None:
         raise HTTPException(status_code=404, detail="Partenerul nu a fost gasit")
@@ -152,9 +182,9 @@ def create_lead(lead: schemas.LeadCreate, db: Session = Depends(get_db)):
 
 # 2. READ ALL Leaduri
 @app.get("/leaduri/", response_model=List[schemas.Lead])
-def read_leaduri(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    leaduri = db.query(models.Lead).offset(skip).limit(limit).all()
-    return leaduri
+async def read_leaduri(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Lead), [models.Lead.id], response, skip, limit, after,
+                                   filtre.LEADURI, request, sort)
 
 # 3. UPDATE Lead
 @app.put("/leaduri/{lead_id}", response_model=schemas.Lead)
@@ -212,8 +242,9 @@ def create_contract(contract: schemas.ContractCreate, db: Session = Depends(get_
 
 # 2. READ ALL Contracte
 @app.get("/contracte/", response_model=List[schemas.Contract])
-def read_contracte(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Contract).offset(skip).limit(limit).all()
+async def read_contracte(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Contract), [models.Contract.id], response, skip, limit, after,
+                                   filtre.CONTRACTE, request, sort)
 
 # 3. UPDATE Contract
 @app.put("/contracte/{contract_id}", response_model=schemas.Contract)
@@ -268,8 +299,8 @@ def create_profesor(profesor: schemas.ProfesorCreate, db: Session = Depends(get_
 
 # 2. READ ALL Profesori
 @app.get("/profesori/", response_model=List[schemas.Profesor])
-def read_profesori(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Profesor).offset(skip).limit(limit).all()
+async def read_profesori(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Profesor), [models.Profesor.id], response, skip, limit, after)
 
 # 3. UPDATE Profesor
 @app.put("/profesori/{profesor_id}", response_model=schemas.Profesor)
@@ -323,8 +354,8 @@ def create_curs(curs: schemas.CursCreate, db: Session = Depends(get_db)):
 
 # 2. READ ALL Cursuri
 @app.get("/cursuri/", response_model=List[schemas.Curs])
-def read_cursuri(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Curs).offset(skip).limit(limit).all()
+async def read_cursuri(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Curs), [models.Curs.id], response, skip, limit, after)
 
 # 3. UPDATE Curs
 @app.put("/cursuri/{curs_id}", response_model=schemas.Curs)
@@ -379,8 +410,9 @@ def create_elev(elev: schemas.ElevCreate, db: Session = Depends(get_db)):
 
 # 2. READ ALL Elevi
 @app.get("/elevi/", response_model=List[schemas.Elev])
-def read_elevi(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Elev).offset(skip).limit(limit).all()
+async def read_elevi(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Elev), [models.Elev.id], response, skip, limit, after,
+                                   filtre.ELEVI, request, sort)
 
 # 3. UPDATE Elev
 @app.put("/elevi/{elev_id}", response_model=schemas.Elev)
@@ -437,10 +469,11 @@ def create_grupa(grupa: schemas.GrupaCreate, db: Session = Depends(get_db)):
 
 # 2. READ ALL Grupe
 @app.get("/grupe/", response_model=List[schemas.Grupa])
-def read_grupe(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_grupe(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
     # Aici folosim .options(joinedload(...)) daca vrem sa aducem si numele profesorului/cursului direct, 
     # dar pentru inceput o lasam simplu si facem match in frontend.
-    return db.query(models.Grupa).offset(skip).limit(limit).all()
+    return await paginare.listeaza(db, select(models.Grupa), [models.Grupa.id], response, skip, limit, after,
+                                   filtre.GRUPE, request, sort)
 
 # 3. UPDATE Grupa
 @app.put("/grupe/{grupa_id}", response_model=schemas.Grupa)
@@ -475,54 +508,71 @@ def delete_grupa(grupa_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"message": "Grupa stearsa cu succes"}
 
+# 5. GENEREAZA sesiunile recurente ale grupei (simulare=true: doar planul, fara salvare)
+@app.post("/grupe/{grupa_id}/genereaza-sesiuni", response_model=schemas.PlanSesiuni)
+def genereaza_sesiuni(grupa_id: int, regula: schemas.RegulaRecurenta, simulare: bool = False, db: Session = Depends(get_db)):
+    db_grupa = db.query(models.Grupa).filter(models.Grupa.id == grupa_id).first()
+    if db_grupa is None:
+        raise HTTPException(status_code=404, detail="Grupa nu a fost gasita")
+
+    # Expandare in memorie + un singur INSERT si outbox-ul Google intr-o tranzactie (vezi planificare.py)
+    plan = planificare.genereaza(db, db_grupa, regula, simulare=simulare)
+    if plan["create"]:
+        google_calendar.worker.trezeste()
+    return plan
+
 # ========================== RUTE SESIUNI ==========================
 
 # 1. CREATE Sesiune
 @app.post("/sesiuni/", response_model=schemas.Sesiune)
 def create_sesiune(sesiune: schemas.SesiuneCreate, db: Session = Depends(get_db)):
+    # 0. Profesorul, sala si grupa nu pot fi ocupate de alta sesiune in acelasi interval (409)
+    planificare.verifica_sesiune(db, sesiune)
+
     # 1. Salvare in CRM (Standard)
     db_sesiune = models.Sesiune(**sesiune.dict())
     db.add(db_sesiune)
+    db.flush()
+
+    # 2. Sincronizarea cu Google Calendar intra in outbox, in aceeasi tranzactie;
+    # worker-ul de fundal trimite evenimentul (vezi google_calendar.py)
+    google_calendar.inregistreaza_salvare(db, [db_sesiune.id])
     db.commit()
     db.refresh(db_sesiune)
-
-    # 2. Sincronizare Automata cu Google Calendar
-    try:
-        service = get_google_service(db)
-        if service:
-            # Construim evenimentul pentru Google
-            event_body = {
-                'summary': f"{db_sesiune.tema_lectiei} (EduCRM)",
-                'location': db_sesiune.sala,
-                'description': f"Sesiune creata automat din EduCRM.\nStatus: {db_sesiune.status_sesiune}",
-                'start': {
-                    'dateTime': db_sesiune.data_ora_start.isoformat(),
-                    'timeZone': 'Europe/Bucharest', # Sau zona ta
-                },
-                'end': {
-                    'dateTime': db_sesiune.data_ora_end.isoformat(),
-                    'timeZone': 'Europe/Bucharest',
-                },
-            }
-
-            # Trimitem la Google
-            event = service.events().insert(calendarId='primary', body=event_body).execute()
-            
-            # Salvam ID-ul primit de la Google inapoi in CRM
-            db_sesiune.google_event_id = event['id']
-            db.commit()
-            print("✅ Sesiune sincronizata cu Google Calendar!")
-
-    except Exception as e:
-        print(f"⚠️ Eroare sync Google: {e}")
-        # Nu oprim procesul daca pica Google, doar afisam eroarea in consola
-
+    google_calendar.worker.trezeste()
     return db_sesiune
 
+# 1b. CREATE Sesiuni in bloc (ex: planificarea unui semestru)
+@app.post("/sesiuni/bulk", response_model=List[schemas.Sesiune])
+def create_sesiuni_bulk(sesiuni: List[schemas.SesiuneCreate], db: Session = Depends(get_db)):
+    if not sesiuni:
+        return []
+    # Suprapunerile (intre ele si cu orarul existent) se cauta intr-un singur sweep
+    planificare.verifica_sesiuni(db, sesiuni)
+    # Un singur INSERT pentru toate sesiunile + randurile de outbox in aceeasi tranzactie;
+    # worker-ul le trimite in Google in batch-uri (vezi google_calendar.py)
+    ids = list(db.scalars(
+        sqlite_insert(models.Sesiune).returning(models.Sesiune.id),
+        [s.dict() for s in sesiuni],
+    ))
+    google_calendar.inregistreaza_salvare(db, ids)
+    db.commit()
+    google_calendar.worker.trezeste()
+    return db.query(models.Sesiune).filter(models.Sesiune.id.in_(ids)).order_by(models.Sesiune.id).all()
+
 # 2. READ ALL Sesiuni
 @app.get("/sesiuni/", response_model=List[schemas.Sesiune])
-def read_sesiuni(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Sesiune).offset(skip).limit(limit).all()
+async def read_sesiuni(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Sesiune), [models.Sesiune.data_ora_start, models.Sesiune.id], response, skip, limit, after,
+                                   filtre.SESIUNI, request, sort)
+
+# 2b. Suprapunerile existente in orar (acelasi profesor / sala / grupa), intr-un interval optional
+@app.get("/sesiuni/conflicte", response_model=List[schemas.Suprapunere])
+def read_conflicte_sesiuni(de_la: Optional[datetime] = Query(None, alias="from"), pana_la: Optional[datetime] = Query(None, alias="to"), db: Session = Depends(get_db_citire)):
+    if de_la and pana_la and pana_la <= de_la:
+        raise HTTPException(status_code=400, detail="Intervalul este invalid (to <= from)")
+    # Un singur query ordonat dupa data_ora_start + sort-and-sweep (vezi planificare.py)
+    return planificare.toate_suprapunerile(db, de_la, pana_la)
 
 # 3. UPDATE Sesiune
 @app.put("/sesiuni/{sesiune_id}", response_model=schemas.Sesiune)
@@ -530,6 +580,7 @@ def update_sesiune(sesiune_id: int, sesiune_update: schemas.SesiuneCreate, db: S
     db_sesiune = db.query(models.Sesiune).filter(models.Sesiune.id == sesiune_id).first()
     if db_sesiune is None:
         raise HTTPException(status_code=404, detail="Sesiunea nu a fost gasita")
+    planificare.verifica_sesiune(db, sesiune_update, exclude_id=sesiune_id)
     
     # Recalculam durata daca se schimba orele
     durata = sesiune_update.durata_ore
@@ -546,9 +597,11 @@ def update_sesiune(sesiune_id: int, sesiune_update: schemas.SesiuneCreate, db: S
     db_sesiune.status_sesiune = sesiune_update.status_sesiune
     db_sesiune.durata_ore = durata
     db_sesiune.note = sesiune_update.note
-    
+
+    google_calendar.inregistreaza_salvare(db, [db_sesiune.id])
     db.commit()
     db.refresh(db_sesiune)
+    google_calendar.worker.trezeste()
     return db_sesiune
 
 # 4. DELETE Sesiune
@@ -558,44 +611,81 @@ def delete_sesiune(sesiune_id: int, db: Session = Depends(get_db)):
     if not db_sesiune:
         raise HTTPException(status_code=404, detail="Sesiunea nu a fost gasita")
 
-    # 1. Stergem din Google Calendar (daca exista legatura)
-    try:
-        if db_sesiune.google_event_id:
-            service = get_google_service(db)
-            if service:
-                service.events().delete(calendarId='primary', eventId=db_sesiune.google_event_id).execute()
-                print("🗑️ Eveniment sters si din Google Calendar.")
-    except Exception as e:
-        print(f"⚠️ Eroare stergere Google: {e}")
+    # 1. Stergerea din Google Calendar intra in outbox (cu ID-ul evenimentului,
+    # sesiunea nu va mai exista cand ajunge worker-ul la ea)
+    google_calendar.inregistreaza_stergere(db, db_sesiune.id)
 
     # 2. Stergem din CRM
     db.delete(db_sesiune)
     db.commit()
+    google_calendar.worker.trezeste()
     return {"message": "Sesiune stearsa cu succes"}
 
 # ========================== RUTE FINANCIAR ==========================
 
+def get_or_create_client_id(db: Session, nume: str):
+    """Rezolva numele clientului in ID (prin cache), creand clientul daca nu exista."""
+    client_id = cache.clienti.get(nume)
+    if client_id is not None:
+        return client_id
+
+    db_client = db.query(models.Client.id).filter(models.Client.nume_afisare == nume).first()
+    if db_client:
+        client_id = db_client.id
+        cache.clienti.set(nume, client_id)
+        return client_id
+
+    # Cream un Client "wrapper" pentru acest nume, in aceeasi tranzactie cu factura
+    db_client = models.Client(
+        tip="partener", # default
+        nume_afisare=nume
+    )
+    db.add(db_client)
+    db.flush()
+    return db_client.id
+
+def factura_response(f: models.Factura, client_nume: str):
+    """Construieste schema Factura (cu nume_client) dintr-un rand din DB."""
+    return schemas.Factura(
+        id=f.id,
+        serie_numar=f.serie_numar,
+        client_nume=client_nume or "Client Necunoscut",
+        data_emitere=f.data_emitere,
+        data_scadenta=f.data_scadenta,
+        total_plata=f.total_plata,
+        moneda=f.moneda,
+        status=f.status,
+        created_at=f.created_at
+    )
+
+def salveaza_factura(db: Session, serie_numar: str):
+    """Commit; un numar de factura deja folosit da 409 cu un mesaj explicit."""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if numerotare.este_numar_duplicat(e):
+            raise HTTPException(status_code=409, detail=f"Exista deja o factura cu numarul {serie_numar}")
+        raise
+
 # 1. CREATE Factura
 @app.post("/facturi/", response_model=schemas.Factura)
 def create_factura(factura: schemas.FacturaCreate, db: Session = Depends(get_db)):
     # 1. Cautam sau cream un Client "wrapper" pentru acest nume
     # (Aceasta este o simplificare ca sa mearga Facturarea direct)
-    db_client = db.query(models.Client).filter(models.Client.nume_afisare == factura.client_nume).first()
-    
-    if not db_client:
-        db_client = models.Client(
-            tip="partener", # default
-            nume_afisare=factura.client_nume
-        )
-        db.add(db_client)
-        db.commit()
-        db.refresh(db_client)
+    client_id = get_or_create_client_id(db, factura.client_nume)
+
+    # 2. Numarul: cel introdus sau urmatorul din Setari (rezervat atomic, vezi numerotare.py)
+    serie_numar = (factura.serie_numar or "").strip()
+    if not serie_numar:
+        serie, numar, _ = numerotare.aloca(db)
+        serie_numar = numerotare.formateaza(serie, numar)
 
-    # 2. Cream Factura
+    # 3. Cream Factura
     db_factura = models.Factura(
-        serie_numar=factura.serie_numar,
-        client_id=db_client.id,
-        luna_id=1, # Default: o sa legam de luni mai tarziu
+        serie_numar=serie_numar,
+        client_id=client_id,
+        luna_id=luni.get_or_create_luna_id(db, factura.data_emitere),
         data_emitere=factura.data_emitere,
         data_scadenta=factura.data_scadenta,
         total_plata=factura.total_plata,
@@ -603,48 +693,31 @@ def create_factura(factura: schemas.FacturaCreate, db: Session = Depends(get_db)
         status=factura.status
     )
     db.add(db_factura)
-    db.commit()
+    salveaza_factura(db, serie_numar)
     db.refresh(db_factura)
     
-    # 3. Hack pentru a returna obiectul complet cu nume_client in schema pydantic
-    factura_response = schemas.Factura(
-        id=db_factura.id,
-        serie_numar=db_factura.serie_numar,
-        client_nume=db_client.nume_afisare,
-        data_emitere=db_factura.data_emitere,
-        data_scadenta=db_factura.data_scadenta,
-        total_plata=db_factura.total_plata,
-        moneda=db_factura.moneda,
-        status=db_factura.status,
-        created_at=db_factura.created_at
-    )
-    return factura_response
+    return factura_response(db_factura, factura.client_nume)
 
 # 2. READ ALL Facturi
 @app.get("/facturi/", response_model=List[schemas.Factura])
-def read_facturi(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    facturi_db = db.query(models.Factura).offset(skip).limit(limit).all()
-    
-    # Mapam manual client_nume pentru lista
-    rezultat = []
-    for f in facturi_db:
-        nume = "Client Necunoscut"
-        if f.client_id:
-            c = db.query(models.Client).filter(models.Client.id == f.client_id).first()
-            if c: nume = c.nume_afisare
-            
-        rezultat.append(schemas.Factura(
-            id=f.id,
-            serie_numar=f.serie_numar,
-            client_nume=nume,
-            data_emitere=f.data_emitere,
-            data_scadenta=f.data_scadenta,
-            total_plata=f.total_plata,
-            moneda=f.moneda,
-            status=f.status,
-            created_at=f.created_at
-        ))
-    return rezultat
+async def read_facturi(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    # Un singur query: facturile + numele clientului (LEFT JOIN, clientul poate lipsi)
+    query = select(models.Factura, models.Client.nume_afisare).outerjoin(
+        models.Client, models.Client.id == models.Factura.client_id
+    )
+    rows = await paginare.listeaza(db, query, [models.Factura.id], response, skip, limit, after,
+                                   filtre.FACTURI, request, sort)
+    return [factura_response(f, nume) for f, nume in rows]
+
+# Vechimea creantelor: soldul neincasat pe client, pe intervale de intarziere (vezi restante.py)
+@app.get("/facturi/aging", response_model=schemas.RaportVechime)
+async def read_vechime_facturi(la: Optional[date] = None, db: AsyncSession = Depends(get_db_async)):
+    return await restante.vechime(db, la)
+
+# Marcheaza acum facturile cu scadenta depasita (worker-ul o face oricum periodic)
+@app.post("/facturi/marcheaza-scadente")
+def marcheaza_scadente(db: Session = Depends(get_db)):
+    return {"marcate": restante.marcheaza_scadente(db)}
 
 # 3. UPDATE Factura
 @app.put("/facturi/{factura_id}", response_model=schemas.Factura)
@@ -654,34 +727,19 @@ def update_factura(factura_id: int, factura_update: schemas.FacturaCreate, db: S
         raise HTTPException(status_code=404, detail="Factura nu a fost gasita")
 
     # Update client info (cautam/cream din nou daca s-a schimbat numele)
-    db_client = db.query(models.Client).filter(models.Client.nume_afisare == factura_update.client_nume).first()
-    if not db_client:
-        db_client = models.Client(tip="partener", nume_afisare=factura_update.client_nume)
-        db.add(db_client)
-        db.commit()
-        db.refresh(db_client)
-    
-    db_factura.client_id = db_client.id
-    db_factura.serie_numar = factura_update.serie_numar
+    db_factura.client_id = get_or_create_client_id(db, factura_update.client_nume)
+    # Numarul gol pastreaza numarul existent
+    db_factura.serie_numar = (factura_update.serie_numar or "").strip() or db_factura.serie_numar
     db_factura.data_emitere = factura_update.data_emitere
+    db_factura.luna_id = luni.get_or_create_luna_id(db, factura_update.data_emitere)
     db_factura.data_scadenta = factura_update.data_scadenta
     db_factura.total_plata = factura_update.total_plata
     db_factura.status = factura_update.status
     
-    db.commit()
+    salveaza_factura(db, db_factura.serie_numar)
     db.refresh(db_factura)
     
-    return schemas.Factura(
-        id=db_factura.id,
-        serie_numar=db_factura.serie_numar,
-        client_nume=db_client.nume_afisare,
-        data_emitere=db_factura.data_emitere,
-        data_scadenta=db_factura.data_scadenta,
-        total_plata=db_factura.total_plata,
-        moneda=db_factura.moneda,
-        status=db_factura.status,
-        created_at=db_factura.created_at
-    )
+    return factura_response(db_factura, factura_update.client_nume)
 
 # 4. DELETE Factura
 @app.delete("/facturi/{factura_id}")
@@ -694,6 +752,16 @@ def delete_factura(factura_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"message": "Factura stearsa cu succes"}
 
+# 5. GENEREAZA facturile lunii din contracte, inscrieri si prezente (simulare=true: doar previzualizare)
+@app.post("/facturare/genereaza", response_model=schemas.RaportFacturare)
+def genereaza_facturi(luna: str, simulare: bool = False, data_emitere: Optional[date] = None, termen_plata_zile: int = facturare.TERMEN_PLATA_ZILE, db: Session = Depends(get_db)):
+    an, nr_luna = facturare.parseaza_luna(luna)
+    if termen_plata_zile < 0:
+        raise HTTPException(status_code=400, detail="termen_plata_zile nu poate fi negativ")
+    # Query-uri pe multimi + calcul vectorizat + insert in bloc, o tranzactie (vezi facturare.py)
+    return facturare.genereaza(db, an, nr_luna, simulare=simulare, data_emitere=data_emitere,
+                               termen_plata_zile=termen_plata_zile)
+
 # ========================== RUTE INSCRIERI ==========================
 
 # 1. CREATE Inscriere
@@ -724,8 +792,9 @@ def create_inscriere(inscriere: schemas.InscriereCreate, db: Session = Depends(g
 
 # 2. READ ALL Inscrieri
 @app.get("/inscrieri/", response_model=List[schemas.Inscriere])
-def read_inscrieri(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Inscriere).offset(skip).limit(limit).all()
+async def read_inscrieri(request: Request, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    return await paginare.listeaza(db, select(models.Inscriere), [models.Inscriere.id], response, skip, limit, after,
+                                   filtre.INSCRIERI, request, sort)
 
 # 3. UPDATE Inscriere (ex: schimbare status in RETRAS)
 @app.put("/inscrieri/{inscriere_id}", response_model=schemas.Inscriere)
@@ -761,86 +830,119 @@ def delete_inscriere(inscriere_id: int, db: Session = Depends(get_db)):
 
 # 1. GET Catalog pentru o Sesiune (Combina Elevii cu Prezentele existente)
 @app.get("/catalog/{sesiune_id}", response_model=List[schemas.CatalogItem])
-def get_catalog_sesiune(sesiune_id: int, db: Session = Depends(get_db)):
+async def get_catalog_sesiune(sesiune_id: int, db: AsyncSession = Depends(get_db_async)):
     # 1. Gasim sesiunea
-    sesiune = db.query(models.Sesiune).filter(models.Sesiune.id == sesiune_id).first()
+    sesiune = await db.get(models.Sesiune, sesiune_id)
     if not sesiune:
         raise HTTPException(status_code=404, detail="Sesiunea nu exista")
     
-    # 2. Gasim toti elevii inscrisi in grupa acelei sesiuni (status ACTIV)
-    inscrieri = db.query(models.Inscriere).filter(
+    # 2. Un singur query: inscrierile active din grupa x elevi x prezenta (daca a fost marcata)
+    rows = (await db.execute(select(
+        models.Inscriere.id.label("inscriere_id"),
+        models.Elev.id.label("elev_id"),
+        models.Elev.nume_complet,
+        models.Prezenta.id.label("prezenta_id"),
+        models.Prezenta.is_prezent,
+        models.Prezenta.motiv_absenta,
+        models.Prezenta.note
+    ).join(
+        models.Elev, models.Elev.id == models.Inscriere.elev_id
+    ).outerjoin(
+        models.Prezenta,
+        (models.Prezenta.inscriere_id == models.Inscriere.id) & (models.Prezenta.sesiune_id == sesiune_id)
+    ).where(
         models.Inscriere.grupa_id == sesiune.grupa_id,
         models.Inscriere.status_inscriere == "activ"
-    ).all()
-
-    catalog = []
-    
-    for ins in inscrieri:
-        # Cautam elevul
-        elev = db.query(models.Elev).filter(models.Elev.id == ins.elev_id).first()
-        if not elev: continue
-
-        # Cautam daca exista deja o prezenta marcata pentru aceasta sesiune
-        prezenta = db.query(models.Prezenta).filter(
-            models.Prezenta.sesiune_id == sesiune_id,
-            models.Prezenta.inscriere_id == ins.id
-        ).first()
-
-        # Construim obiectul
-        item = schemas.CatalogItem(
-            elev_id=elev.id,
-            nume_elev=elev.nume_complet,
-            inscriere_id=ins.id,
-            prezenta_id=prezenta.id if prezenta else None,
-            is_prezent=prezenta.is_prezent if prezenta else False, # Default Absent
-            motiv_absenta=prezenta.motiv_absenta if prezenta else None,
-            note=prezenta.note if prezenta else None
+    ).order_by(models.Inscriere.id))).all()
+
+    return [
+        schemas.CatalogItem(
+            elev_id=r.elev_id,
+            nume_elev=r.nume_complet,
+            inscriere_id=r.inscriere_id,
+            prezenta_id=r.prezenta_id,
+            is_prezent=bool(r.is_prezent), # Default Absent (LEFT JOIN fara prezenta -> NULL)
+            motiv_absenta=r.motiv_absenta,
+            note=r.note
         )
-        catalog.append(item)
-    
-    return catalog
+        for r in rows
+    ]
+
+# Campurile de prezenta care se suprascriu doar cand vin cu valoare (None = nu atinge)
+CAMPURI_PREZENTA = ("is_prezent", "rating_profesor", "note", "motiv_absenta")
+
+def upsert_prezente(db: Session, sesiune_id: int, items):
+    """INSERT ... ON CONFLICT DO UPDATE pentru o lista de prezente, fara commit.
+
+    La conflict se suprascriu doar campurile trimise (non-None), ca in mark_prezenta;
+    randurile noi primesc aceleasi valori implicite (absent, rating 0).
+    """
+    if not items:
+        return
+    # Pe __table__ (Core), nu pe model: bulk insert-ul ORM ar inlocui None cu default-ul coloanei
+    stmt = sqlite_insert(models.Prezenta.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Prezenta.sesiune_id, models.Prezenta.inscriere_id],
+        set_={
+            camp: func.coalesce(getattr(stmt.excluded, camp), getattr(models.Prezenta, camp))
+            for camp in CAMPURI_PREZENTA
+        }
+    )
+    db.execute(stmt, [
+        {
+            "sesiune_id": sesiune_id,
+            "inscriere_id": item.inscriere_id,
+            **{camp: getattr(item, camp) for camp in CAMPURI_PREZENTA}
+        }
+        for item in items
+    ])
+
+    # Valorile implicite pentru randurile inserate acum (la INSERT nu le putem distinge de "None")
+    db.query(models.Prezenta).filter(
+        models.Prezenta.sesiune_id == sesiune_id,
+        (models.Prezenta.is_prezent.is_(None)) | (models.Prezenta.rating_profesor.is_(None))
+    ).update({
+        models.Prezenta.is_prezent: func.coalesce(models.Prezenta.is_prezent, False),
+        models.Prezenta.rating_profesor: func.coalesce(models.Prezenta.rating_profesor, 0)
+    }, synchronize_session=False)
 
 # 2. MARK Prezenta (Update sau Create)
 @app.post("/catalog/mark", response_model=schemas.Prezenta)
 def mark_prezenta(data: schemas.PrezentaCreate, db: Session = Depends(get_db)):
-    # Cautam daca exista deja
-    db_prezenta = db.query(models.Prezenta).filter(
+    # UPSERT atomic: nu mai pot aparea prezente duplicate la click-uri concurente
+    upsert_prezente(db, data.sesiune_id, [data])
+    db.commit()
+
+    return db.query(models.Prezenta).filter(
         models.Prezenta.sesiune_id == data.sesiune_id,
         models.Prezenta.inscriere_id == data.inscriere_id
     ).first()
 
-    if db_prezenta:
-        # UPDATE: Actualizam doar campurile care nu sunt None (ca sa nu stergem date accidental)
-        if data.is_prezent is not None:
-            db_prezenta.is_prezent = data.is_prezent
-        
-        # Rating (Star Player)
-        if data.rating_profesor is not None:
-            db_prezenta.rating_profesor = data.rating_profesor
-            
-        # Note
-        if data.note is not None:
-            db_prezenta.note = data.note
-            
-        # Motiv absenta (optional)
-        if data.motiv_absenta is not None:
-            db_prezenta.motiv_absenta = data.motiv_absenta
-
-    else:
-        # CREATE
-        db_prezenta = models.Prezenta(
-            sesiune_id=data.sesiune_id,
-            inscriere_id=data.inscriere_id,
-            is_prezent=data.is_prezent if data.is_prezent is not None else False,
-            rating_profesor=data.rating_profesor if data.rating_profesor is not None else 0,
-            note=data.note,
-            motiv_absenta=data.motiv_absenta
+# 3. MARK Catalog intreg (o singura tranzactie pentru toata clasa)
+@app.post("/catalog/{sesiune_id}/mark-batch", response_model=List[schemas.Prezenta])
+def mark_prezente_batch(sesiune_id: int, data: schemas.PrezentaBatch, db: Session = Depends(get_db)):
+    sesiune = db.query(models.Sesiune).filter(models.Sesiune.id == sesiune_id).first()
+    if not sesiune:
+        raise HTTPException(status_code=404, detail="Sesiunea nu exista")
+
+    # Toate inscrierile trebuie sa fie din grupa sesiunii (verificare intr-un singur query)
+    inscriere_ids = {item.inscriere_id for item in data.prezente}
+    valide = {
+        r.id for r in db.query(models.Inscriere.id).filter(
+            models.Inscriere.id.in_(inscriere_ids),
+            models.Inscriere.grupa_id == sesiune.grupa_id
         )
-        db.add(db_prezenta)
-    
+    }
+    invalide = sorted(inscriere_ids - valide)
+    if invalide:
+        raise HTTPException(status_code=400, detail=f"Inscrieri care nu apartin grupei sesiunii: {invalide}")
+
+    upsert_prezente(db, sesiune_id, data.prezente)
     db.commit()
-    db.refresh(db_prezenta)
-    return db_prezenta
+
+    return db.query(models.Prezenta).filter(
+        models.Prezenta.sesiune_id == sesiune_id
+    ).order_by(models.Prezenta.inscriere_id).all()
 
 
 # ========================== RUTE INVENTAR ==========================
@@ -861,26 +963,21 @@ def create_produs(produs: schemas.ProdusCreate, db: Session = Depends(get_db)):
     db.refresh(db_produs)
     return db_produs
 
-# 2. READ ALL Produse (Cu Calcul de Stoc!)
+# 2. READ ALL Produse (Cu Stoc materializat)
 @app.get("/produse/", response_model=List[schemas.ProdusCuStoc])
-def read_produse(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    produse = db.query(models.Produs).offset(skip).limit(limit).all()
+async def read_produse(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
+    # Un singur query: produsele + soldul din stocuri_produse (0 daca nu a avut miscari)
+    query = select(
+        models.Produs,
+        func.coalesce(models.StocProdus.cantitate, 0).label("stoc_curent")
+    ).outerjoin(
+        models.StocProdus, models.StocProdus.produs_id == models.Produs.id
+    )
+    rows = await paginare.listeaza(db, query, [models.Produs.id], response, skip, limit, after)
+
     rezultat = []
-    
-    for p in produse:
-        # Calculam stocul live
-        miscari = db.query(models.MiscareStoc).filter(models.MiscareStoc.produs_id == p.id).all()
-        stoc = 0
-        for m in miscari:
-            # Daca e INTRARE (achizitie, retur) adunam
-            if m.tip in [models.TipMiscareStoc.ACHIZITIE_IN, models.TipMiscareStoc.RETUR_DEFECT]: 
-                stoc += m.cantitate
-            # Daca e IESIRE (consum, transfer) scadem
-            else:
-                stoc -= m.cantitate
-        
-        # Construim obiectul extins
-        p_dict = schemas.ProdusCuStoc(
+    for p, stoc in rows:
+        rezultat.append(schemas.ProdusCuStoc(
             id=p.id,
             nume_produs=p.nume_produs,
             cod_sku=p.cod_sku,
@@ -888,15 +985,18 @@ def read_produse(skip: int = 0, limit: int = 100, db: Session = Depends(get_db))
             unitate_masura=p.unitate_masura,
             cost_unitar_mediu=p.cost_unitar_mediu,
             note=p.note,
-            stoc_curent=stoc # <--- Valoarea calculata
-        )
-        rezultat.append(p_dict)
+            stoc_curent=stoc
+        ))
         
     return rezultat
 
 # 3. CREATE Miscare Stoc (Intrare/Iesire)
 @app.post("/inventar/miscare", response_model=schemas.MiscareStoc)
 def create_miscare(miscare: schemas.MiscareStocCreate, db: Session = Depends(get_db)):
+    produs = db.query(models.Produs).filter(models.Produs.id == miscare.produs_id).first()
+    if not produs:
+        raise HTTPException(status_code=404, detail="Produsul nu a fost gasit")
+
     db_miscare = models.MiscareStoc(
         produs_id=miscare.produs_id,
         tip=miscare.tip,
@@ -906,6 +1006,8 @@ def create_miscare(miscare: schemas.MiscareStocCreate, db: Session = Depends(get
         note=miscare.note
     )
     db.add(db_miscare)
+    # Soldul se actualizeaza in aceeasi tranzactie cu miscarea
+    stocuri.aplica_miscare(db, miscare.produs_id, miscare.tip, miscare.cantitate)
     db.commit()
     db.refresh(db_miscare)
     return db_miscare
@@ -927,45 +1029,121 @@ def delete_produs(produs_id: int, db: Session = Depends(get_db)):
 # ========================== RUTA DASHBOARD ==========================
 
 @app.get("/dashboard/stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    today = datetime.now().date()
-    current_month = today.month
-    current_year = today.year
+async def get_dashboard_stats(db: AsyncSession = Depends(get_db_async)):
+    today = date.today()
+    # Snapshot-ul din cache (TTL scurt, invalidat la scrierile in facturi/leaduri/sesiuni/grupe/elevi)
+    snapshot = cache.dashboard.get(today)
+    if snapshot is not None:
+        return snapshot
+    generatie = cache.dashboard.generatie
+
+    # Intervale semi-deschise [start, end): filtrele pot folosi indexurile pe date
+    inceput_luna, inceput_luna_urmatoare = luni.limite_luna(today)
+    inceput_zi = datetime.combine(today, datetime.min.time())
+    inceput_zi_urmatoare = inceput_zi + timedelta(days=1)
 
     # 1. Total Elevi Activi (Simplificat: total elevi in baza)
-    total_elevi = db.query(models.Elev).count()
+    total_elevi = (await db.execute(select(func.count(models.Elev.id)))).scalar()
 
     # 2. Venituri Luna Curenta (Suma facturilor emise luna asta)
-    # Folosim extract pentru a filtra dupa luna si an
-    venituri = db.query(func.sum(models.Factura.total_plata)).filter(
-        extract('month', models.Factura.data_emitere) == current_month,
-        extract('year', models.Factura.data_emitere) == current_year
-    ).scalar() or 0.0
+    venituri = (await db.execute(select(func.sum(models.Factura.total_plata)).where(
+        models.Factura.data_emitere >= inceput_luna,
+        models.Factura.data_emitere < inceput_luna_urmatoare,
+    ))).scalar() or 0.0
 
     # 3. Grupe Active
-    grupe_active = db.query(models.Grupa).filter(models.Grupa.status_grupa == "activa").count()
+    grupe_active = (await db.execute(
+        select(func.count(models.Grupa.id)).where(models.Grupa.status_grupa == "activa")
+    )).scalar()
 
     # 4. Sesiunile de AZI (Orar) - Sortate dupa ora
-    # Trebuie sa filtram datetime-ul doar dupa data
-    sesiuni_azi_db = db.query(models.Sesiune).filter(
-        func.date(models.Sesiune.data_ora_start) == today
-    ).order_by(models.Sesiune.data_ora_start).all()
-
-    # 5. Lead-uri Noi (Luna asta)
-    leaduri_noi = db.query(models.Lead).filter(
-        extract('month', models.Lead.created_at) == current_month,
-        models.Lead.status == "nou"
-    ).count()
-
-    return {
+    sesiuni_azi_db = (await db.execute(select(models.Sesiune).where(
+        models.Sesiune.data_ora_start >= inceput_zi,
+        models.Sesiune.data_ora_start < inceput_zi_urmatoare,
+    ).order_by(models.Sesiune.data_ora_start))).scalars().all()
+
+    # 5. Lead-uri Noi (Luna asta, din anul curent)
+    leaduri_noi = (await db.execute(select(func.count(models.Lead.id)).where(
+        models.Lead.status == "nou",
+        models.Lead.created_at >= datetime.combine(inceput_luna, datetime.min.time()),
+        models.Lead.created_at < datetime.combine(inceput_luna_urmatoare, datetime.min.time()),
+    ))).scalar()
+
+    snapshot = {
         "total_elevi": total_elevi,
         "venituri_luna": venituri,
         "grupe_active": grupe_active,
         "leaduri_noi": leaduri_noi,
-        "sesiuni_azi": sesiuni_azi_db
+        # Scheme Pydantic, nu obiecte ORM: snapshot-ul traieste mai mult decat sesiunea DB
+        "sesiuni_azi": [schemas.Sesiune.model_validate(s) for s in sesiuni_azi_db],
     }
+    cache.dashboard.set(today, snapshot, generatie)
+    return snapshot
     
     
+# ========================== RUTE CAUTARE ==========================
+
+# Cautare full-text in parteneri, elevi, leaduri si clienti (FTS5, vezi cautare.py):
+# potrivire pe prefix, ordonata dupa relevanta, cu rezultate aproximative pentru greseli de tastare
+@app.get("/search", response_model=List[schemas.RezultatCautare])
+async def search(q: str, entitate: Optional[str] = None, limit: int = 20, db: AsyncSession = Depends(get_db_async)):
+    if entitate is not None and entitate not in cautare.SURSE:
+        raise HTTPException(status_code=400, detail=f"Entitate necunoscuta (disponibile: {', '.join(cautare.SURSE)})")
+    return await cautare.cauta(db, q, entitate=entitate, limit=max(1, min(limit, 100)))
+
+
+# ========================== RUTE KPI ==========================
+
+# KPI-urile unei luni (cod: AAAA-LL), citite doar din agregatul kpi_lunar (vezi kpi.py)
+@app.get("/kpi/{cod_luna}", response_model=schemas.KpiLunar)
+def get_kpi_luna(cod_luna: str, db: Session = Depends(get_db_citire)):
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", cod_luna):
+        raise HTTPException(status_code=400, detail="Cod de luna invalid (format: AAAA-LL)")
+
+    rand = (
+        db.query(models.KpiLunar, models.Luna)
+        .join(models.Luna, models.Luna.id == models.KpiLunar.luna_id)
+        .filter(models.Luna.cod_luna == cod_luna)
+        .first()
+    )
+    if rand is None:
+        raise HTTPException(status_code=404, detail="Nu exista KPI pentru aceasta luna")
+    kpi_luna, luna = rand
+
+    parametri = db.query(models.ParametriFinanciari).first()
+    target = parametri.target_copii_lunar if parametri else None
+    valoare_prezenta = parametri.valoare_prezenta_std if parametri else None
+    return schemas.KpiLunar(
+        cod_luna=luna.cod_luna,
+        nume_luna=luna.nume_luna,
+        **{metrica: getattr(kpi_luna, metrica) for metrica in kpi.METRICI},
+        clasificare_luna=kpi_luna.clasificare_luna,
+        actualizat_la=kpi_luna.actualizat_la,
+        target_copii_lunar=target,
+        grad_realizare_target=kpi_luna.copii_activi / target if target else None,
+        venit_estimat_prezente=float(kpi_luna.nr_prezente * valoare_prezenta) if valoare_prezenta is not None else None,
+    )
+
+
+# ========================== RUTE IMPORT ==========================
+
+# Import in bloc din CSV / XLSX (elevi, parteneri, leaduri): randurile valide se insereaza
+# in loturi, cele invalide apar in raport cu numarul lor din fisier (vezi importuri.py)
+@app.post("/import/{entitate}", response_model=schemas.RaportImport)
+def import_entitate(entitate: str, fisier: UploadFile = File(...), db: Session = Depends(get_db)):
+    if entitate not in importuri.ENTITATI:
+        raise HTTPException(status_code=404, detail=f"Entitate necunoscuta pentru import (disponibile: {', '.join(importuri.ENTITATI)})")
+    randuri = importuri.citeste_randuri(fisier.file, fisier.filename)
+    return importuri.importa(db, entitate, randuri)
+
+# Extras bancar (CSV / XLSX / MT940): incasarile se potrivesc cu facturile deschise, se
+# insereaza ca plati si statusul facturilor se recalculeaza (vezi incasari.py)
+@app.post("/plati/import", response_model=schemas.RaportImportPlati)
+def import_plati(fisier: UploadFile = File(...), db: Session = Depends(get_db)):
+    linii = incasari.citeste_extras(fisier.file, fisier.filename)
+    return incasari.importa(db, linii)
+
+
 # ========================== RUTE SETARI ==========================
 
 # 1. GET Settings (Singleton)
@@ -1009,71 +1187,56 @@ def update_settings(payload: schemas.SettingsCreate, db: Session = Depends(get_d
     db.refresh(settings)
     return settings
 
-# 3. BACKUP DATE (Export JSON simplu)
+# 3. BACKUP DATE (arhiva ZIP cu cate un CSV per tabela, trimisa in flux - vezi backup.py)
 @app.get("/system/backup")
-def download_backup(db: Session = Depends(get_db)):
-    # 1. Definim un buffer in memorie (nu salvam fisierul pe disk)
-    output = BytesIO()
-
-    # 2. Deschidem un Excel Writer
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        
-        # --- FOAIA 1: ELEVI ---
-        elevi = db.query(models.Elev).all()
-        # Convertim obiectele SQLAlchemy in dictionare curate
-        data_elevi = [e.__dict__ for e in elevi]
-        if data_elevi:
-            df_elevi = pd.DataFrame(data_elevi)
-            if "_sa_instance_state" in df_elevi.columns: 
-                del df_elevi["_sa_instance_state"] # Stergem metadatele interne SQLAlchemy
-            df_elevi.to_excel(writer, sheet_name="Elevi", index=False)
-
-        # --- FOAIA 2: PROFESORI ---
-        profesori = db.query(models.Profesor).all()
-        data_prof = [p.__dict__ for p in profesori]
-        if data_prof:
-            df_prof = pd.DataFrame(data_prof)
-            if "_sa_instance_state" in df_prof.columns: del df_prof["_sa_instance_state"]
-            df_prof.to_excel(writer, sheet_name="Profesori", index=False)
-
-        # --- FOAIA 3: GRUPE ---
-        grupe = db.query(models.Grupa).all()
-        data_grupe = [g.__dict__ for g in grupe]
-        if data_grupe:
-            df_grupe = pd.DataFrame(data_grupe)
-            if "_sa_instance_state" in df_grupe.columns: del df_grupe["_sa_instance_state"]
-            df_grupe.to_excel(writer, sheet_name="Grupe", index=False)
-
-        # --- FOAIA 4: FACTURI ---
-        facturi = db.query(models.Factura).all()
-        data_facturi = [f.__dict__ for f in facturi]
-        if data_facturi:
-            df_facturi = pd.DataFrame(data_facturi)
-            if "_sa_instance_state" in df_facturi.columns: del df_facturi["_sa_instance_state"]
-            df_facturi.to_excel(writer, sheet_name="Facturi", index=False)
-
-        # --- FOAIA 5: INVENTAR ---
-        produse = db.query(models.Produs).all()
-        data_produse = [p.__dict__ for p in produse]
-        if data_produse:
-            df_produse = pd.DataFrame(data_produse)
-            if "_sa_instance_state" in df_produse.columns: del df_produse["_sa_instance_state"]
-            df_produse.to_excel(writer, sheet_name="Inventar", index=False)
-
-    # 3. Pregatim raspunsul
-    output.seek(0)
-    
+def download_backup():
     headers = {
-        'Content-Disposition': f'attachment; filename="Backup_EduCRM_{datetime.now().strftime("%Y%m%d")}.xlsx"'
+        'Content-Disposition': f'attachment; filename="{backup.nume_fisier()}"'
     }
-    
-    return StreamingResponse(
-        output, 
-        headers=headers, 
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    
-    
+    # Generatorul isi deschide singur conexiunea read-only: ramane deschisa cat dureaza transferul
+    return StreamingResponse(backup.genereaza_zip(engine_citire), headers=headers, media_type='application/zip')
+
+# 4. SNAPSHOT-URI ALE BAZEI (copie SQLite completa, facuta "la cald" - vezi snapshot.py)
+@app.post("/system/snapshot", response_model=schemas.Snapshot)
+def create_snapshot(comprimat: bool = True):
+    try:
+        return snapshot.creeaza(comprima=comprimat)
+    except snapshot.SnapshotInvalid as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot-ul nu a putut fi creat: {e}")
+
+@app.get("/system/snapshot", response_model=List[schemas.Snapshot])
+def list_snapshots():
+    return snapshot.listeaza()
+
+@app.get("/system/snapshot/{nume}")
+def download_snapshot(nume: str):
+    try:
+        cale = snapshot.cale_snapshot(nume)
+    except snapshot.SnapshotInvalid as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(cale, filename=nume, media_type='application/gzip' if nume.endswith(".gz") else 'application/vnd.sqlite3')
+
+@app.post("/system/snapshot/{nume}/restaureaza", response_model=schemas.SnapshotRestaurat)
+async def restore_snapshot(nume: str):
+    try:
+        snapshot.cale_snapshot(nume)
+    except snapshot.SnapshotInvalid as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        # Copia si migrarile sunt blocante: in threadpool, nu pe event loop
+        siguranta = await run_in_threadpool(snapshot.restaureaza, nume)
+    except snapshot.SnapshotInvalid as e:
+        raise HTTPException(status_code=400, detail=f"Snapshot-ul nu a fost restaurat: {e}")
+
+    # Conexiunile din pool-uri si datele din cache-urile procesului sunt ale bazei vechi
+    engine_citire.dispose()
+    await engine_async.dispose()
+    cache.clienti.invalideaza()
+    cache.dashboard.invalideaza()
+    google_calendar.invalideaza_service()
+    return {"restaurat": nume, "snapshot_siguranta": siguranta}
+
+
 # ========================== GOOGLE CALENDAR INTEGRATION ==========================
 
 # Configurare
@@ -1115,8 +1278,14 @@ def google_callback(code: str, db: Session = Depends(get_db)):
     db_token.client_id = creds.client_id
     db_token.client_secret = creds.client_secret
     db_token.scopes = json.dumps(creds.scopes)
-    
+    db_token.expiry = creds.expiry
+    # Alt cont / alt calendar: urmatorul import porneste de la zero
+    db_token.sync_token = None
+    # Versiune noua: serviciile Google din cache se reconstruiesc cu noul token
+    db_token.versiune = (db_token.versiune or 0) + 1
+
     db.commit()
+    google_calendar.invalideaza_service()
     return {"message": "Google Calendar conectat cu succes! Poti inchide aceasta pagina."}
 
 # 3. SYNC: Citeste evenimentele din Google
@@ -1138,71 +1307,19 @@ def sync_google_events(db: Session = Depends(get_db)):
         if not profesor_default:
             return {"success": False, "message": "Nu ai niciun Profesor creat! Creează unul întâi."}
 
-        # 2. Conectare Google
-        creds = Credentials(
-            token=db_token.access_token,
-            refresh_token=db_token.refresh_token,
-            token_uri=db_token.token_uri,
-            client_id=db_token.client_id,
-            client_secret=db_token.client_secret,
-            scopes=json.loads(db_token.scopes)
-        )
-        service = build('calendar', 'v3', credentials=creds)
-
-        # 3. Interval (Azi -> +7 zile)
-        now = datetime.utcnow()
-        time_min = now.isoformat() + 'Z'
-        time_max = (now + timedelta(days=7)).isoformat() + 'Z'
-
-        events_result = service.events().list(
-            calendarId='primary', timeMin=time_min, timeMax=time_max,
-            singleEvents=True, orderBy='startTime'
-        ).execute()
-        events = events_result.get('items', [])
-
-        if not events:
-            return {"success": True, "message": "Calendarul Google este gol în următoarea săptămână."}
-
-        sesiuni_noi = 0
-
-        # 4. Procesare
-        for event in events:
-            summary = event.get('summary', 'Fără Titlu')
-            # Ignoram evenimentele create tot de noi (cele care au (EduCRM) in titlu)
-            if "(EduCRM)" in summary:
-                continue
-
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            google_id = event['id']
-
-            # Verificam daca exista deja dupa ID-ul Google SAU dupa data+ora (anti-duplicate)
-            exists = db.query(models.Sesiune).filter(
-                (models.Sesiune.google_event_id == google_id) | 
-                ((models.Sesiune.data_ora_start == start) & (models.Sesiune.tema_lectiei == summary))
-            ).first()
-
-            if not exists:
-                noua_sesiune = models.Sesiune(
-                    grupa_id=grupa_default.id,      # Folosim ID-ul real gasit
-                    profesor_id=profesor_default.id, # Folosim ID-ul real gasit
-                    data_ora_start=start,
-                    data_ora_end=end,
-                    sala="Google Calendar",
-                    tema_lectiei=summary,
-                    status_sesiune="planificata",
-                    note="Importat din Google",
-                    google_event_id=google_id
-                )
-                db.add(noua_sesiune)
-                sesiuni_noi += 1
+        # 2. Conectare Google (serviciul din cache, vezi google_calendar.py)
+        service = google_calendar.get_google_service(db)
 
-        db.commit()
+        # 3. Import incremental, pagina cu pagina (vezi google_calendar.importa_evenimente)
+        contor = google_calendar.importa_evenimente(db, service, grupa_default.id, profesor_default.id)
 
-        if sesiuni_noi == 0:
-            return {"success": True, "message": "Totul este la zi! Nu s-au găsit evenimente noi."}
+        if not any(contor.values()):
+            return {"success": True, "message": "Totul este la zi! Nu s-au găsit evenimente noi sau modificate."}
         else:
-            return {"success": True, "message": f"Succes! S-au importat {sesiuni_noi} sesiuni noi."}
+            return {"success": True, "message": (
+                f"Succes! {contor['noi']} sesiuni noi, {contor['actualizate']} actualizate, "
+                f"{contor['anulate']} anulate."
+            )}
 
     except Exception as e:
         print(f"Eroare Sync: {str(e)}")
@@ -1210,13 +1327,19 @@ def sync_google_events(db: Session = Depends(get_db)):
     
 # 4. STATUS: Verificam daca suntem conectati
 @app.get("/google/status")
-def get_google_status(db: Session = Depends(get_db)):
+def get_google_status(db: Session = Depends(get_db_citire)):
     token = db.query(models.GoogleToken).first()
     return {"is_connected": token is not None}
 
-# 5. DISCONNECT: Stergem tokenul
+# 5. OUTBOX: Cate modificari de sesiuni asteapta sa ajunga in Google Calendar
+@app.get("/google/outbox")
+def get_google_outbox(db: Session = Depends(get_db_citire)):
+    return google_calendar.stare_outbox(db)
+
+# 6. DISCONNECT: Stergem tokenul
 @app.delete("/google/disconnect")
 def disconnect_google(db: Session = Depends(get_db)):
     db.query(models.GoogleToken).delete()
     db.commit()
+    google_calendar.invalideaza_service()
     return {"message": "Deconectat cu succes."}
\ No newline at end of file
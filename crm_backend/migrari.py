@@ -0,0 +1,267 @@
+"""Migrari pentru baze de date create cu versiuni mai vechi ale modelelor.
+
+`create_all` creeaza doar tabelele lipsa; nu adauga coloane, indexuri sau
+trigger-e noi pe tabele care exista deja. Pasii de aici aduc un crm.db existent
+la zi si sunt idempotenti, deci ruleaza la fiecare pornire a API-ului.
+
+Rulare din linia de comanda:
+    python migrari.py            # adauga coloanele, indexurile, tabelele FTS5 si trigger-ele lipsa
+    python migrari.py --explain  # + EXPLAIN QUERY PLAN pentru query-urile critice
+"""
+import argparse
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import cautare
+import kpi
+import models
+
+
+def _default_sql(coloana, dialect):
+    """Valoarea DEFAULT pentru ALTER TABLE, din default-ul scalar declarat in model (sau None)."""
+    if coloana.server_default is not None:
+        return str(coloana.server_default.arg)
+    if coloana.default is not None and coloana.default.is_scalar:
+        return literal(coloana.default.arg, coloana.type).compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        ).string
+    return None
+
+
+def sincronizeaza_coloane(engine):
+    """Adauga coloanele declarate in models.py care lipsesc din tabelele existente.
+
+    Randurile existente primesc default-ul coloanei; coloanele NOT NULL fara default
+    sunt adaugate nullable (SQLite nu poate altfel). Returneaza lista "tabela.coloana".
+    """
+    inspector = inspect(engine)
+    tabele_existente = set(inspector.get_table_names())
+    adaugate = []
+
+    for tabela in models.Base.metadata.sorted_tables:
+        if tabela.name not in tabele_existente:
+            continue
+        existente = {c["name"] for c in inspector.get_columns(tabela.name)}
+        for coloana in tabela.columns:
+            if coloana.name in existente:
+                continue
+            tip = coloana.type.compile(dialect=engine.dialect)
+            ddl = f"ALTER TABLE {tabela.name} ADD COLUMN {coloana.name} {tip}"
+            default = _default_sql(coloana, engine.dialect)
+            if default is not None:
+                ddl += f" DEFAULT {default}"
+                if not coloana.nullable:
+                    ddl += " NOT NULL"
+            with engine.begin() as conn:
+                conn.exec_driver_sql(ddl)
+            adaugate.append(f"{tabela.name}.{coloana.name}")
+
+    for nume in adaugate:
+        print(f"Migrare: coloana adaugata {nume}")
+    return adaugate
+
+
+def deduplica_prezente(conn):
+    """Pastreaza doar ultima prezenta (id maxim) pentru fiecare pereche sesiune/inscriere."""
+    tabela = models.Prezenta.__table__
+    rezultat = conn.exec_driver_sql(
+        f"DELETE FROM {tabela.name} WHERE id NOT IN ("
+        f"SELECT MAX(id) FROM {tabela.name} GROUP BY sesiune_id, inscriere_id)"
+    )
+    return rezultat.rowcount
+
+
+# Indexuri unice care au nevoie de curatenie inainte de creare (altfel CREATE esueaza pe duplicate)
+DEDUPLICARI = {
+    "ux_prezente_sesiune_inscriere": deduplica_prezente,
+}
+
+
+def sincronizeaza_indexuri(engine):
+    """Creeaza indexurile declarate in models.py care lipsesc din baza de date.
+
+    Returneaza (create, esuate): numele indexurilor create si [(nume, eroare)] pentru
+    indexurile unice care nu pot fi create din cauza datelor duplicate.
+    """
+    inspector = inspect(engine)
+    tabele_existente = set(inspector.get_table_names())
+    create, esuate = [], []
+
+    for tabela in models.Base.metadata.sorted_tables:
+        if tabela.name not in tabele_existente:
+            continue
+        existente = {ix["name"] for ix in inspector.get_indexes(tabela.name)}
+        for index in sorted(tabela.indexes, key=lambda ix: ix.name):
+            if index.name in existente:
+                continue
+            try:
+                with engine.begin() as conn:
+                    deduplica = DEDUPLICARI.get(index.name)
+                    if deduplica:
+                        sterse = deduplica(conn)
+                        if sterse:
+                            print(f"Migrare: {sterse} randuri duplicate sterse inainte de {index.name}")
+                    index.create(conn)
+                create.append(index.name)
+            except IntegrityError as e:
+                esuate.append((index.name, str(e.orig)))
+
+    for nume in create:
+        print(f"Migrare: index creat {nume}")
+    for nume, eroare in esuate:
+        print(f"⚠️ Migrare: indexul {nume} nu a putut fi creat ({eroare})")
+    return create, esuate
+
+
+def sincronizeaza_triggere(engine):
+    """Creeaza (sau recreeaza, daca definitia s-a schimbat) trigger-ele SQLite declarate in cod.
+
+    Returneaza (create, recreate): numele trigger-elor noi si ale celor actualizate.
+    """
+    with engine.connect() as conn:
+        existente = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").all())
+    create, recreate = [], []
+    for nume, ddl in {**kpi.TRIGGERE, **cautare.TRIGGERE}.items():
+        if existente.get(nume) == ddl:
+            continue
+        with engine.begin() as conn:
+            if nume in existente:
+                conn.exec_driver_sql(f"DROP TRIGGER {nume}")
+            conn.exec_driver_sql(ddl)
+        (recreate if nume in existente else create).append(nume)
+
+    for nume in create:
+        print(f"Migrare: trigger creat {nume}")
+    for nume in recreate:
+        print(f"Migrare: trigger actualizat {nume}")
+    return create, recreate
+
+
+def sincronizeaza_fts(engine):
+    """Creeaza (sau recreeaza, daca definitia s-a schimbat) tabelele virtuale FTS5 din cautare.py.
+
+    Returneaza numele tabelelor create / recreate (goale: trebuie reindexate).
+    """
+    with engine.connect() as conn:
+        existente = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'table'").all())
+    modificate = []
+    for nume, ddl in cautare.TABELE_FTS.items():
+        if existente.get(nume) == ddl:
+            continue
+        with engine.begin() as conn:
+            if nume in existente:
+                conn.exec_driver_sql(f"DROP TABLE {nume}")
+            conn.exec_driver_sql(ddl)
+        modificate.append(nume)
+        print(f"Migrare: tabela FTS5 {'recreata' if nume in existente else 'creata'} {nume}")
+    return modificate
+
+
+def initializeaza_cautare(engine):
+    """Tabele FTS5 noi sau trigger-e de cautare schimbate: indexul se reface din tabelele sursa."""
+    with engine.begin() as conn:
+        print(f"Migrare: index de cautare refacut ({cautare.reconstruieste(conn)} inregistrari)")
+
+
+def initializeaza_kpi(engine):
+    """Prima instalare a trigger-elor KPI: kpi_lunar se calculeaza o data din toata istoria."""
+    with Session(engine) as db:
+        print(f"Migrare: KPI lunare calculate pentru {kpi.reconstruieste(db)} luni")
+
+
+# Query-urile fierbinti ale API-ului, in forma in care le trimite SQLAlchemy
+QUERY_URI_CRITICE = [
+    ("catalog: inscrieri active x elevi x prezente",
+     "SELECT inscrieri.id, elevi.nume_complet, prezente.is_prezent FROM inscrieri "
+     "JOIN elevi ON elevi.id = inscrieri.elev_id "
+     "LEFT OUTER JOIN prezente ON prezente.inscriere_id = inscrieri.id AND prezente.sesiune_id = :sesiune_id "
+     "WHERE inscrieri.grupa_id = :grupa_id AND inscrieri.status_inscriere = 'ACTIV'",
+     {"sesiune_id": 1, "grupa_id": 1}),
+    ("catalog: upsert prezenta",
+     "SELECT id FROM prezente WHERE sesiune_id = :sesiune_id AND inscriere_id = :inscriere_id",
+     {"sesiune_id": 1, "inscriere_id": 1}),
+    ("inscrieri: elev deja inscris in grupa",
+     "SELECT id FROM inscrieri WHERE grupa_id = :grupa_id AND elev_id = :elev_id",
+     {"grupa_id": 1, "elev_id": 1}),
+    ("inventar: miscarile unui produs",
+     "SELECT * FROM miscari_stoc WHERE produs_id = :produs_id",
+     {"produs_id": 1}),
+    ("dashboard: sesiunile de azi",
+     "SELECT * FROM sesiuni WHERE data_ora_start >= :start AND data_ora_start < :end ORDER BY data_ora_start",
+     {"start": "2026-01-05 00:00:00", "end": "2026-01-06 00:00:00"}),
+    ("dashboard: lead-uri noi in luna curenta",
+     "SELECT count(id) FROM leaduri WHERE status = 'NOU' AND created_at >= :start AND created_at < :end",
+     {"start": "2026-01-01 00:00:00", "end": "2026-02-01 00:00:00"}),
+    ("orar: sesiunile unui profesor",
+     "SELECT * FROM sesiuni WHERE profesor_id = :profesor_id AND data_ora_start >= :start ORDER BY data_ora_start",
+     {"profesor_id": 1, "start": "2026-01-05 00:00:00"}),
+    ("orar: sesiunile unei grupe",
+     "SELECT * FROM sesiuni WHERE grupa_id = :grupa_id ORDER BY data_ora_start",
+     {"grupa_id": 1}),
+    ("google: sesiune dupa eveniment",
+     "SELECT id FROM sesiuni WHERE google_event_id = :event_id",
+     {"event_id": "abc"}),
+    ("facturi: venituri pe interval",
+     "SELECT SUM(total_plata) FROM facturi WHERE data_emitere >= :start AND data_emitere < :end",
+     {"start": "2026-01-01", "end": "2026-02-01"}),
+    ("facturi: facturile unui client",
+     "SELECT * FROM facturi WHERE client_id = :client_id",
+     {"client_id": 1}),
+    ("facturi: client dupa nume",
+     "SELECT id FROM clienti WHERE nume_afisare = :nume",
+     {"nume": "Client"}),
+    ("facturi: marcarea scadentelor depasite",
+     "UPDATE facturi SET status = 'SCADENTA_DEPASITA' WHERE status = 'EMISA' AND data_scadenta < :azi",
+     {"azi": "2026-01-05"}),
+    ("plati: suma platilor unei facturi",
+     "SELECT SUM(suma_achitata) FROM plati WHERE factura_id = :factura_id",
+     {"factura_id": 1}),
+]
+
+
+def raport_explain(engine):
+    """Returneaza [(nume, [linii plan])] cu EXPLAIN QUERY PLAN pentru query-urile critice."""
+    raport = []
+    with engine.connect() as conn:
+        for nume, sql, parametri in QUERY_URI_CRITICE:
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), parametri).all()
+            raport.append((nume, [rand[-1] for rand in plan]))
+    return raport
+
+
+def aplica_migrari(engine):
+    sincronizeaza_coloane(engine)
+    sincronizeaza_indexuri(engine)
+    fts = sincronizeaza_fts(engine)
+    create, recreate = sincronizeaza_triggere(engine)
+    if any(nume in kpi.TRIGGERE for nume in create):
+        initializeaza_kpi(engine)
+    if fts or any(nume in cautare.TRIGGERE for nume in create + recreate):
+        initializeaza_cautare(engine)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Sincronizare coloane, indexuri si trigger-e pentru crm.db")
+    parser.add_argument("--explain", action="store_true", help="afiseaza EXPLAIN QUERY PLAN pentru query-urile critice")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    adaugate = sincronizeaza_coloane(engine)
+    create, esuate = sincronizeaza_indexuri(engine)
+    fts = sincronizeaza_fts(engine)
+    triggere_noi, triggere_actualizate = sincronizeaza_triggere(engine)
+    if any(nume in kpi.TRIGGERE for nume in triggere_noi):
+        initializeaza_kpi(engine)
+    if fts or any(nume in cautare.TRIGGERE for nume in triggere_noi + triggere_actualizate):
+        initializeaza_cautare(engine)
+    if not (adaugate or create or esuate or fts or triggere_noi or triggere_actualizate):
+        print("OK: toate coloanele, indexurile, tabelele FTS5 si trigger-ele declarate exista deja.")
+
+    if args.explain:
+        for nume, plan in raport_explain(engine):
+            print(f"\n{nume}")
+            for linie in plan:
+                marcaj = "⚠️ " if linie.startswith("SCAN") else "   "
+                print(f"  {marcaj}{linie}")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Float, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Numeric, Enum as SqlEnum
+from sqlalchemy import Column, Float, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Numeric, Index, Enum as SqlEnum, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -160,6 +160,11 @@ class Lead(Base):
     contract = relationship("Contract", back_populates="lead", uselist=False)
     created_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # Dashboard: lead-urile noi dintr-un interval
+        Index("ix_leaduri_status_created_at", "status", "created_at"),
+    )
+
 class Contract(Base):
     __tablename__ = "contracte"
 
@@ -168,7 +173,7 @@ class Contract(Base):
     lead_id = Column(Integer, ForeignKey("leaduri.id"), nullable=True)
     
     nume_contract = Column(String) # sau numar_contract
-    data_semnarii = Column(Date)
+    data_semnarii = Column(Date, index=True)
     data_start = Column(Date)
     data_expirare = Column(Date)
     
@@ -299,6 +304,13 @@ class Inscriere(Base):
     elev = relationship("Elev", back_populates="inscrieri")
     linii_factura = relationship("LinieFactura", back_populates="inscriere")
 
+    __table_args__ = (
+        # Catalogul: inscrierile active dintr-o grupa; verificarea "elev deja inscris"
+        Index("ix_inscrieri_grupa_status", "grupa_id", "status_inscriere"),
+        Index("ix_inscrieri_grupa_elev", "grupa_id", "elev_id"),
+        Index("ix_inscrieri_elev_id", "elev_id"),
+    )
+
 
 # ===================================================
 # 5. OPERATIONAL
@@ -322,7 +334,16 @@ class Sesiune(Base):
     profesor = relationship("Profesor", back_populates="sesiuni")
     prezente = relationship("Prezenta", back_populates="sesiune")
     miscari_stoc = relationship("MiscareStoc", back_populates="sesiune")
-    google_event_id = Column(String, nullable=True)
+    google_event_id = Column(String, nullable=True, index=True)
+
+    __table_args__ = (
+        # Orarul zilei / intervale de date, sesiunile unei grupe, ale unui profesor si dintr-o sala
+        # (ultimele trei sustin si verificarea suprapunerilor, vezi planificare.py)
+        Index("ix_sesiuni_data_ora_start", "data_ora_start"),
+        Index("ix_sesiuni_grupa_start", "grupa_id", "data_ora_start"),
+        Index("ix_sesiuni_profesor_start", "profesor_id", "data_ora_start"),
+        Index("ix_sesiuni_sala_start", "sala", "data_ora_start"),
+    )
 
 class Prezenta(Base):
     __tablename__ = "prezente"
@@ -338,6 +359,12 @@ class Prezenta(Base):
     sesiune = relationship("Sesiune", back_populates="prezente")
     inscriere = relationship("Inscriere")
 
+    # O singura prezenta per elev per sesiune (tinta pentru INSERT ... ON CONFLICT din catalog)
+    __table_args__ = (
+        Index("ux_prezente_sesiune_inscriere", "sesiune_id", "inscriere_id", unique=True),
+        Index("ix_prezente_inscriere_id", "inscriere_id"),
+    )
+
 
 # ===================================================
 # 6. CLIENTI & FACTURARE
@@ -350,7 +377,7 @@ class Client(Base):
     tip = Column(SqlEnum(TipClient))
     partener_id = Column(Integer, ForeignKey("parteneri.id"), nullable=True)
     elev_id = Column(Integer, ForeignKey("elevi.id"), nullable=True)
-    nume_afisare = Column(String)
+    nume_afisare = Column(String, index=True)
     cui_cnp = Column(String)
     adresa_facturare = Column(String)
     email_facturare = Column(String)
@@ -365,9 +392,9 @@ class Factura(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     serie_numar = Column(String)
-    client_id = Column(Integer, ForeignKey("clienti.id"))
+    client_id = Column(Integer, ForeignKey("clienti.id"), index=True)
     luna_id = Column(Integer, ForeignKey("luni.id"))
-    data_emitere = Column(Date)
+    data_emitere = Column(Date, index=True)
     data_scadenta = Column(Date)
     total_plata = Column(Numeric(10, 2))
     moneda = Column(String, default="RON")
@@ -379,6 +406,13 @@ class Factura(Base):
     linii = relationship("LinieFactura", back_populates="factura")
     plati = relationship("Plata", back_populates="factura")
 
+    __table_args__ = (
+        # Lista de facturi filtrata dupa status si scadenta (?status=emisa&data_scadenta__lt=...)
+        Index("ix_facturi_status_scadenta", "status", "data_scadenta"),
+        # Un numar de factura apare o singura data (vezi numerotare.py)
+        Index("ux_facturi_serie_numar", "serie_numar", unique=True),
+    )
+
 class LinieFactura(Base):
     __tablename__ = "linii_factura"
 
@@ -401,7 +435,7 @@ class Plata(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     factura_id = Column(Integer, ForeignKey("facturi.id"))
-    data_plata = Column(Date)
+    data_plata = Column(Date, index=True)
     suma_achitata = Column(Numeric(10, 2))
     metoda_plata = Column(String)
     referinta_plata = Column(String)
@@ -409,6 +443,11 @@ class Plata(Base):
 
     factura = relationship("Factura", back_populates="plati")
 
+    __table_args__ = (
+        # Suma platilor unei facturi (reconcilierea extraselor, vezi incasari.py)
+        Index("ix_plati_factura", "factura_id"),
+    )
+
 
 # ===================================================
 # 7. KPI & CONFIG (NOU in v3)
@@ -420,9 +459,24 @@ class KpiLunar(Base):
     luna_id = Column(Integer, ForeignKey("luni.id"), primary_key=True)
     clasificare_luna = Column(String)
     note = Column(Text)
+
+    # Agregate lunare, mentinute de kpi.py (recalculate la commit pentru lunile modificate)
+    nr_prezente = Column(Integer, nullable=False, default=0)
+    copii_activi = Column(Integer, nullable=False, default=0)  # elevi distincti cu cel putin o prezenta
+    total_facturat = Column(Numeric(12, 2), nullable=False, default=0)
+    total_incasat = Column(Numeric(12, 2), nullable=False, default=0)
+    leaduri_noi = Column(Integer, nullable=False, default=0)
+    conversii = Column(Integer, nullable=False, default=0)  # contracte semnate pornind de la un lead
+    actualizat_la = Column(DateTime, nullable=True)
     
     luna_rel = relationship("Luna", back_populates="kpi")
 
+class KpiLunaModificata(Base):
+    # Lunile ale caror KPI trebuie recalculate; scrise de trigger-ele SQLite din kpi.py
+    __tablename__ = "kpi_luni_modificate"
+
+    cod_luna = Column(String, primary_key=True)
+
 class ParametriFinanciari(Base):
     __tablename__ = "parametri_financiari"
     
@@ -449,6 +503,7 @@ class Produs(Base):
     note = Column(Text)
 
     miscari = relationship("MiscareStoc", back_populates="produs")
+    stoc = relationship("StocProdus", back_populates="produs", uselist=False, cascade="all, delete-orphan")
     echipamente_curs = relationship("CursEchipament", back_populates="produs")
     achizitii = relationship("AchizitiePlan", back_populates="produs")
 
@@ -456,7 +511,7 @@ class MiscareStoc(Base):
     __tablename__ = "miscari_stoc"
 
     id = Column(Integer, primary_key=True, index=True)
-    produs_id = Column(Integer, ForeignKey("produse.id"))
+    produs_id = Column(Integer, ForeignKey("produse.id"), index=True)
     tip = Column(SqlEnum(TipMiscareStoc))
     cantitate = Column(Integer)
     
@@ -474,6 +529,16 @@ class MiscareStoc(Base):
     sesiune = relationship("Sesiune", back_populates="miscari_stoc")
     achizitie = relationship("AchizitiePlan", back_populates="miscari_stoc")
 
+class StocProdus(Base):
+    # Soldul materializat al fiecarui produs (mentinut de create_miscare, vezi stocuri.py)
+    __tablename__ = "stocuri_produse"
+
+    produs_id = Column(Integer, ForeignKey("produse.id"), primary_key=True)
+    cantitate = Column(Integer, nullable=False, default=0)
+    actualizat_la = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    produs = relationship("Produs", back_populates="stoc")
+
 class CursEchipament(Base):
     __tablename__ = "curs_echipament"
 
@@ -566,4 +631,33 @@ class GoogleToken(Base):
     token_uri = Column(String)
     client_id = Column(String)
     client_secret = Column(String)
-    scopes = Column(String) # salvat ca JSON string sau text
\ No newline at end of file
+    scopes = Column(String) # salvat ca JSON string sau text
+    # Cand expira access_token (UTC), ca sa nu reimprospatam inutil dupa un restart
+    expiry = Column(DateTime, nullable=True)
+    # Creste la fiecare reconectare; cheia cache-ului de servicii din google_calendar.py
+    versiune = Column(Integer, nullable=False, default=1)
+    # nextSyncToken de la ultimul import: importul urmator cere doar evenimentele schimbate
+    sync_token = Column(String, nullable=True)
+
+class OutboxCalendar(Base):
+    # Modificari de sesiuni care trebuie trimise in Google Calendar (vezi google_calendar.py).
+    # Se scrie in aceeasi tranzactie cu sesiunea; salvarile aceleiasi sesiuni se coalesc intr-un rand.
+    __tablename__ = "outbox_calendar"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Fara ForeignKey: randul de stergere trebuie sa supravietuiasca sesiunii sterse
+    sesiune_id = Column(Integer, nullable=False)
+    operatie = Column(String, nullable=False)  # "salveaza" / "sterge"
+    google_event_id = Column(String, nullable=True)
+    # Creste la fiecare scriere: worker-ul sterge randul doar daca nu s-a schimbat intre timp
+    versiune = Column(Integer, nullable=False, default=1)
+    incercari = Column(Integer, nullable=False, default=0)
+    urmatoarea_incercare = Column(DateTime, default=datetime.utcnow)
+    ultima_eroare = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_outbox_calendar_urmatoarea_incercare", "urmatoarea_incercare"),
+        # Cel mult o salvare in asteptare per sesiune (tinta pentru ON CONFLICT)
+        Index("ux_outbox_calendar_salveaza", "sesiune_id", unique=True, sqlite_where=text("operatie = 'salveaza'")),
+    )
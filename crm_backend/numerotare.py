@@ -0,0 +1,57 @@
+"""Alocarea numerelor de factura din `settings` (serie_facturi / numar_curent_factura).
+
+Un bloc de `cate` numere consecutive se rezerva cu un singur
+UPDATE ... RETURNING: incrementul si citirea valorii se fac in aceeasi instructiune,
+deci doua cereri concurente nu pot primi acelasi numar (SQLite serializeaza
+scrierile, fara fereastra intre SELECT si UPDATE). Rezervarea face parte din
+tranzactia apelantului: la rollback numerele nu se pierd, seria ramane fara goluri.
+
+Unicitatea finala o garanteaza indexul unic ux_facturi_serie_numar (numerele
+introduse manual sau un contor resetat din Setari pot intra in coliziune).
+"""
+from sqlalchemy import func, select, update
+import models
+
+SERIE_IMPLICITA = "EDU"
+MONEDA_IMPLICITA = "RON"
+
+
+def formateaza(serie, numar):
+    """ex: ('EDU', 7) -> 'EDU-007'"""
+    return f"{serie}-{numar:03d}"
+
+
+def _rezerva(db, cate):
+    setari = models.Settings
+    return db.execute(
+        update(setari)
+        .where(setari.id == select(func.min(setari.id)).scalar_subquery())
+        .values(numar_curent_factura=func.coalesce(setari.numar_curent_factura, 1) + cate)
+        .returning(setari.serie_facturi, setari.numar_curent_factura, setari.moneda_default)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def aloca(db, cate=1):
+    """Rezerva `cate` numere consecutive (fara commit). Returneaza (serie, primul numar, moneda)."""
+    if cate < 1:
+        raise ValueError("cate trebuie sa fie >= 1")
+    rand = _rezerva(db, cate)
+    if rand is None:
+        # Baza noua, fara randul de setari: UPDATE-ul de mai sus tine deja lock-ul de scriere
+        db.add(models.Settings())
+        db.flush()
+        rand = _rezerva(db, cate)
+    serie, urmatorul, moneda = rand
+    return serie or SERIE_IMPLICITA, urmatorul - cate, moneda or MONEDA_IMPLICITA
+
+
+def aloca_numere(db, cate):
+    """Lista celor `cate` numere formatate (ex: ['EDU-007', 'EDU-008']) si moneda implicita."""
+    serie, primul, moneda = aloca(db, cate)
+    return [formateaza(serie, primul + i) for i in range(cate)], moneda
+
+
+def este_numar_duplicat(exc):
+    """True daca IntegrityError-ul vine din indexul unic pe facturi.serie_numar."""
+    return "facturi.serie_numar" in str(getattr(exc, "orig", exc))
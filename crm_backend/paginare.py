@@ -0,0 +1,105 @@
+"""Paginare keyset (cursor) pentru rutele de listare.
+
+In modul cursor (`?after=<cursor>&limit=`) pagina urmatoare se citeste cu
+`WHERE (cheie) > (ultima cheie vazuta) ORDER BY cheie LIMIT n`, deci costa la fel
+indiferent cat de departe suntem in lista, iar randurile inserate intre timp nu
+decaleaza paginile. Cursorul urmator se trimite in headerul `X-Next-Cursor`
+(lipseste cand nu mai sunt pagini). `after=` gol cere prima pagina.
+
+Rutele de listare trec prin `listeaza`: filtrele din query string (vezi filtre.py),
+apoi pagina in modul cursor sau clasic (`skip` + `sort`).
+"""
+import base64
+import json
+from datetime import date, datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+import filtre
+
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+def _serializeaza(valoare):
+    if isinstance(valoare, (date, datetime)):
+        return valoare.isoformat()
+    return valoare
+
+
+def _deserializeaza(valoare, coloana):
+    if valoare is None:
+        return None
+    tip = coloana.type.python_type
+    if tip is datetime:
+        return datetime.fromisoformat(valoare)
+    if tip is date:
+        return date.fromisoformat(valoare)
+    return tip(valoare)
+
+
+def codifica_cursor(valori):
+    text = json.dumps([_serializeaza(v) for v in valori], separators=(",", ":"))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decodifica_cursor(cursor, chei):
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        valori = json.loads(text)
+        if not isinstance(valori, list) or len(valori) != len(chei):
+            raise ValueError("numar gresit de chei")
+        return [_deserializeaza(v, c) for v, c in zip(valori, chei)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginare invalid")
+
+
+def aplica_cursor(query, chei, after, limit):
+    """Ordoneaza dupa `chei` (ultima trebuie sa fie unica, de regula id) si sare dupa cursor.
+
+    Cere un rand in plus fata de `limit`, ca sa stim daca exista o pagina urmatoare.
+    Merge la fel pe `db.query(...)` si pe `select(...)`.
+    """
+    if after:
+        valori = decodifica_cursor(after, chei)
+        if len(chei) == 1:
+            query = query.filter(chei[0] > valori[0])
+        else:
+            query = query.filter(tuple_(*chei) > tuple_(*valori))
+    return query.order_by(*chei).limit(limit + 1)
+
+
+def finalizeaza_pagina(rows, chei, limit, response, entitate=lambda rand: rand):
+    """Taie randul in plus si pune cursorul urmator in header (daca mai sunt pagini).
+
+    `entitate` extrage obiectul ORM din rand, cand query-ul intoarce tupluri (ex. factura + nume client).
+    """
+    rows = list(rows)
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        ultimul = entitate(rows[-1])
+        response.headers[HEADER_CURSOR] = codifica_cursor([getattr(ultimul, c.key) for c in chei])
+    return rows
+
+
+async def listeaza(db, query, chei, response, skip, limit, after, filtru=None, request=None, sort=None):
+    """O pagina dintr-o ruta de listare (sesiune async).
+
+    Cu `filtru` (un `filtre.Filtre`) se aplica filtrele din `request.query_params` si
+    ordinea ceruta prin `sort`; fara el, lista nu se filtreaza si se ordoneaza dupa `chei`.
+    Cu `after` pagina se citeste dupa cursor (`chei`), altfel cu offset. Un query pe o
+    singura entitate intoarce obiectele ORM, unul cu mai multe coloane intoarce randurile
+    (entitatea pe prima pozitie).
+    """
+    if filtru is not None:
+        filtre.fara_sortare_cu_cursor(after, sort)
+        query = filtru.aplica(query, request.query_params)
+    if after is not None:
+        query = aplica_cursor(query, chei, after, limit)
+    else:
+        query = query.order_by(*(filtru.ordine(sort) if filtru is not None else chei)).offset(skip).limit(limit)
+
+    o_entitate = len(query.column_descriptions) == 1
+    rezultat = await db.execute(query)
+    rows = rezultat.scalars().all() if o_entitate else rezultat.all()
+    if after is None:
+        return rows
+    return finalizeaza_pagina(rows, chei, limit, response, entitate=(lambda r: r) if o_entitate else (lambda r: r[0]))
@@ -0,0 +1,247 @@
+"""Generarea sesiunilor recurente ale unei grupe.
+
+O regula (zilele saptamanii, ora, durata, sala, perioadele libere) se expandeaza in
+memorie pe intervalul grupei. Suprapunerile cu sesiunile existente (aceeasi grupa,
+acelasi profesor sau aceeasi sala) se cauta cu un singur query pe fereastra planului,
+iar sesiunile noi se insereaza cu un singur INSERT, impreuna cu randurile de outbox
+pentru Google Calendar, intr-o singura tranzactie.
+
+Aceleasi verificari de suprapunere se aplica la orice scriere de sesiune
+(verifica_sesiune / verifica_sesiuni -> 409) si la GET /sesiuni/conflicte.
+"""
+import bisect
+import heapq
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import google_calendar
+import models
+
+# Limita de siguranta pentru o singura generare (o regula gresita nu umple orarul)
+MAX_SESIUNI = int(os.getenv("CRM_MAX_SESIUNI_GENERATE", "500"))
+# O sesiune nu depaseste o zi: limiteaza fereastra cautarii de suprapuneri. Limita e
+# impusa la fiecare scriere (_verifica_intervale, genereaza, importul din Google Calendar)
+DURATA_MAXIMA = timedelta(days=1)
+# Resursele care nu pot fi in doua locuri deodata: (coloana, motivul raportat)
+CHEI = (("grupa_id", "grupa"), ("profesor_id", "profesor"), ("sala", "sala"))
+
+_COLOANE = (models.Sesiune.id, models.Sesiune.grupa_id, models.Sesiune.profesor_id, models.Sesiune.sala,
+            models.Sesiune.data_ora_start, models.Sesiune.data_ora_end)
+
+
+def expandeaza(regula, data_inceput, data_sfarsit):
+    """Intervalele (start, sfarsit) ale regulii intre cele doua date (inclusiv), fara perioadele libere."""
+    zile = set(regula.zile_saptamana)
+    durata = timedelta(minutes=regula.durata_minute)
+    libere = [(p.de_la, p.pana_la or p.de_la) for p in regula.excluderi]
+    intervale = []
+    zi = data_inceput
+    while zi <= data_sfarsit:
+        if zi.weekday() in zile and not any(de_la <= zi <= pana_la for de_la, pana_la in libere):
+            if len(intervale) >= MAX_SESIUNI:
+                raise HTTPException(status_code=400, detail=f"Regula genereaza peste {MAX_SESIUNI} sesiuni")
+            start = datetime.combine(zi, regula.ora_start)
+            intervale.append((start, start + durata))
+        zi += timedelta(days=1)
+    return intervale
+
+
+def _rezumat(s, motive=None):
+    rezumat = {"id": s.id, "grupa_id": s.grupa_id, "profesor_id": s.profesor_id, "sala": s.sala,
+               "data_ora_start": s.data_ora_start, "data_ora_end": s.data_ora_end}
+    if motive is not None:
+        rezumat["motive"] = motive
+    return rezumat
+
+
+def _motive(a, b):
+    """Resursele comune ale doua sesiuni: grupa, profesorul, sala."""
+    return [motiv for camp, motiv in CHEI if getattr(a, camp) not in (None, "") and getattr(a, camp) == getattr(b, camp)]
+
+
+def _sesiuni_active(start, sfarsit):
+    """Sesiunile neanulate cu ore complete care pot atinge intervalul [start, sfarsit)."""
+    S = models.Sesiune
+    # Statusul NULL (randuri vechi / importate) conteaza ca activ; `!=` singur le-ar exclude
+    neanulata = or_(S.status_sesiune.is_(None), S.status_sesiune != models.StatusSesiune.ANULATA)
+    query = select(*_COLOANE).where(S.data_ora_end.is_not(None), neanulata)
+    if start is not None:
+        query = query.where(S.data_ora_start >= start - DURATA_MAXIMA, S.data_ora_end > start)
+    if sfarsit is not None:
+        query = query.where(S.data_ora_start < sfarsit)
+    return query
+
+
+def conflicte(db, intervale, grupa_id, profesor_id, sala=None, exclude_id=None):
+    """Pentru fiecare interval, sesiunile existente care se suprapun cu el (cu motivele).
+
+    Se compara doar sesiunile neanulate ale aceleiasi grupe, ale aceluiasi profesor
+    sau din aceeasi sala; fiecare ramura a OR-ului e o cautare pe indexul
+    (coloana, data_ora_start).
+    """
+    if not intervale:
+        return []
+    S = models.Sesiune
+    # O resursa lipsa (None / sala goala) nu intra in OR: `coloana = NULL` ar deveni IS NULL
+    legaturi = [coloana == valoare for coloana, valoare in ((S.grupa_id, grupa_id), (S.profesor_id, profesor_id),
+                                                              (S.sala, sala)) if valoare not in (None, "")]
+    if not legaturi:
+        return [[] for _ in intervale]
+    query = _sesiuni_active(min(start for start, _ in intervale), max(sfarsit for _, sfarsit in intervale))
+    query = query.where(or_(*legaturi))
+    if exclude_id is not None:
+        query = query.where(S.id != exclude_id)
+    existente = sorted(db.execute(query).all(), key=lambda s: s.data_ora_start)
+    starturi = [s.data_ora_start for s in existente]
+    noua = SimpleNamespace(grupa_id=grupa_id, profesor_id=profesor_id, sala=sala)
+
+    rezultat = []
+    for start, sfarsit in intervale:
+        # Candidatele incep inainte de sfarsitul intervalului si cel mult cu o zi inaintea lui
+        candidate = existente[bisect.bisect_left(starturi, start - DURATA_MAXIMA):bisect.bisect_left(starturi, sfarsit)]
+        rezultat.append([
+            _rezumat(s, motive) for s in candidate if s.data_ora_end > start and (motive := _motive(s, noua))
+        ])
+    return rezultat
+
+
+def suprapuneri(sesiuni):
+    """Perechile (a, b, motive) de sesiuni care se suprapun si au o resursa comuna.
+
+    Sort-and-sweep: sesiunile se parcurg o singura data in ordinea inceputului; pentru
+    fiecare grupa / profesor / sala se tin intr-un heap sesiunile inca in desfasurare
+    (dupa ora de sfarsit). O sesiune noua se suprapune exact cu cele ramase in heap dupa
+    scoaterea celor terminate. Cost O(n log n + numarul de perechi).
+    """
+    active = {}
+    perechi = {}
+    for ordine, s in enumerate(sorted(sesiuni, key=lambda s: s.data_ora_start)):
+        for camp, motiv in CHEI:
+            valoare = getattr(s, camp)
+            if valoare in (None, ""):
+                continue
+            heap = active.setdefault((camp, valoare), [])
+            while heap and heap[0][0] <= s.data_ora_start:
+                heapq.heappop(heap)
+            for _, _, alta in heap:
+                perechi.setdefault((id(alta), id(s)), (alta, s, []))[2].append(motiv)
+            heapq.heappush(heap, (s.data_ora_end, ordine, s))
+    return list(perechi.values())
+
+
+def toate_suprapunerile(db, start=None, sfarsit=None):
+    """Suprapunerile dintre sesiunile existente care ating intervalul dat (pentru GET /sesiuni/conflicte)."""
+    sesiuni = db.execute(_sesiuni_active(start, sfarsit).order_by(models.Sesiune.data_ora_start)).all()
+    return [
+        {"sesiune_a": _rezumat(a), "sesiune_b": _rezumat(b), "motive": motive}
+        for a, b, motive in suprapuneri(sesiuni)
+    ]
+
+
+def _eroare_conflict(conflicte_gasite, mesaj):
+    return HTTPException(status_code=409, detail={"mesaj": mesaj, "conflicte": jsonable_encoder(conflicte_gasite)})
+
+
+def _verifica_intervale(sesiuni):
+    """400 pentru o sesiune care se termina inainte sa inceapa sau dureaza peste DURATA_MAXIMA."""
+    for s in sesiuni:
+        if s.data_ora_end and s.data_ora_end <= s.data_ora_start:
+            raise HTTPException(status_code=400, detail="data_ora_end trebuie sa fie dupa data_ora_start")
+        if s.data_ora_end and s.data_ora_end - s.data_ora_start > DURATA_MAXIMA:
+            raise HTTPException(status_code=400, detail="O sesiune poate dura cel mult 24 de ore")
+
+
+def verifica_sesiune(db, sesiune, exclude_id=None):
+    """Ridica 409 (cu sesiunile in conflict) daca sesiunea scrisa se suprapune cu alta."""
+    # Si sesiunile anulate respecta limita: la reactivare nu mai trec prin verificare ca interval nou
+    _verifica_intervale([sesiune])
+    if sesiune.status_sesiune == models.StatusSesiune.ANULATA or not sesiune.data_ora_end:
+        return
+    gasite = conflicte(
+        db, [(sesiune.data_ora_start, sesiune.data_ora_end)],
+        sesiune.grupa_id, sesiune.profesor_id, sesiune.sala, exclude_id=exclude_id,
+    )[0]
+    if gasite:
+        raise _eroare_conflict(gasite, "Sesiunea se suprapune cu alte sesiuni (acelasi profesor, sala sau grupa)")
+
+
+def verifica_sesiuni(db, sesiuni):
+    """Varianta in bloc: sesiunile noi intre ele si cu cele existente, intr-un singur sweep."""
+    _verifica_intervale(sesiuni)
+    noi = [
+        SimpleNamespace(id=None, **s.dict()) for s in sesiuni
+        if s.status_sesiune != models.StatusSesiune.ANULATA and s.data_ora_end
+    ]
+    if not noi:
+        return
+    S = models.Sesiune
+    legaturi = []
+    for camp, _ in CHEI:
+        valori = {getattr(s, camp) for s in noi} - {None, ""}
+        if valori:
+            legaturi.append(getattr(S, camp).in_(valori))
+    if not legaturi:
+        return
+    query = _sesiuni_active(min(s.data_ora_start for s in noi), max(s.data_ora_end for s in noi)).where(or_(*legaturi))
+    gasite = [
+        {"sesiune_a": _rezumat(a), "sesiune_b": _rezumat(b), "motive": motive}
+        for a, b, motive in suprapuneri([*db.execute(query).all(), *noi])
+        if a.id is None or b.id is None
+    ]
+    if gasite:
+        raise _eroare_conflict(gasite, f"{len(gasite)} suprapuneri intre sesiunile trimise si cele existente")
+
+
+def genereaza(db, grupa, regula, simulare=False):
+    """Planul sesiunilor pentru `grupa`; daca nu e simulare, le insereaza (commit inclus)."""
+    if not regula.zile_saptamana or any(z not in range(7) for z in regula.zile_saptamana):
+        raise HTTPException(status_code=400, detail="zile_saptamana: valori intre 0 (luni) si 6 (duminica)")
+    if not 0 < regula.durata_minute <= 24 * 60:
+        raise HTTPException(status_code=400, detail="durata_minute trebuie sa fie intre 1 si 1440")
+    data_inceput = regula.data_inceput or grupa.data_inceput
+    data_sfarsit = regula.data_sfarsit or grupa.data_sfarsit
+    if data_inceput is None or data_sfarsit is None:
+        raise HTTPException(status_code=400, detail="Grupa nu are interval; trimiteti data_inceput si data_sfarsit")
+    if data_sfarsit < data_inceput:
+        raise HTTPException(status_code=400, detail="data_sfarsit este inaintea datei de inceput")
+    profesor_id = regula.profesor_id or grupa.profesor_titular_id
+
+    intervale = expandeaza(regula, data_inceput, data_sfarsit)
+    conflicte_intervale = conflicte(db, intervale, grupa.id, profesor_id, regula.sala)
+    durata_ore = round(regula.durata_minute / 60, 2)
+    plan = [
+        {"data_ora_start": start, "data_ora_end": sfarsit, "durata_ore": durata_ore, "conflicte": gasite, "id": None}
+        for (start, sfarsit), gasite in zip(intervale, conflicte_intervale)
+    ]
+    cu_conflicte = sum(1 for p in plan if p["conflicte"])
+    de_creat = [p for p in plan if not p["conflicte"]]
+    rezultat = {"grupa_id": grupa.id, "simulare": simulare, "create": 0, "sarite": 0, "sesiuni": plan}
+    if simulare:
+        return rezultat
+    if cu_conflicte and not regula.sari_conflicte:
+        raise HTTPException(
+            status_code=409,
+            detail=f"{cu_conflicte} din {len(plan)} sesiuni se suprapun cu sesiuni existente "
+                   "(vedeti detaliile cu simulare=true sau trimiteti sari_conflicte=true)",
+        )
+
+    if de_creat:
+        # RETURNING nu garanteaza ordinea, dar id-urile se aloca crescator in ordinea VALUES
+        # (sort_by_parameter_order ar trimite cate un INSERT per rand)
+        ids = sorted(db.scalars(
+            sqlite_insert(models.Sesiune).returning(models.Sesiune.id),
+            [dict(grupa_id=grupa.id, profesor_id=profesor_id, data_ora_start=p["data_ora_start"],
+                  data_ora_end=p["data_ora_end"], durata_ore=durata_ore, sala=regula.sala,
+                  tema_lectiei=regula.tema_lectiei, status_sesiune=models.StatusSesiune.PLANIFICATA)
+             for p in de_creat],
+        ))
+        for p, sesiune_id in zip(de_creat, ids):
+            p["id"] = sesiune_id
+        google_calendar.inregistreaza_salvare(db, ids)
+        db.commit()
+    rezultat["create"], rezultat["sarite"] = len(de_creat), cu_conflicte
+    return rezultat
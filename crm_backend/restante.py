@@ -0,0 +1,141 @@
+"""Facturile restante: marcarea celor cu scadenta depasita si raportul de vechime a creantelor.
+
+- `marcheaza_scadente`: un singur UPDATE trece facturile emise cu data_scadenta trecuta
+  in scadenta_depasita; predicatul (status, data_scadenta) e exact indexul
+  ix_facturi_status_scadenta, deci nu se scaneaza tot tabelul. Facturile platite
+  partial isi pastreaza statusul (restul lor apare oricum in raportul de vechime).
+  Ruleaza periodic intr-un thread de fundal (`worker`) si la cerere
+  (POST /facturi/marcheaza-scadente sau `python restante.py`).
+- `vechime`: soldul neincasat pe client, pe intervale de intarziere (0-30, 31-60,
+  61-90, peste 90 de zile), dintr-un singur query grupat peste facturi LEFT JOIN
+  suma platilor per factura.
+"""
+import os
+import threading
+from datetime import date, timedelta
+from sqlalchemy import and_, case, func, select, update
+from database import SessionLocal
+import models
+
+# Cat de des trece worker-ul prin facturi (secunde) si daca porneste odata cu aplicatia
+INTERVAL_S = float(os.getenv("CRM_SCADENTE_INTERVAL_S", "3600"))
+WORKER_ACTIV = os.getenv("CRM_SCADENTE_WORKER", "1") == "1"
+
+# Facturile cu sold de incasat (in raportul de vechime)
+CU_SOLD = (models.StatusFactura.EMISA, models.StatusFactura.SCADENTA_DEPASITA, models.StatusFactura.PLATITA_PARTIAL)
+# interval -> (zile de intarziere minim, maxim); None = fara limita
+INTERVALE = {
+    "nescadent": (None, -1),
+    "zile_0_30": (0, 30),
+    "zile_31_60": (31, 60),
+    "zile_61_90": (61, 90),
+    "peste_90": (91, None),
+}
+
+
+def marcheaza_scadente(db, azi=None):
+    """Emisa -> scadenta_depasita pentru data_scadenta < azi (commit inclus). Returneaza cate facturi."""
+    azi = azi or date.today()
+    marcate = db.execute(
+        update(models.Factura)
+        .where(models.Factura.status == models.StatusFactura.EMISA, models.Factura.data_scadenta < azi)
+        .values(status=models.StatusFactura.SCADENTA_DEPASITA)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return marcate
+
+
+def _in_interval(la, minim, maxim):
+    """Conditia pe data_scadenta pentru `minim`..`maxim` zile de intarziere la data `la` (comparatii de date)."""
+    conditii = []
+    if minim is not None:
+        conditii.append(models.Factura.data_scadenta <= la - timedelta(days=minim))
+    if maxim is not None:
+        conditii.append(models.Factura.data_scadenta >= la - timedelta(days=maxim))
+    return and_(*conditii)
+
+
+async def vechime(db, la=None):
+    """Soldurile pe client si pe intervale la data `la` (implicit azi), plus totalul. Un singur query."""
+    la = la or date.today()
+    platit = (
+        select(models.Plata.factura_id, func.sum(models.Plata.suma_achitata).label("platit"))
+        .group_by(models.Plata.factura_id).subquery()
+    )
+    sold = models.Factura.total_plata - func.coalesce(platit.c.platit, 0)
+    coloane = [
+        func.coalesce(func.sum(case((_in_interval(la, minim, maxim), sold), else_=0)), 0).label(interval)
+        for interval, (minim, maxim) in INTERVALE.items()
+    ]
+    randuri = (await db.execute(
+        select(models.Factura.client_id, models.Client.nume_afisare, func.count(models.Factura.id),
+               func.min(models.Factura.data_scadenta), *coloane)
+        .outerjoin(platit, platit.c.factura_id == models.Factura.id)
+        .outerjoin(models.Client, models.Client.id == models.Factura.client_id)
+        .where(models.Factura.status.in_(CU_SOLD), sold > 0.005)
+        .group_by(models.Factura.client_id, models.Client.nume_afisare)
+    )).all()
+
+    clienti = []
+    for client_id, nume, nr_facturi, cea_mai_veche_scadenta, *sume in randuri:
+        intervale = {interval: round(float(s), 2) for interval, s in zip(INTERVALE, sume)}
+        clienti.append({"client_id": client_id, "client_nume": nume or "Client Necunoscut", "nr_facturi": nr_facturi,
+                        "cea_mai_veche_scadenta": cea_mai_veche_scadenta, **intervale,
+                        "total": round(sum(intervale.values()), 2)})
+    clienti.sort(key=lambda c: (-c["total"], c["client_nume"]))
+    total = {interval: round(sum(c[interval] for c in clienti), 2) for interval in INTERVALE}
+    return {"la": la, "clienti": clienti, "total": {**total, "total": round(sum(total.values()), 2)}}
+
+
+class WorkerScadente:
+    """Thread de fundal care ruleaza `marcheaza_scadente` la fiecare INTERVAL_S secunde (si la pornire)."""
+
+    def __init__(self, SessionFactory):
+        self.SessionFactory = SessionFactory
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._ruleaza, name="worker-scadente", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ruleaza(self):
+        while not self._stop.is_set():
+            db = self.SessionFactory()
+            try:
+                marcate = marcheaza_scadente(db)
+                if marcate:
+                    print(f"Scadente: {marcate} facturi trecute in scadenta_depasita")
+            except Exception as e:
+                print(f"⚠️ Worker scadente: {e}")
+            finally:
+                db.close()
+            self._stop.wait(INTERVAL_S)
+
+
+worker = WorkerScadente(SessionLocal)
+
+
+if __name__ == "__main__":
+    from database import engine
+    import migrari
+
+    models.Base.metadata.create_all(bind=engine)
+    migrari.aplica_migrari(engine)
+    db = SessionLocal()
+    try:
+        print(f"OK: {marcheaza_scadente(db)} facturi trecute in scadenta_depasita.")
+    finally:
+        db.close()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import date, datetime
+from datetime import date, datetime, time
 # Importam Enum-urile din models ca sa validam strict
 from models import (
     StatusFactura, StatusInscriere, StatusSesiune, TipInstitutie, StatusPartener, StatusLead, 
@@ -177,6 +177,54 @@ class Sesiune(SesiuneBase):
     id: int
     class Config:
         from_attributes = True
+
+# --- SUPRAPUNERI (acelasi profesor / sala / grupa in acelasi timp) ---
+class SesiuneRezumat(BaseModel):
+    id: Optional[int] = None # None = sesiune trimisa, inca nesalvata
+    grupa_id: Optional[int] = None
+    profesor_id: Optional[int] = None
+    sala: Optional[str] = None
+    data_ora_start: datetime
+    data_ora_end: datetime
+
+class ConflictSesiune(SesiuneRezumat):
+    motive: List[str] # "grupa", "profesor", "sala"
+
+class Suprapunere(BaseModel):
+    sesiune_a: SesiuneRezumat
+    sesiune_b: SesiuneRezumat
+    motive: List[str]
+
+# --- GENERARE SESIUNI RECURENTE ---
+class PerioadaExclusa(BaseModel):
+    de_la: date
+    pana_la: Optional[date] = None # lipsa = o singura zi (ex: 1 decembrie)
+
+class RegulaRecurenta(BaseModel):
+    zile_saptamana: List[int] # 0 = luni ... 6 = duminica
+    ora_start: time
+    durata_minute: int = 60
+    sala: Optional[str] = None
+    tema_lectiei: Optional[str] = None
+    profesor_id: Optional[int] = None # implicit profesorul titular al grupei
+    data_inceput: Optional[date] = None # implicit intervalul grupei
+    data_sfarsit: Optional[date] = None
+    excluderi: List[PerioadaExclusa] = [] # vacante, sarbatori legale
+    sari_conflicte: bool = False # altfel, orice suprapunere opreste generarea (409)
+
+class SesiunePlanificata(BaseModel):
+    data_ora_start: datetime
+    data_ora_end: datetime
+    durata_ore: float
+    conflicte: List[ConflictSesiune] = []
+    id: Optional[int] = None # setat doar pentru sesiunile create
+
+class PlanSesiuni(BaseModel):
+    grupa_id: int
+    simulare: bool
+    create: int
+    sarite: int
+    sesiuni: List[SesiunePlanificata]
         
 # ... (dupa Sesiune)
 
@@ -192,7 +240,8 @@ class FacturaBase(BaseModel):
     status: StatusFactura = StatusFactura.DRAFT
 
 class FacturaCreate(FacturaBase):
-    pass
+    # Gol = urmatorul numar din Setari (serie_facturi / numar_curent_factura)
+    serie_numar: Optional[str] = None
 
 class Factura(FacturaBase):
     id: int
@@ -241,6 +290,17 @@ class Prezenta(PrezentaBase):
     class Config:
         from_attributes = True
 
+# Un rand din catalogul trimis in bloc (None = campul nu se modifica)
+class PrezentaBatchItem(BaseModel):
+    inscriere_id: int
+    is_prezent: Optional[bool] = None
+    motiv_absenta: Optional[str] = None
+    rating_profesor: Optional[int] = None
+    note: Optional[str] = None
+
+class PrezentaBatch(BaseModel):
+    prezente: List[PrezentaBatchItem]
+
 # Schema speciala pentru a trimite lista catre frontend usor
 class CatalogItem(BaseModel):
     elev_id: int
@@ -322,4 +382,136 @@ class SettingsCreate(SettingsBase):
 class Settings(SettingsBase):
     id: int
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Snapshot-urile bazei (vezi snapshot.py)
+class Snapshot(BaseModel):
+    nume: str
+    marime: int
+    creat_la: datetime
+
+class SnapshotRestaurat(BaseModel):
+    restaurat: str
+    snapshot_siguranta: str
+
+# ======================= 12. KPI LUNARE =======================
+
+class KpiLunar(BaseModel):
+    cod_luna: str
+    nume_luna: Optional[str] = None
+    nr_prezente: int
+    copii_activi: int
+    total_facturat: float
+    total_incasat: float
+    leaduri_noi: int
+    conversii: int
+    clasificare_luna: Optional[str] = None
+    actualizat_la: Optional[datetime] = None
+    # Din ParametriFinanciari (None daca nu sunt setate)
+    target_copii_lunar: Optional[int] = None
+    grad_realizare_target: Optional[float] = None  # copii_activi / target_copii_lunar
+    venit_estimat_prezente: Optional[float] = None  # nr_prezente * valoare_prezenta_std
+    class Config:
+        from_attributes = True
+
+# ======================= 13. IMPORT IN BLOC =======================
+
+class EroareImport(BaseModel):
+    rand: int
+    erori: List[str]
+
+class RaportImport(BaseModel):
+    entitate: str
+    randuri_citite: int
+    inserate: int
+    respinse: int
+    coloane_ignorate: List[str]
+    erori: List[EroareImport]
+
+# ======================= 14. CAUTARE =======================
+
+class RezultatCautare(BaseModel):
+    entitate: str
+    id: int
+    titlu: Optional[str] = None
+    fragment: Optional[str] = None
+    scor: float
+    aproximativ: bool
+
+# ======================= 15. FACTURARE IN BLOC =======================
+
+class LinieFacturaGenerata(BaseModel):
+    descriere_serviciu: str
+    cantitate: float
+    pret_unitar: float
+    valoare_totala: float
+    grupa_id: Optional[int] = None
+    inscriere_id: Optional[int] = None
+
+class FacturaGenerata(BaseModel):
+    client_id: Optional[int] = None # None in simulare, pentru clientii care inca nu exista
+    client_nume: str
+    serie_numar: Optional[str] = None # None in simulare
+    total_plata: float
+    linii: List[LinieFacturaGenerata]
+
+class RaportFacturare(BaseModel):
+    luna: str
+    simulare: bool
+    data_emitere: date
+    data_scadenta: date
+    nr_facturi: int
+    nr_linii: int
+    total: float
+    clienti_deja_facturati: List[str]
+    facturi: List[FacturaGenerata]
+
+# ======================= 16. IMPORT PLATI (EXTRASE BANCARE) =======================
+
+class LiniePlataNepotrivita(BaseModel):
+    rand: int
+    data_plata: Optional[date] = None
+    suma: Optional[float] = None
+    referinta: Optional[str] = None
+    detalii: Optional[str] = None
+    motiv: str
+
+class RaportImportPlati(BaseModel):
+    randuri_citite: int
+    incasari: int
+    debite_ignorate: int
+    duplicate: int
+    invalide: int
+    potrivite: int
+    nepotrivite: int
+    plati_inserate: int
+    suma_potrivita: float
+    facturi_actualizate: int
+    linii_nepotrivite: List[LiniePlataNepotrivita]
+
+# ======================= 17. VECHIMEA CREANTELOR (AGING) =======================
+
+class VechimeClient(BaseModel):
+    client_id: Optional[int] = None
+    client_nume: str
+    nr_facturi: int
+    cea_mai_veche_scadenta: Optional[date] = None
+    nescadent: float
+    zile_0_30: float
+    zile_31_60: float
+    zile_61_90: float
+    peste_90: float
+    total: float
+
+class TotalVechime(BaseModel):
+    nescadent: float
+    zile_0_30: float
+    zile_31_60: float
+    zile_61_90: float
+    peste_90: float
+    total: float
+
+class RaportVechime(BaseModel):
+    la: date
+    clienti: List[VechimeClient]
+    total: TotalVechime
@@ -0,0 +1,229 @@
+"""Snapshot-uri "la cald" ale crm.db prin API-ul de backup online al SQLite.
+
+Copia se face pagina cu pagina, cate CRM_SNAPSHOT_PAGINI pagini pe pas, cu o pauza
+intre pasi: lock-ul de citire se tine doar cat dureaza un pas, iar in modul WAL
+scrierile continua oricum in paralel. Rezultatul e un instantaneu consistent al
+bazei (daca o scriere modifica sursa in timpul copierii, SQLite reia copia; dupa
+CRM_SNAPSHOT_MAX_RELUARI reluari se copiaza dintr-un singur pas).
+
+Snapshot-urile stau in CRM_SNAPSHOT_DIR (optional comprimate gzip) si se pastreaza
+doar ultimele CRM_SNAPSHOT_PASTREAZA. Restaurarea verifica integritatea copiei si
+abia apoi o copiaza peste baza live, tot prin API-ul de backup (atomic pentru
+celelalte conexiuni, fara sa redenumeasca fisiere aflate in uz).
+
+Rulare din linia de comanda:
+    python snapshot.py                      # snapshot nou (comprimat) + rotatie
+    python snapshot.py --necomprimat
+    python snapshot.py --lista
+    python snapshot.py --restaureaza crm_20260101_120000_000000.db.gz
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from database import engine
+import migrari
+import models
+
+DIR_SNAPSHOTURI = os.getenv("CRM_SNAPSHOT_DIR", "./snapshots")
+# Cate snapshot-uri se pastreaza (cele mai vechi se sterg la fiecare snapshot nou)
+PASTREAZA = int(os.getenv("CRM_SNAPSHOT_PASTREAZA", "7"))
+# Pagini copiate per pas si pauza dintre pasi (secunde)
+PAGINI_PE_PAS = int(os.getenv("CRM_SNAPSHOT_PAGINI", "256"))
+PAUZA_S = float(os.getenv("CRM_SNAPSHOT_PAUZA_S", "0.005"))
+# De cate ori poate fi reluata copia pe pasi (din cauza scrierilor) inainte de copia dintr-un pas
+MAX_RELUARI = int(os.getenv("CRM_SNAPSHOT_MAX_RELUARI", "3"))
+
+MODEL_NUME = re.compile(r"^crm_\d{8}_\d{6}_\d{6}\.db(\.gz)?$")
+
+
+class SnapshotInvalid(Exception):
+    """Snapshot inexistent, cu nume invalid sau care nu trece verificarea de integritate."""
+
+
+def cale_baza():
+    """Fisierul bazei live (din URL-ul engine-ului)."""
+    cale = engine.url.database
+    if not cale or cale == ":memory:":
+        raise SnapshotInvalid("Baza de date nu este un fisier SQLite")
+    return os.path.abspath(cale)
+
+
+class _PreaMulteReluari(Exception):
+    pass
+
+
+def _copiaza(sursa, destinatie, pagini=PAGINI_PE_PAS, pauza_s=PAUZA_S, max_reluari=MAX_RELUARI):
+    """Copiaza sursa peste destinatie (conexiuni sqlite3) pagina cu pagina.
+
+    O scriere din alta conexiune intre doi pasi reia copia de la inceput; daca asta se
+    intampla de prea multe ori (trafic de scriere continuu), copia se face dintr-un singur
+    pas. In modul WAL si acela tine doar un snapshot de citire, deci nu blocheaza scrierile.
+    """
+    if pagini > 0:
+        stare = {"ramase": None, "reluari": 0}
+
+        def _progres(status, ramase, total):
+            if stare["ramase"] is not None and ramase > stare["ramase"]:
+                stare["reluari"] += 1
+                if stare["reluari"] > max_reluari:
+                    raise _PreaMulteReluari()
+            stare["ramase"] = ramase
+
+        try:
+            sursa.backup(destinatie, pages=pagini, progress=_progres, sleep=pauza_s)
+            return
+        except _PreaMulteReluari:
+            pass
+    sursa.backup(destinatie, pages=-1)
+
+
+def _verifica(cale):
+    """PRAGMA integrity_check pe un fisier; ridica SnapshotInvalid daca nu e 'ok'."""
+    try:
+        conn = sqlite3.connect(f"file:{cale}?mode=ro", uri=True)
+        try:
+            rezultat = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+            tabele = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise SnapshotInvalid(f"Fisierul nu este o baza SQLite valida: {e}") from e
+    if rezultat != ["ok"]:
+        raise SnapshotInvalid(f"Verificarea de integritate a esuat: {'; '.join(rezultat[:5])}")
+    if "settings" not in tabele:
+        raise SnapshotInvalid("Fisierul nu este un snapshot al bazei CRM")
+
+
+def _nume_nou(comprima):
+    # Momentul crearii pana la microsecunda: numele sunt unice si ordinea lor e cea cronologica
+    return f"crm_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{'.db.gz' if comprima else '.db'}"
+
+
+def listeaza(director=DIR_SNAPSHOTURI):
+    """Snapshot-urile existente, cele mai noi primele: [{nume, marime, creat_la}]."""
+    if not os.path.isdir(director):
+        return []
+    rezultat = []
+    for nume in os.listdir(director):
+        if MODEL_NUME.match(nume):
+            stat = os.stat(os.path.join(director, nume))
+            rezultat.append({"nume": nume, "marime": stat.st_size, "creat_la": datetime.fromtimestamp(stat.st_mtime)})
+    return sorted(rezultat, key=lambda s: s["nume"], reverse=True)
+
+
+def roteste(director=DIR_SNAPSHOTURI, pastreaza=PASTREAZA):
+    """Sterge snapshot-urile mai vechi decat ultimele `pastreaza`. Returneaza numele sterse."""
+    sterse = [s["nume"] for s in listeaza(director)[pastreaza:]]
+    for nume in sterse:
+        os.remove(os.path.join(director, nume))
+    return sterse
+
+
+def creeaza(comprima=True, director=DIR_SNAPSHOTURI, pastreaza=PASTREAZA):
+    """Face un snapshot al bazei live, il verifica si roteste directorul. Returneaza intrarea din `listeaza`."""
+    os.makedirs(director, exist_ok=True)
+    nume = _nume_nou(comprima)
+    fd, temporar = tempfile.mkstemp(suffix=".db", dir=director)
+    os.close(fd)
+    try:
+        sursa = sqlite3.connect(f"file:{cale_baza()}?mode=ro", uri=True)
+        destinatie = sqlite3.connect(temporar)
+        try:
+            _copiaza(sursa, destinatie)
+            # Snapshot-ul e un fisier de sine statator (fara -wal alaturi)
+            destinatie.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            destinatie.close()
+            sursa.close()
+        _verifica(temporar)
+
+        final = os.path.join(director, nume)
+        if comprima:
+            with open(temporar, "rb") as f, gzip.open(final + ".tmp", "wb", compresslevel=6) as g:
+                shutil.copyfileobj(f, g, 1024 * 1024)
+            os.replace(final + ".tmp", final)
+        else:
+            os.replace(temporar, final)
+    finally:
+        for cale in (temporar, os.path.join(director, nume + ".tmp")):
+            if os.path.exists(cale):
+                os.remove(cale)
+
+    roteste(director, pastreaza)
+    return next(s for s in listeaza(director) if s["nume"] == nume)
+
+
+def cale_snapshot(nume, director=DIR_SNAPSHOTURI):
+    """Calea unui snapshot dupa nume (doar nume generate de `creeaza`, fara cai relative)."""
+    cale = os.path.join(director, nume)
+    if not MODEL_NUME.match(nume) or not os.path.isfile(cale):
+        raise SnapshotInvalid("Snapshot inexistent")
+    return cale
+
+
+def restaureaza(nume, director=DIR_SNAPSHOTURI):
+    """Verifica snapshot-ul si il copiaza peste baza live.
+
+    Inainte se face automat un snapshot al starii curente, ca restaurarea sa poata fi anulata.
+    Returneaza numele acelui snapshot de siguranta.
+    """
+    cale = cale_snapshot(nume, director)
+    fd, temporar = tempfile.mkstemp(suffix=".db", dir=director)
+    os.close(fd)
+    try:
+        if nume.endswith(".gz"):
+            try:
+                with gzip.open(cale, "rb") as g, open(temporar, "wb") as f:
+                    shutil.copyfileobj(g, f, 1024 * 1024)
+            except (OSError, EOFError) as e:
+                raise SnapshotInvalid(f"Arhiva gzip este corupta: {e}") from e
+        else:
+            shutil.copyfile(cale, temporar)
+        _verifica(temporar)
+
+        # Fara rotatie: snapshot-ul restaurat nu trebuie sa dispara chiar acum
+        siguranta = creeaza(comprima=True, director=director, pastreaza=len(listeaza(director)) + 1)
+
+        sursa = sqlite3.connect(temporar)
+        destinatie = sqlite3.connect(cale_baza(), timeout=30)
+        try:
+            # Copia pe baza live se face dintr-un singur pas: celelalte conexiuni vad fie baza veche, fie pe cea noua
+            _copiaza(sursa, destinatie, pagini=-1)
+        finally:
+            destinatie.close()
+            sursa.close()
+    finally:
+        os.remove(temporar)
+
+    # Un snapshot mai vechi poate avea schema in urma codului: aceleasi migrari ca la pornire
+    engine.dispose()
+    models.Base.metadata.create_all(bind=engine)
+    migrari.aplica_migrari(engine)
+    return siguranta["nume"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot-uri ale crm.db prin API-ul de backup SQLite")
+    grup = parser.add_mutually_exclusive_group()
+    grup.add_argument("--lista", action="store_true", help="afiseaza snapshot-urile existente")
+    grup.add_argument("--restaureaza", metavar="NUME", help="restaureaza snapshot-ul dat peste crm.db")
+    parser.add_argument("--necomprimat", action="store_true", help="fisier .db simplu in loc de .db.gz")
+    args = parser.parse_args()
+
+    try:
+        if args.lista:
+            for s in listeaza():
+                print(f"{s['nume']:<32} {s['marime'] / 2**20:>8.2f} MB  {s['creat_la']:%Y-%m-%d %H:%M:%S}")
+        elif args.restaureaza:
+            siguranta = restaureaza(args.restaureaza)
+            print(f"OK: {args.restaureaza} restaurat (starea anterioara salvata in {siguranta}).")
+        else:
+            s = creeaza(comprima=not args.necomprimat)
+            print(f"OK: {s['nume']} ({s['marime'] / 2**20:.2f} MB)")
+    except SnapshotInvalid as e:
+        raise SystemExit(f"EROARE: {e}")
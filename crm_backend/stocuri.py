@@ -0,0 +1,120 @@
+"""Stocuri materializate pentru produse.
+
+Soldul fiecarui produs este tinut in tabela `stocuri_produse` si actualizat in
+aceeasi tranzactie cu miscarea de stoc, ca lista de produse sa nu mai recalculeze
+tot registrul `miscari_stoc` la fiecare incarcare.
+
+Rulare din linia de comanda:
+    python stocuri.py --verifica        # compara soldurile cu registrul
+    python stocuri.py --reconstruieste  # recalculeaza soldurile din registru
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import models
+
+# Miscarile care adauga in stoc; restul (consum, transfer) scad
+TIPURI_INTRARE = (models.TipMiscareStoc.ACHIZITIE_IN, models.TipMiscareStoc.RETUR_DEFECT)
+
+
+def delta_miscare(tip, cantitate):
+    """Cu cat modifica o miscare soldul produsului (pozitiv = intrare)."""
+    return cantitate if tip in TIPURI_INTRARE else -cantitate
+
+
+def aplica_miscare(db, produs_id, tip, cantitate):
+    """Actualizeaza soldul produsului fara commit (ramane in tranzactia apelantului)."""
+    delta = delta_miscare(tip, cantitate)
+    stmt = sqlite_insert(models.StocProdus).values(
+        produs_id=produs_id, cantitate=delta, actualizat_la=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.StocProdus.produs_id],
+        set_={
+            "cantitate": models.StocProdus.cantitate + stmt.excluded.cantitate,
+            "actualizat_la": stmt.excluded.actualizat_la,
+        },
+    )
+    db.execute(stmt)
+
+
+def _sold_din_registru():
+    """Expresia SUM(+/- cantitate) care da soldul unui produs din registrul de miscari."""
+    semn = case(
+        (models.MiscareStoc.tip.in_(TIPURI_INTRARE), models.MiscareStoc.cantitate),
+        else_=-models.MiscareStoc.cantitate,
+    )
+    return func.coalesce(func.sum(semn), 0).label("sold")
+
+
+def calculeaza_din_registru(db):
+    """Returneaza {produs_id: sold} dintr-un singur query grupat."""
+    rows = (
+        db.query(models.MiscareStoc.produs_id, _sold_din_registru())
+        .group_by(models.MiscareStoc.produs_id)
+        .all()
+    )
+    return {r.produs_id: int(r.sold) for r in rows if r.produs_id is not None}
+
+
+def verifica_stocuri(db):
+    """Lista de diferente [(produs_id, sold_salvat, sold_registru)] intre cache si registru."""
+    din_registru = calculeaza_din_registru(db)
+    salvate = {s.produs_id: s.cantitate for s in db.query(models.StocProdus).all()}
+
+    diferente = []
+    for produs_id in sorted(set(din_registru) | set(salvate)):
+        asteptat = din_registru.get(produs_id, 0)
+        actual = salvate.get(produs_id, 0)
+        if asteptat != actual:
+            diferente.append((produs_id, actual, asteptat))
+    return diferente
+
+
+def reconstruieste_stocuri(db):
+    """Recalculeaza toate soldurile din registru (un singur INSERT ... SELECT grupat)."""
+    selectie = (
+        select(models.MiscareStoc.produs_id, _sold_din_registru(), func.current_timestamp())
+        .join(models.Produs, models.Produs.id == models.MiscareStoc.produs_id)
+        .group_by(models.MiscareStoc.produs_id)
+    )
+    db.query(models.StocProdus).delete(synchronize_session=False)
+    db.execute(
+        sqlite_insert(models.StocProdus).from_select(
+            ["produs_id", "cantitate", "actualizat_la"], selectie
+        )
+    )
+    db.commit()
+
+
+def initializeaza_stocuri(db):
+    """La pornire: daca tabela de solduri e goala dar exista miscari, o populam din registru."""
+    if db.query(models.StocProdus).first() is not None:
+        return
+    if db.query(models.MiscareStoc).first() is None:
+        return
+    reconstruieste_stocuri(db)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Verificare / reconstruire stocuri produse")
+    parser.add_argument("--verifica", action="store_true", help="doar raporteaza diferentele")
+    parser.add_argument("--reconstruieste", action="store_true", help="recalculeaza soldurile din registru")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.reconstruieste:
+            reconstruieste_stocuri(db)
+            print("Stocurile au fost reconstruite din registrul de miscari.")
+        diferente = verifica_stocuri(db)
+        if not diferente:
+            print("OK: soldurile corespund registrului de miscari.")
+        for produs_id, actual, asteptat in diferente:
+            print(f"Produs {produs_id}: sold salvat {actual}, din registru {asteptat}")
+    finally:
+        db.close()
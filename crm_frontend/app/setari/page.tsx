@@ -80,7 +80,7 @@ export default function SetariPage() {
     finally { setLoading(false); }
   };
 
-  // Download Backup (EXCEL)
+  // Download Backup (ZIP cu cate un CSV per tabela)
   const handleBackup = async () => {
       try {
           const res = await fetch("http://127.0.0.1:8000/system/backup");
@@ -90,7 +90,7 @@ export default function SetariPage() {
           const url = window.URL.createObjectURL(blob);
           const a = document.createElement('a');
           a.href = url;
-          a.download = `Backup_EduCRM_${new Date().toISOString().slice(0,10)}.xlsx`;
+          a.download = `Backup_EduCRM_${new Date().toISOString().slice(0,10)}.zip`;
           document.body.appendChild(a);
           a.click();
           a.remove();
@@ -98,7 +98,7 @@ export default function SetariPage() {
           
       } catch (error) {
           console.error(error);
-          alert("Nu s-a putut descărca fișierul Excel.");
+          alert("Nu s-a putut descărca arhiva de backup.");
       }
   };
 
@@ -249,7 +249,7 @@ export default function SetariPage() {
                         <h4 className="font-bold text-slate-800 flex items-center gap-2">
                              <Download className="h-5 w-5 text-blue-500"/> Export Backup Date
                         </h4>
-                        <p className="text-sm text-slate-500 mt-1">Descarcă un fișier Excel cu toate datele din CRM (Elevi, Note, Inventar).</p>
+                        <p className="text-sm text-slate-500 mt-1">Descarcă o arhivă ZIP cu toate datele din CRM (câte un fișier CSV pentru fiecare tabel).</p>
                     </div>
                     <Button onClick={handleBackup} variant="outline" className="border-blue-200 text-blue-700 hover:bg-blue-50 bg-white cursor-pointer">
                         Descarcă Date
@@ -49,6 +49,10 @@ export function AddFacturaDialog({ onFacturaAdded }: { onFacturaAdded: () => voi
             total_plata: "",
             status: "draft"
         }); 
+      } else if (res.status === 409) {
+        // Numarul introdus exista deja pe alta factura
+        const { detail } = await res.json();
+        alert(detail);
       }
     } catch (error) { console.error(error); } finally { setLoading(false); }
   };
@@ -84,7 +88,7 @@ export function AddFacturaDialog({ onFacturaAdded }: { onFacturaAdded: () => voi
             <div className="grid grid-cols-1 md:grid-cols-2 gap-5">
                 <div>
                     <Label htmlFor="serie" className={labelStyle}>Serie & Număr</Label>
-                    <Input required id="serie" placeholder="ex: EDU-001" 
+                    <Input id="serie" placeholder="automat (ex: EDU-001)" 
                         value={formData.serie_numar} onChange={e => setFormData({...formData,serie_numar: e.target.value})}
                         className={inputStyle}
                     />
@@ -80,6 +80,13 @@ export function AddSesiuneDialog({ onSesiuneAdded }: { onSesiuneAdded: () => voi
         setOpen(false);
         onSesiuneAdded();
         setFormData({...formData, tema_lectiei: ""}); 
+      } else if (res.status === 409) {
+        // Profesorul / sala / grupa sunt deja ocupate in intervalul ales
+        const { detail } = await res.json();
+        const lista = (detail.conflicte || [])
+          .map((c: any) => `• ${new Date(c.data_ora_start).toLocaleString("ro-RO")} (${c.motive.join(", ")})`)
+          .join("\n");
+        alert(`${detail.mesaj}\n${lista}`);
       }
     } catch (error) { console.error(error); } finally { setLoading(false); }
   };
@@ -47,6 +47,10 @@ export function EditFacturaDialog({ factura, onFacturaUpdated }: EditFacturaProp
       if (res.ok) {
         setOpen(false);
         onFacturaUpdated();
+      } else if (res.status === 409) {
+        // Numarul introdus exista deja pe alta factura
+        const { detail } = await res.json();
+        alert(detail);
       } else {
         alert("Eroare la actualizare");
       }
@@ -78,6 +78,13 @@ export function EditSesiuneDialog({ sesiune, onSesiuneUpdated }: EditSesiuneProp
       if (res.ok) {
         setOpen(false);
         onSesiuneUpdated();
+      } else if (res.status === 409) {
+        // Profesorul / sala / grupa sunt deja ocupate in intervalul ales
+        const { detail } = await res.json();
+        const lista = (detail.conflicte || [])
+          .map((c: any) => `• ${new Date(c.data_ora_start).toLocaleString("ro-RO")} (${c.motive.join(", ")})`)
+          .join("\n");
+        alert(`${detail.mesaj}\n${lista}`);
       } else {
         alert("Eroare la actualizare.");
       }